@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Synthetic job corpora for benchmarks
+
+Postings are built from templated sentences in the style of real IAM and
+security ads: role summary, responsibilities, requirements, benefits, plus
+the sponsorship, clearance, work-authorization and remote-work phrases the
+classifier looks for. A share of postings are reposts of earlier ones with a
+tweaked title or reference number, as the near-duplicate pass sees in
+practice. Generation is seeded, so a size always yields the same corpus.
+"""
+
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+COUNTRY_CITIES = {
+    'us': ['New York, NY', 'Seattle, WA', 'Austin, TX', 'Arlington, VA', 'Boston, MA', 'Denver, CO'],
+    'gb': ['London', 'Manchester', 'Edinburgh', 'Bristol'],
+    'ca': ['Toronto, ON', 'Vancouver, BC', 'Ottawa, ON'],
+    'au': ['Sydney', 'Melbourne', 'Canberra'],
+    'de': ['Berlin', 'Munich', 'Frankfurt'],
+    'fr': ['Paris', 'Lyon'],
+    'nl': ['Amsterdam', 'Rotterdam'],
+    'nz': ['Auckland', 'Wellington'],
+    'pl': ['Warsaw', 'Krakow'],
+    'at': ['Vienna'],
+    'ch': ['Zurich', 'Geneva'],
+    'in': ['Bangalore', 'Hyderabad', 'Pune'],
+    'sg': ['Singapore'],
+    'za': ['Johannesburg', 'Cape Town'],
+    'br': ['Sao Paulo'],
+    'mx': ['Mexico City'],
+    'it': ['Milan', 'Rome'],
+    'es': ['Madrid', 'Barcelona']
+}
+
+COMPANY_WORDS = ['Secure', 'Identity', 'Cyber', 'Cloud', 'Trust', 'Access', 'Shield', 'Vault',
+                 'Northwind', 'Blue', 'Iron', 'Signal', 'Quantum', 'Apex', 'Harbor', 'Granite']
+COMPANY_SUFFIXES = ['Systems', 'Labs', 'Group', 'Technologies', 'Partners', 'Bank', 'Health',
+                    'Consulting', 'Networks', 'Solutions']
+
+TITLE_LEVELS = ['', 'Senior ', 'Junior ', 'Lead ', 'Principal ', 'Staff ', 'Associate ']
+TITLE_ROLES = ['IAM Engineer', 'Identity Engineer', 'Security Engineer', 'Security Analyst',
+               'Identity Architect', 'Cybersecurity Consultant', 'PAM Engineer',
+               'Okta Administrator', 'SailPoint Developer', 'Cloud Security Engineer',
+               'SOC Analyst', 'Identity Governance Analyst', 'Security Architect']
+
+SUMMARIES = [
+    "{company} is looking for a {title} to join our {team} team.",
+    "As a {title} at {company}, you will own the {team} roadmap end to end.",
+    "Join {company} and help protect millions of customers as our next {title}.",
+    "We are hiring a {title} to scale {team} across our global business."
+]
+TEAMS = ['identity platform', 'security engineering', 'access governance', 'cloud security',
+         'detection and response', 'zero trust']
+RESPONSIBILITIES = [
+    "Design and operate single sign-on and multi-factor authentication for workforce and customers.",
+    "Automate joiner, mover and leaver processes across HR and directory systems.",
+    "Run quarterly access reviews and drive remediation with application owners.",
+    "Integrate SaaS applications using SAML, OAuth 2.0 and OpenID Connect.",
+    "Harden privileged access with vaulting, session recording and just-in-time elevation.",
+    "Investigate alerts and lead incident response for identity-based attacks.",
+    "Build infrastructure as code for our identity stack with Terraform.",
+    "Partner with audit and compliance on SOX, ISO 27001 and SOC 2 controls."
+]
+REQUIREMENTS = [
+    "5+ years of experience in identity and access management.",
+    "Hands-on experience with Okta, Entra ID or Ping Identity.",
+    "Strong scripting skills in Python or PowerShell.",
+    "Working knowledge of Active Directory and LDAP.",
+    "Experience with SailPoint IdentityIQ or Saviynt.",
+    "Familiarity with CyberArk or BeyondTrust.",
+    "Excellent communication skills and a collaborative mindset."
+]
+BENEFITS = [
+    "Competitive salary, equity and an annual bonus.",
+    "Generous parental leave and a learning budget.",
+    "Health, dental and vision coverage from day one.",
+    "Flexible hours and a home-office allowance."
+]
+# Phrases the classifier reacts to, with rough real-world frequencies
+SIGNALS = [
+    (0.10, "Visa sponsorship available for the right candidate."),
+    (0.05, "We can sponsor H1B transfers and offer relocation assistance."),
+    (0.08, "Unfortunately we cannot sponsor visas for this role."),
+    (0.06, "Candidates must be authorized to work in the country without sponsorship."),
+    (0.04, "US citizens only; an active TS/SCI clearance is required."),
+    (0.03, "Top secret clearance required."),
+    (0.03, "Must reside in the metro area; local candidates only."),
+    (0.15, "This is a fully remote position."),
+    (0.12, "Hybrid working: three days a week in the office."),
+    (0.05, "Right to work in the UK is required.")
+]
+
+DUPLICATE_RATE = 0.05
+
+
+def company_names(rng: random.Random, count: int = 400) -> List[str]:
+    names = {f"{rng.choice(COMPANY_WORDS)}{rng.choice(COMPANY_WORDS).lower()} {rng.choice(COMPANY_SUFFIXES)}"
+             for _ in range(count * 2)}
+    return sorted(names)[:count]
+
+
+def description(rng: random.Random, company: str, title: str) -> str:
+    parts = [rng.choice(SUMMARIES).format(company=company, title=title, team=rng.choice(TEAMS))]
+    parts.append("Responsibilities: " + ' '.join(rng.sample(RESPONSIBILITIES, rng.randint(2, 4))))
+    parts.append("Requirements: " + ' '.join(rng.sample(REQUIREMENTS, rng.randint(2, 4))))
+    parts.extend(text for share, text in SIGNALS if rng.random() < share)
+    parts.append(rng.choice(BENEFITS))
+    return ' '.join(parts)
+
+
+def iter_results(count: int, seed: int = 0) -> Iterator[Dict]:
+    """Raw postings in the Adzuna search-result shape, each tagged with its market in '_country'"""
+    rng = random.Random(seed)
+    companies = company_names(rng)
+    countries = list(COUNTRY_CITIES)
+    start = datetime(2026, 1, 1)
+    recent: List[Dict] = []
+
+    for i in range(count):
+        if recent and rng.random() < DUPLICATE_RATE:
+            # Repost: same role, new id, slightly different title
+            original = rng.choice(recent)
+            result = dict(original, id=str(10_000_000 + i),
+                          title=original['title'] + rng.choice([' (Remote)', ' - Req #%d' % rng.randint(100, 999), ' II']))
+        else:
+            country = rng.choice(countries)
+            company = rng.choice(companies)
+            title = rng.choice(TITLE_LEVELS) + rng.choice(TITLE_ROLES)
+            result = {
+                'id': str(10_000_000 + i),
+                'title': title,
+                'description': description(rng, company, title),
+                'company': {'display_name': company},
+                'location': {'display_name': rng.choice(COUNTRY_CITIES[country])},
+                '_country': country
+            }
+        result['created'] = (start + timedelta(minutes=i * 7)).strftime('%Y-%m-%dT%H:%M:%SZ')
+        result['redirect_url'] = f"https://www.adzuna.com/details/{result['id']}"
+        recent.append(result)
+        if len(recent) > 200:
+            recent.pop(0)
+        yield result
+
+
+def generate(count: int, seed: int = 0) -> List[Dict]:
+    return list(iter_results(count, seed))
+
+
+def by_country(results: List[Dict]) -> Dict[str, List[Dict]]:
+    """Postings per market, newest first (the order the search API returns with sort_by=date)"""
+    markets: Dict[str, List[Dict]] = {}
+    for result in results:
+        markets.setdefault(result['_country'], []).append(result)
+    for postings in markets.values():
+        postings.sort(key=lambda r: r['created'], reverse=True)
+    return markets
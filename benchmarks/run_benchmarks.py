@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Scraper benchmarks
+
+Times each processing stage over synthetic corpora and runs the whole
+scraper end to end against the local stub API. For every stage the report
+has wall time, throughput (records/s) and peak traced memory. Memory is
+measured in a second, tracemalloc'd pass, so it does not distort the timings.
+Results are written as JSON to benchmarks/results/, named by time and
+commit, and compared with the previous results file. The load_* stages
+compare holding the corpus as plain dicts with holding it as JobRecords.
+
+    python benchmarks/run_benchmarks.py                      # 1k and 100k records
+    python benchmarks/run_benchmarks.py --sizes 1k,100k,1m   # 1M takes a while
+    python benchmarks/run_benchmarks.py --e2e-records 20000 --latency 0.05 --rate-429 0.1
+"""
+
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+SCRIPTS_DIR = os.path.join(PROJECT_ROOT, 'scripts')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+sys.path.insert(0, SCRIPTS_DIR)
+
+import scrape_jobs  # noqa: E402
+from corpus import by_country, generate  # noqa: E402
+from job_record import JobRecord  # noqa: E402
+from near_duplicates import collapse_near_duplicates  # noqa: E402
+from publish import build_compact, corpus_order, write_json_stream  # noqa: E402
+from search_index import build_search_index  # noqa: E402
+from spill import external_sort  # noqa: E402
+from stub_adzuna import start as start_stub  # noqa: E402
+
+RESULTS_VERSION = 1
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    for suffix, factor in (('k', 1_000), ('m', 1_000_000)):
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * factor)
+    return int(text)
+
+
+def measure(fn: Callable[[], object], records: int, memory: bool = True) -> Dict:
+    """Run `fn` timed, then (optionally) again under tracemalloc for its peak"""
+    started = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - started
+    result = {
+        'records': records,
+        'seconds': round(seconds, 4),
+        'throughput': round(records / seconds, 1) if seconds else None
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            fn()
+            result['peakBytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_stages(size: int, memory: bool) -> Dict[str, Dict]:
+    stages: Dict[str, Dict] = {}
+    out: Dict[str, object] = {}
+
+    def timed(name: str, fn: Callable[[], object], records: int):
+        stages[name] = measure(fn, records, memory)
+        print(f"  {name:<26} {stages[name]['seconds']:>9.3f}s {stages[name]['throughput'] or 0:>12,.0f}/s"
+              + (f" {stages[name]['peakBytes'] / 2 ** 20:>9.1f} MiB" if 'peakBytes' in stages[name] else ''))
+
+    out['results'] = generate(size)
+    results = out['results']
+    timed('generate', lambda: generate(size), size)
+    timed('classify_job', lambda: [scrape_jobs.classify_job(r['title'], r['description']) for r in results], size)
+    timed('detect_visa_sponsorship',
+          lambda: [scrape_jobs.detect_visa_sponsorship(r['title'], r['description']) for r in results], size)
+
+    def build():
+        out['jobs'] = [scrape_jobs.build_job(r, r['_country']) for r in results]
+    timed('build_job', build, size)
+    jobs = out['jobs']
+
+    def dedupe():
+        out['unique'] = scrape_jobs.deduplicate_jobs(jobs)
+    timed('deduplicate_jobs', dedupe, size)
+
+    def near():
+        out['kept'] = collapse_near_duplicates(out['unique'], scrape_jobs.NEAR_DUPLICATE_THRESHOLD)[0]
+    timed('collapse_near_duplicates', near, len(out['unique']))
+    kept = out['kept']
+
+    timed('build_search_index', lambda: build_search_index(kept), len(kept))
+    timed('serialize_jobs_json', lambda: json.dumps({'jobs': kept}, indent=2, ensure_ascii=False), len(kept))
+    timed('write_json_stream', lambda: write_json_stream(os.path.join(tempfile.gettempdir(), 'jobmap-bench.json'),
+                                                         {'lastUpdate': ''}, 'jobs', kept), len(kept))
+    # Runs of 10k, so every size above that goes through the spill-and-merge path
+    timed('external_sort', lambda: sum(1 for _ in external_sort(
+        kept, key=corpus_order, chunk_size=10000)), len(kept))
+    timed('build_compact', lambda: json.dumps(build_compact(kept, ''), separators=(',', ':')), len(kept))
+
+    # Held corpus as loaded from the crawl state: one JSON document per job
+    lines = [json.dumps(job, ensure_ascii=False) for job in jobs]
+    timed('load_dicts', lambda: [json.loads(line) for line in lines], size)
+    timed('load_job_records', lambda: [JobRecord.from_dict(json.loads(line)) for line in lines], size)
+    if memory:
+        ratio = stages['load_dicts']['peakBytes'] / stages['load_job_records']['peakBytes']
+        print(f"  {'JobRecord memory saving':<26} {ratio:>9.2f}x")
+
+    stages['_counts'] = {'generated': size, 'unique': len(out['unique']), 'kept': len(kept)}
+    return stages
+
+
+def run_end_to_end(records: int, latency: float, rate_429: float, retry_after: float) -> Dict:
+    """Run scripts/scrape_jobs.py in a scratch copy of the project against the stub API"""
+    corpus = generate(records, seed=1)
+    server, base_url, stats = start_stub(corpus, latency=latency, rate_429=rate_429, retry_after=retry_after)
+    per_market = max(len(postings) for postings in by_country(corpus).values())
+
+    scratch = tempfile.mkdtemp(prefix='jobmap-bench-')
+    try:
+        shutil.copytree(SCRIPTS_DIR, os.path.join(scratch, 'scripts'),
+                        ignore=shutil.ignore_patterns('__pycache__'))
+        os.makedirs(os.path.join(scratch, 'data'))
+        env = dict(os.environ,
+                   ADZUNA_APP_ID='bench', ADZUNA_APP_KEY='bench', ADZUNA_API_BASE=base_url,
+                   ADZUNA_RATE_LIMIT='1000', ADZUNA_BURST='100',
+                   ADZUNA_MAX_PAGES=str(per_market // scrape_jobs.ADZUNA_PAGE_SIZE + 1),
+                   ADZUNA_DAILY_CALLS='1000000', HTTP_CACHE_MODE='off', PYTHONUNBUFFERED='1')
+        log_path = os.path.join(scratch, 'run.log')
+        started = time.perf_counter()
+        with open(log_path, 'w') as log:
+            process = subprocess.Popen([sys.executable, os.path.join(scratch, 'scripts', 'scrape_jobs.py')],
+                                       stdout=log, stderr=subprocess.STDOUT, env=env, cwd=scratch)
+            _, status, usage = os.wait4(process.pid, 0)
+        seconds = time.perf_counter() - started
+        with open(log_path) as log:
+            tail = log.read().splitlines()[-15:]
+        published = 0
+        if os.WEXITSTATUS(status) == 0:
+            with open(os.path.join(scratch, 'data', 'jobs.json')) as f:
+                published = len(json.load(f)['jobs'])
+    finally:
+        server.shutdown()
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    return {
+        'records': records,
+        'published': published,
+        'seconds': round(seconds, 3),
+        'throughput': round(records / seconds, 1),
+        'maxRssBytes': usage.ru_maxrss * 1024,  # KiB on Linux
+        'exitStatus': os.WEXITSTATUS(status),
+        'latency': latency,
+        'rate429': rate_429,
+        'stub': {'requests': stats.requests, 'throttled': stats.throttled},
+        'logTail': tail
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def previous_results(exclude: str) -> Optional[Dict]:
+    files = sorted(f for f in glob.glob(os.path.join(RESULTS_DIR, '*.json')) if f != exclude)
+    if not files:
+        return None
+    with open(files[-1]) as f:
+        return json.load(f)
+
+
+def compare(current: Dict, previous: Dict) -> List[str]:
+    """Throughput change per stage and size against an earlier run"""
+    lines = []
+    for size, stages in current['sizes'].items():
+        before = previous.get('sizes', {}).get(size, {})
+        for name, stage in stages.items():
+            old = before.get(name, {}).get('throughput')
+            if name.startswith('_') or not old or not stage.get('throughput'):
+                continue
+            change = (stage['throughput'] / old - 1) * 100
+            flag = '  <-- slower' if change < -10 else ''
+            lines.append(f"  {size:>8} {name:<26} {change:+6.1f}%{flag}")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1k,100k', help='comma-separated corpus sizes (e.g. 1k,100k,1m)')
+    parser.add_argument('--no-memory', action='store_true', help='skip the tracemalloc pass')
+    parser.add_argument('--e2e-records', type=parse_size, default=2000, help='0 skips the end-to-end run')
+    parser.add_argument('--latency', type=float, default=0.02, help='stub latency per request (s)')
+    parser.add_argument('--rate-429', type=float, default=0.05, help='share of stub requests throttled')
+    parser.add_argument('--retry-after', type=float, default=0.2)
+    parser.add_argument('--output', help='results file (default: benchmarks/results/<time>-<commit>.json)')
+    args = parser.parse_args()
+
+    commit = git_commit()
+    report = {
+        'version': RESULTS_VERSION,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'sizes': {}
+    }
+
+    # End to end first: a forked child's max RSS starts from the parent's, so
+    # measure before the in-process corpora have grown this process
+    if args.e2e_records:
+        print(f"\n🌐 End to end: {args.e2e_records:,} postings, {args.latency:g}s latency, "
+              f"{args.rate_429:.0%} throttled")
+        report['endToEnd'] = run_end_to_end(args.e2e_records, args.latency, args.rate_429, args.retry_after)
+        e2e = report['endToEnd']
+        print(f"  {e2e['seconds']:.2f}s, {e2e['published']:,} jobs published, "
+              f"max RSS {e2e['maxRssBytes'] / 2 ** 20:.0f} MiB, exit {e2e['exitStatus']}")
+
+    for size in [parse_size(s) for s in args.sizes.split(',') if s.strip()]:
+        print(f"\n📏 {size:,} records")
+        report['sizes'][str(size)] = run_stages(size, not args.no_memory)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Results saved: {output}")
+
+    previous = previous_results(output)
+    if previous:
+        print(f"\nThroughput vs {previous.get('commit')} ({previous.get('timestamp')}):")
+        for line in compare(report, previous) or ['  no common stages']:
+            print(line)
+
+
+if __name__ == '__main__':
+    main()
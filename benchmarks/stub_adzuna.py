@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Local stub of the Adzuna search API
+
+Serves /<country>/search/<page> from an in-memory corpus, newest first,
+with optional per-request latency and a share of 429 responses carrying
+Retry-After. Pages have an ETag and answer If-None-Match with 304.
+As on Adzuna, a result's redirect_url is a /land/ad/<id> link that redirects
+to the employer's page (here one without the description), while
+/details/<id> returns the posting page with the full description. Point the
+scraper at it with ADZUNA_API_BASE=http://127.0.0.1:<port>.
+
+    python benchmarks/stub_adzuna.py --records 5000 --latency 0.05 --rate-429 0.05
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlparse
+
+from corpus import by_country, generate
+
+
+class StubStats:
+    def __init__(self):
+        self.requests = 0
+        self.throttled = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def add(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+
+def make_handler(markets: Dict[str, List[Dict]], latency: float, rate_429: float,
+                 retry_after: float, seed: int, stats: StubStats):
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+    details = {r['id']: r for postings in markets.values() for r in postings}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive, like the real API
+
+        def log_message(self, *args):
+            pass
+
+        def send(self, status: int, body: bytes = b'', headers: Dict[str, str] = None):
+            self.send_response(status)
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            stats.add('requests')
+            if latency:
+                time.sleep(latency)
+            with rng_lock:
+                throttle = rng.random() < rate_429
+            if throttle:
+                stats.add('throttled')
+                self.send(429, b'{"error": "rate limited"}', {'Retry-After': f"{retry_after:g}"})
+                return
+
+            url = urlparse(self.path)
+            parts = url.path.strip('/').split('/')
+            base = f"http://{self.headers.get('Host')}"
+
+            if len(parts) >= 2 and parts[-2] == 'details':
+                posting = details.get(parts[-1])
+                if posting is None:
+                    self.send(404)
+                    return
+                body = (f"<html><body><h1>{html.escape(posting['title'])}</h1>"
+                        f"<div class=\"adp-body\">{html.escape(posting['description'])}</div>"
+                        f"</body></html>").encode('utf-8')
+                self.send(200, body, {'Content-Type': 'text/html; charset=utf-8'})
+                return
+            if len(parts) >= 3 and parts[-3:-1] == ['land', 'ad']:
+                self.send(302, headers={'Location': f"{base}/apply/{parts[-1]}"})
+                return
+            if len(parts) == 2 and parts[0] == 'apply':
+                self.send(200, b'<html><body><p>Apply on our careers site.</p></body></html>',
+                          {'Content-Type': 'text/html; charset=utf-8'})
+                return
+
+            if len(parts) < 3 or parts[-2] != 'search':
+                self.send(404)
+                return
+            country, page = parts[-3], int(parts[-1])
+            per_page = int(parse_qs(url.query).get('results_per_page', ['50'])[0])
+            postings = markets.get(country, [])
+            window = postings[(page - 1) * per_page:page * per_page]
+            results = [{k: v for k, v in r.items() if not k.startswith('_')} for r in window]
+            for result in results:
+                result['redirect_url'] = f"{base}/jobs/land/ad/{result['id']}?se=stub&v=1"
+            body = json.dumps({'count': len(postings), 'results': results}).encode('utf-8')
+
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            if self.headers.get('If-None-Match') == etag:
+                stats.add('not_modified')
+                self.send(304, headers={'ETag': etag})
+                return
+            self.send(200, body, {'Content-Type': 'application/json', 'ETag': etag})
+
+    return Handler
+
+
+def start(results: List[Dict], port: int = 0, latency: float = 0.0, rate_429: float = 0.0,
+          retry_after: float = 1.0, seed: int = 0):
+    """Serve `results` on a background thread; returns (server, base_url, stats)"""
+    stats = StubStats()
+    handler = make_handler(by_country(results), latency, rate_429, retry_after, seed, stats)
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--records', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds added to every response')
+    parser.add_argument('--rate-429', type=float, default=0.0, help='share of requests answered with 429')
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    server, base_url, _ = start(generate(args.records, args.seed), args.port, args.latency,
+                                args.rate_429, args.retry_after, args.seed)
+    print(f"Stub Adzuna API on {base_url} ({args.records} postings)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,9 @@
-// Global variables
+// Global variables (needs js/corpus.js loaded first)
 let allJobs = [];
 let filteredJobs = [];
+let searchIndex = null; // data/search_index.json - optional, filtering falls back to a full scan
+let aggregates = null;  // data/aggregates.json - optional facet counts and posted sort keys
+let postedKeys = null;  // job -> numeric posted sort key from the aggregates
 let currentSort = { column: 'posted', direction: 'desc' };
 
 // Initialize the application
@@ -12,13 +15,18 @@ document.addEventListener('DOMContentLoaded', function() {
 // Load jobs data
 async function loadJobs() {
     try {
-        const response = await fetch('data/jobs.json');
-        const data = await response.json();
+        const data = await loadCorpus();
         allJobs = data.jobs;
         filteredJobs = [...allJobs];
+        searchIndex = await loadSearchIndex(allJobs.length);
+        aggregates = await loadAggregates(allJobs.length);
+        if (aggregates) {
+            postedKeys = new Map(allJobs.map((job, i) => [job, aggregates.posted.keys[i]]));
+        }
         updateLastUpdate(data.lastUpdate);
         sortJobs(currentSort.column, currentSort.direction);
         renderJobs();
+        updateFilterCounts();
     } catch (error) {
         console.error('Error loading jobs:', error);
         document.getElementById('jobsBody').innerHTML = `
@@ -32,6 +40,90 @@ async function loadJobs() {
     }
 }
 
+// Load the prebuilt search index, if it matches the loaded jobs
+async function loadSearchIndex(jobCount) {
+    try {
+        const response = await fetch('data/search_index.json');
+        if (!response.ok) return null;
+        const index = await response.json();
+        if (index.version !== 1 || index.count !== jobCount) return null;
+        
+        // Expand delta-encoded postings and base64 bitmaps once
+        index.postings = index.postings.map(deltas => {
+            let current = 0;
+            return deltas.map(delta => (current += delta));
+        });
+        Object.values(index.facets).forEach(values => {
+            Object.keys(values).forEach(value => {
+                values[value] = Uint8Array.from(atob(values[value]), c => c.charCodeAt(0));
+            });
+        });
+        return index;
+    } catch (error) {
+        console.warn('Search index unavailable, using full scan:', error);
+        return null;
+    }
+}
+
+// Load the precomputed facet counts, if they match the loaded jobs
+async function loadAggregates(jobCount) {
+    try {
+        const response = await fetch('data/aggregates.json');
+        if (!response.ok) return null;
+        const data = await response.json();
+        if (data.v !== 1 || data.count !== jobCount) return null;
+        return data;
+    } catch (error) {
+        console.warn('Aggregates unavailable, sorting by parsed dates:', error);
+        return null;
+    }
+}
+
+// Job count per value of one aggregates dimension, among cube cells matching `where`
+function facetCounts(dimension, where) {
+    const dims = aggregates.dimensions;
+    const axis = dims.indexOf(dimension);
+    const wanted = Object.entries(where)
+        .filter(([, value]) => value)
+        .map(([name, value]) => [dims.indexOf(name), value]);
+    const counts = {};
+    aggregates.cube.forEach(row => {
+        if (wanted.every(([i, value]) => aggregates.values[dims[i]][row[i]] === value)) {
+            const value = aggregates.values[dimension][row[axis]];
+            counts[value] = (counts[value] || 0) + row[row.length - 1];
+        }
+    });
+    return counts;
+}
+
+// Show how many jobs each filter option would leave, given the other filters.
+// Counts come from the cube, so they cover the dropdowns only - hidden while searching.
+function updateFilterCounts() {
+    if (!aggregates) return;
+    const filters = {
+        type: document.getElementById('jobType'),
+        level: document.getElementById('level'),
+        locationType: document.getElementById('location'),
+        clearance: document.getElementById('clearance')
+    };
+    const searching = document.getElementById('search').value !== '';
+    
+    for (const [dimension, select] of Object.entries(filters)) {
+        const where = {};
+        Object.entries(filters).forEach(([other, otherSelect]) => {
+            if (other !== dimension) where[other] = otherSelect.value;
+        });
+        const counts = searching ? {} : facetCounts(dimension, where);
+        Array.from(select.options).forEach(option => {
+            if (!option.value) return;
+            option.dataset.label = option.dataset.label || option.textContent;
+            option.textContent = searching
+                ? option.dataset.label
+                : `${option.dataset.label} (${counts[option.value] || 0})`;
+        });
+    }
+}
+
 // Setup event listeners
 function setupEventListeners() {
     // Search input
@@ -66,6 +158,13 @@ function filterJobs() {
     const location = document.getElementById('location').value;
     const clearance = document.getElementById('clearance').value;
     
+    if (searchIndex) {
+        filteredJobs = filterWithIndex(searchTerm, { type: jobType, level, locationType: location, clearance });
+        renderJobs();
+        updateFilterCounts();
+        return;
+    }
+    
     filteredJobs = allJobs.filter(job => {
         // Search filter
         const matchesSearch = !searchTerm || 
@@ -91,6 +190,95 @@ function filterJobs() {
     });
     
     renderJobs();
+    updateFilterCounts();
+}
+
+// Same selection as the full scan in filterJobs, via posting-list intersection
+function filterWithIndex(searchTerm, facets) {
+    const count = searchIndex.count;
+    let selected = new Uint8Array((count + 7) >> 3).fill(0xff);
+    
+    for (const [facet, wanted] of Object.entries(facets)) {
+        if (!wanted) continue;
+        const bitmap = searchIndex.facets[facet][wanted];
+        if (!bitmap) return [];
+        selected = selected.map((byte, i) => byte & bitmap[i]);
+    }
+    
+    // Each planned query token must match some vocabulary token of a matching job
+    let candidates = null;
+    for (const [queryToken, lookup] of queryPlan(searchTerm)) {
+        const matching = new Set();
+        vocabularyMatches(searchIndex.tokens, queryToken, lookup).forEach(i => {
+            searchIndex.postings[i].forEach(ordinal => matching.add(ordinal));
+        });
+        candidates = candidates ? new Set([...candidates].filter(o => matching.has(o))) : matching;
+        if (candidates.size === 0) return [];
+    }
+    
+    const ordinals = candidates
+        ? [...candidates].sort((a, b) => a - b)
+        : [...Array(count).keys()];
+    
+    return ordinals
+        .filter(i => selected[i >> 3] & (1 << (i & 7)))
+        .map(i => allJobs[i])
+        .filter(job => !searchTerm ||
+            job.title.toLowerCase().includes(searchTerm) ||
+            job.company.toLowerCase().includes(searchTerm) ||
+            (job.description && job.description.toLowerCase().includes(searchTerm)));
+}
+
+// Same as query_plan in scripts/search_index.py: a token between separators is a
+// whole word, one ending the term a word prefix; only a lone leading token may
+// start mid-word and needs the substring scan. A leading token followed by
+// others is left to them and the exact check.
+function queryPlan(searchTerm) {
+    const runs = searchTerm.match(/[\p{L}\p{N}]+|[^\p{L}\p{N}]+/gu) || [];
+    const words = runs.map((run, i) => /^[\p{L}\p{N}]/u.test(run) ? i : -1).filter(i => i >= 0);
+    const plan = [];
+    for (const i of words) {
+        if (i === 0) {
+            if (words.length === 1) plan.push([runs[i], 'substring']);
+        } else if (i === runs.length - 1) {
+            plan.push([runs[i], 'prefix']);
+        } else {
+            plan.push([runs[i], 'exact']);
+        }
+    }
+    return plan;
+}
+
+// Code point order, as Python sorts the vocabulary (plain < compares UTF-16 units)
+function compareCodePoints(a, b) {
+    for (let i = 0; ; ) {
+        const x = a.codePointAt(i);
+        const y = b.codePointAt(i);
+        if (x === undefined || y === undefined) return (x === undefined ? 0 : 1) - (y === undefined ? 0 : 1);
+        if (x !== y) return x - y;
+        i += x > 0xffff ? 2 : 1;
+    }
+}
+
+// Vocabulary positions for one planned lookup: bisect to the token or prefix range
+function vocabularyMatches(tokens, token, lookup) {
+    if (lookup === 'substring') {
+        return tokens.reduce((found, candidate, i) => {
+            if (candidate.includes(token)) found.push(i);
+            return found;
+        }, []);
+    }
+    let lo = 0;
+    let hi = tokens.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (compareCodePoints(tokens[mid], token) < 0) lo = mid + 1;
+        else hi = mid;
+    }
+    if (lookup === 'exact') return tokens[lo] === token ? [lo] : [];
+    const found = [];
+    for (let i = lo; i < tokens.length && tokens[i].startsWith(token); i++) found.push(i);
+    return found;
 }
 
 // Clear all filters
@@ -103,6 +291,7 @@ function clearFilters() {
     
     filteredJobs = [...allJobs];
     renderJobs();
+    updateFilterCounts();
 }
 
 // Sort jobs
@@ -113,8 +302,11 @@ function sortJobs(column, direction) {
         let aVal = a[column] || '';
         let bVal = b[column] || '';
         
-        // Handle date sorting
-        if (column === 'posted') {
+        // Handle date sorting - precomputed numeric keys when available
+        if (column === 'posted' && postedKeys) {
+            aVal = postedKeys.get(a);
+            bVal = postedKeys.get(b);
+        } else if (column === 'posted') {
             aVal = new Date(aVal);
             bVal = new Date(bVal);
         }
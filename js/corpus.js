@@ -0,0 +1,185 @@
+// JOBMAP - corpus loading shared by the pages
+//
+// data/manifest.json names the compact columnar corpus (jobs.<hash>.min.json,
+// plus a gzip copy). It is fetched instead of the indent=2 data/jobs.json and
+// expanded into the same records in the same order, so search index ordinals
+// and aggregate sort keys still line up. Without a manifest or compact file
+// the pages fall back to jobs.json.
+//
+// The expanded corpus is kept in localStorage. On the next visit a copy whose
+// lastUpdate is in data/deltas/index.json is caught up by applying the deltas
+// from there on (port of publish.apply_delta), checked against the manifest's
+// orderHash; only if that fails is the compact corpus downloaded again.
+
+const CORPUS_STORAGE_KEY = 'jobmap.corpus';
+
+// Same fields as scripts/publish.py DICTIONARY_FIELDS
+const COMPACT_DICTIONARY_FIELDS = ['company', 'location', 'countryCode', 'country', 'city', 'locationType',
+                                   'type', 'level', 'clearance', 'visaSponsorship'];
+
+// Fetch data/manifest.json, or null for deployments that only publish jobs.json
+async function fetchManifest() {
+    try {
+        const response = await fetch('data/manifest.json', { cache: 'no-cache' });
+        return response.ok ? await response.json() : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+// Rebuild jobs.json records from the compact document (port of publish.expand_compact)
+function expandCompact(doc) {
+    const booleans = new Set(doc.bool);
+    const dictionaryFields = new Set(COMPACT_DICTIONARY_FIELDS);
+    const jobs = new Array(doc.count);
+    for (let row = 0; row < doc.count; row++) {
+        const job = {};
+        doc.fields.forEach(field => {
+            let value = doc.cols[field][row];
+            if (value === null) return;
+            if (dictionaryFields.has(field)) {
+                value = doc.dict[field][value];
+            } else if (field === 'locationRestrictions') {
+                value = value.map(code => doc.dict[field][code]);
+            } else if (booleans.has(field)) {
+                value = Boolean(value);
+            }
+            job[field] = value;
+        });
+        jobs[row] = job;
+    }
+    return jobs;
+}
+
+// The compact document: the gzip copy, decompressed here when the browser can, else the plain file
+async function fetchCompact(entry) {
+    if (entry.gzip && typeof DecompressionStream === 'function') {
+        try {
+            const response = await fetch(`data/${entry.gzip}`);
+            if (response.ok) {
+                const stream = response.body.pipeThrough(new DecompressionStream('gzip'));
+                return JSON.parse(await new Response(stream).text());
+            }
+        } catch (error) {
+            // e.g. a server that already decoded it (Content-Encoding: gzip)
+        }
+    }
+    const response = await fetch(`data/${entry.json}`);
+    if (!response.ok) {
+        throw new Error(`${entry.json}: HTTP ${response.status}`);
+    }
+    return response.json();
+}
+
+// Seconds since the epoch of a posted value, 0 if missing or unparsable (port of spill.posted_epoch)
+function postedEpoch(posted) {
+    if (!posted) return 0;
+    const text = String(posted).trim();
+    const iso = /^(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2})(?::(\d{2})(?::(\d{2})(?:\.\d+)?)?)?(Z|[+-]\d{2}:?\d{2})?)?$/.exec(text);
+    const date = iso || /^(\d{4})-(\d{2})-(\d{2})/.exec(text);
+    if (!date) return 0;
+    const [, year, month, day, hour = 0, minute = 0, second = 0, zone] = iso || date;
+    let epoch = Date.UTC(+year, month - 1, +day, +hour, +minute, +second) / 1000;
+    if (zone && zone !== 'Z') {
+        const offset = zone.replace(':', '');
+        epoch -= (offset[0] === '-' ? -1 : 1) * (offset.slice(1, 3) * 3600 + offset.slice(3, 5) * 60);
+    }
+    return Number.isNaN(epoch) ? 0 : epoch;
+}
+
+// Sort jobs in published order (publish.corpus_order): newest posting first, then by job id
+function sortCorpus(jobs) {
+    const epochs = new Map(jobs.map(job => [job, postedEpoch(job.posted)]));
+    return jobs.sort((a, b) => (epochs.get(b) - epochs.get(a)) || (a.id < b.id ? -1 : a.id > b.id ? 1 : 0));
+}
+
+// Bring a corpus up to date with one delta file (port of publish.apply_delta)
+function applyDelta(jobs, delta) {
+    const gone = new Set(delta.removed);
+    delta.updated.forEach(job => gone.add(job.id));
+    const merged = jobs.filter(job => !gone.has(job.id));
+    merged.push(...delta.updated, ...delta.added);
+    return sortCorpus(merged);
+}
+
+// Same as publish.order_hash: first 16 hex digits of SHA-256 over the ids in order
+async function orderHash(jobs) {
+    const bytes = new TextEncoder().encode(jobs.map(job => job.id).join('\n'));
+    const digest = new Uint8Array(await crypto.subtle.digest('SHA-256', bytes));
+    return Array.from(digest.slice(0, 8), b => b.toString(16).padStart(2, '0')).join('');
+}
+
+function readStoredCorpus() {
+    try {
+        const stored = JSON.parse(localStorage.getItem(CORPUS_STORAGE_KEY));
+        return stored && stored.lastUpdate && Array.isArray(stored.jobs) ? stored : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+function storeCorpus(corpus) {
+    try {
+        localStorage.setItem(CORPUS_STORAGE_KEY, JSON.stringify(corpus));
+    } catch (error) {
+        // Over the storage quota (or storage disabled): the next visit downloads again
+        try { localStorage.removeItem(CORPUS_STORAGE_KEY); } catch (ignored) {}
+    }
+}
+
+// The stored corpus caught up to the manifest through the delta feed, or null if it cannot be
+async function catchUp(corpus, manifest) {
+    if (!manifest.orderHash || !(globalThis.crypto && crypto.subtle)) return null;
+    try {
+        const response = await fetch('data/deltas/index.json', { cache: 'no-cache' });
+        if (!response.ok) return null;
+        const feed = await response.json();
+        if (feed.v !== 1 || feed.latest !== manifest.lastUpdate) return null;
+        const start = feed.deltas.findIndex(entry => entry.from === corpus.lastUpdate);
+        if (start < 0 || corpus.jobs.some(job => !job.id)) return null;
+        
+        let { lastUpdate, jobs } = corpus;
+        for (const entry of feed.deltas.slice(start)) {
+            if (entry.from !== lastUpdate) return null;
+            const delta = await fetch(`data/${entry.file}`).then(r => r.ok ? r.json() : null);
+            if (!delta || delta.v !== 1) return null;
+            jobs = applyDelta(jobs, delta);
+            lastUpdate = entry.to;
+        }
+        if (lastUpdate !== manifest.lastUpdate || await orderHash(jobs) !== manifest.orderHash) return null;
+        return { lastUpdate, jobs };
+    } catch (error) {
+        return null;
+    }
+}
+
+// {lastUpdate, jobs} in data/jobs.json order; pass the manifest if it is already loaded
+async function loadCorpus(manifest) {
+    if (manifest === undefined) {
+        manifest = await fetchManifest();
+    }
+    if (manifest && manifest.compact) {
+        const stored = readStoredCorpus();
+        if (stored && stored.lastUpdate === manifest.lastUpdate) {
+            return stored;
+        }
+        const caughtUp = stored && await catchUp(stored, manifest);
+        if (caughtUp) {
+            storeCorpus(caughtUp);
+            return caughtUp;
+        }
+        try {
+            const doc = await fetchCompact(manifest.compact);
+            if (doc.v === 1) {
+                const corpus = { lastUpdate: doc.lastUpdate, jobs: expandCompact(doc) };
+                storeCorpus(corpus);
+                return corpus;
+            }
+        } catch (error) {
+            console.warn('Compact corpus unavailable, loading jobs.json:', error);
+        }
+    }
+    const response = await fetch('data/jobs.json');
+    const data = await response.json();
+    return { lastUpdate: data.lastUpdate, jobs: data.jobs };
+}
@@ -1,6 +1,15 @@
-// World Map with Country Selection - Global Edition
+// World Map with Country Selection - Global Edition (needs js/corpus.js loaded first)
 let map;
 let allJobs = [];
+let allJobsLoaded = false;
+let manifest = null;       // data/manifest.json - counts per country, shards loaded on demand
+let aggregates = null;     // data/aggregates.json - precomputed facet counts
+let tileIndex = null;      // data/tiles/index.json - non-empty cluster tiles per zoom
+let tileCache = {};        // quadkey -> tile
+let clusterLayer = null;   // markers for the clusters in view
+let jobCounts = {};        // GeoJSON country name -> job count
+let shardCache = {};       // shard path -> jobs
+let currentJobs = [];      // jobs currently on screen
 let selectedCountry = null;
 let countryLayers = {};
 let currentView = 'card'; // 'card' or 'list'
@@ -268,6 +277,14 @@ const cityToCountry = {
     'Casablanca': 'Morocco'
 };
 
+// Country of a job - resolved by the scraper, parsed from the location only for older data
+function jobCountry(job) {
+    if (job.countryCode !== undefined) {
+        return job.country || 'Remote';
+    }
+    return extractCountry(job.location);
+}
+
 // Extract country from location string
 function extractCountry(location) {
     if (!location) return 'United States of America';
@@ -325,18 +342,45 @@ function initMap() {
         noWrap: false
     }).addTo(map);
     
+    clusterLayer = L.layerGroup().addTo(map);
+    map.on('moveend', updateClusters);
+    
     loadJobsAndCountries();
 }
 
+// Fetch a JSON file, failing on HTTP errors
+async function fetchJson(url) {
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error(`${url}: HTTP ${response.status}`);
+    }
+    return response.json();
+}
+
 // Load jobs and set up country layers
 async function loadJobsAndCountries() {
     try {
-        const response = await fetch('data/jobs.json');
-        const data = await response.json();
-        allJobs = data.jobs;
+        manifest = await fetchJson('data/manifest.json');
+    } catch (error) {
+        // Older deployments only publish jobs.json
+        manifest = null;
+    }
+    aggregates = await loadAggregates();
+    
+    try {
+        if (aggregates) {
+            jobCounts = countJobsFromAggregates();
+        } else if (manifest) {
+            jobCounts = countJobsFromManifest();
+        } else {
+            await loadAllJobs();
+            jobCounts = countJobsByCountry(allJobs);
+        }
         
         updateGlobalStats();
         await loadCountryBoundaries();
+        await loadTileIndex();
+        updateClusters();
         
     } catch (error) {
         console.error('Error loading jobs:', error);
@@ -344,22 +388,233 @@ async function loadJobsAndCountries() {
     }
 }
 
-// Update global statistics
-function updateGlobalStats() {
-    const totalJobs = allJobs.length;
-    const remoteJobs = allJobs.filter(j => j.locationType === 'remote').length;
-    const companies = new Set(allJobs.map(j => j.company)).size;
+// Load the full job list (only needed for "all" and "remote" views), compact when published
+async function loadAllJobs() {
+    if (!allJobsLoaded) {
+        const data = await loadCorpus(manifest);
+        allJobs = data.jobs;
+        allJobsLoaded = true;
+    }
+    return allJobs;
+}
+
+// Load the precomputed facet counts; optional, counting falls back to the manifest or job records
+async function loadAggregates() {
+    try {
+        const entry = manifest && manifest.aggregates;
+        const data = await fetchJson(entry ? `data/${entry.file}?v=${entry.hash}` : 'data/aggregates.json');
+        return data.v === 1 ? data : null;
+    } catch (error) {
+        return null;
+    }
+}
+
+// Job count per value of one aggregates dimension, among cube cells matching `where`
+function facetCounts(dimension, where = {}) {
+    const dims = aggregates.dimensions;
+    const axis = dims.indexOf(dimension);
+    const wanted = Object.entries(where)
+        .filter(([, value]) => value)
+        .map(([name, value]) => [dims.indexOf(name), value]);
+    const counts = {};
+    aggregates.cube.forEach(row => {
+        if (wanted.every(([i, value]) => aggregates.values[dims[i]][row[i]] === value)) {
+            const value = aggregates.values[dimension][row[axis]];
+            counts[value] = (counts[value] || 0) + row[row.length - 1];
+        }
+    });
+    return counts;
+}
+
+// Count jobs per GeoJSON country name from the aggregates cube
+function countJobsFromAggregates(where = {}) {
+    const counts = {};
+    Object.entries(facetCounts('country', where)).forEach(([code, count]) => {
+        // Remote and unresolved jobs are not a country
+        if (code === 'other') return;
+        const name = aggregates.countryNames[code];
+        const country = countryMapping[name] || name;
+        counts[country] = (counts[country] || 0) + count;
+    });
+    return counts;
+}
+
+// Load the cluster tile index; without it the map only colours countries
+async function loadTileIndex() {
+    try {
+        const path = manifest && manifest.tiles ? manifest.tiles.index : 'tiles/index.json';
+        const index = await fetchJson(`data/${path}`);
+        tileIndex = index.v === 1 ? index : null;
+    } catch (error) {
+        tileIndex = null;
+    }
+}
+
+// Web Mercator tile column/row of a point (wrapped around the antimeridian)
+function tileXY(lat, lng, zoom) {
+    const size = 1 << zoom;
+    lat = Math.min(Math.max(lat, -85.05112878), 85.05112878);
+    const sinLat = Math.sin(lat * Math.PI / 180);
+    const x = Math.floor((lng + 180) / 360 * size);
+    const y = Math.floor((0.5 - Math.log((1 + sinLat) / (1 - sinLat)) / (4 * Math.PI)) * size);
+    return [x, Math.min(Math.max(y, 0), size - 1)];
+}
+
+function quadkey(x, y, zoom) {
+    const size = 1 << zoom;
+    x = ((x % size) + size) % size;
+    let key = '';
+    for (let level = zoom; level > 0; level--) {
+        const mask = 1 << (level - 1);
+        key += ((x & mask) ? 1 : 0) + ((y & mask) ? 2 : 0);
+    }
+    return key;
+}
+
+// Draw the clusters of the published tiles in view, at the deepest tile zoom not above the map's
+async function updateClusters() {
+    if (!tileIndex) return;
+    const zoom = Math.round(map.getZoom());
+    const tileZoom = tileIndex.zooms.filter(z => z <= zoom).pop();
+    if (tileZoom === undefined) {
+        clusterLayer.clearLayers();
+        return;
+    }
+    
+    const bounds = map.getBounds();
+    const [x0, y0] = tileXY(bounds.getNorth(), bounds.getWest(), tileZoom);
+    const [x1, y1] = tileXY(bounds.getSouth(), bounds.getEast(), tileZoom);
+    const keys = new Set();
+    for (let x = x0; x <= Math.min(x1, x0 + (1 << tileZoom) - 1); x++) {
+        for (let y = y0; y <= y1; y++) {
+            const key = quadkey(x, y, tileZoom);
+            if (tileIndex.tiles[key]) keys.add(key);
+        }
+    }
     
-    const countries = new Set();
-    allJobs.forEach(job => {
-        const country = extractCountry(job.location);
+    const tiles = await Promise.all([...keys].map(async key => {
+        if (!tileCache[key]) {
+            tileCache[key] = fetchJson(`data/tiles/${key}.json?v=${tileIndex.tiles[key].hash}`)
+                .catch(error => {
+                    delete tileCache[key];
+                    throw error;
+                });
+        }
+        return tileCache[key];
+    })).catch(error => {
+        console.error('Error loading map tiles:', error);
+        return [];
+    });
+    
+    // A later move may have finished first
+    if (Math.round(map.getZoom()) !== zoom) return;
+    clusterLayer.clearLayers();
+    tiles.forEach(tile => tile.clusters.forEach(cluster => {
+        L.circleMarker([cluster.lat, cluster.lon], {
+            radius: 5 + 3 * Math.log2(cluster.count),
+            color: 'white',
+            weight: 1,
+            fillColor: '#e74c3c',
+            fillOpacity: 0.8
+        })
+            .bindTooltip(`${cluster.count} job${cluster.count !== 1 ? 's' : ''} here`)
+            .on('click', () => showClusterJobs(cluster))
+            .addTo(clusterLayer);
+    }));
+}
+
+// Jobs of one country shard by lowercase ISO code
+async function getShardJobs(code) {
+    const entry = manifest.countries[code];
+    if (!entry) return [];
+    if (!shardCache[entry.shard]) {
+        const data = await fetchJson(`data/${entry.shard}?v=${entry.hash}`);
+        shardCache[entry.shard] = data.jobs;
+    }
+    return shardCache[entry.shard];
+}
+
+// Show a cluster's newest jobs, fetched from its countries' shards
+async function showClusterJobs(cluster) {
+    const ids = new Set(cluster.ids);
+    let jobs = [];
+    try {
+        const pool = manifest
+            ? (await Promise.all(cluster.countries.map(getShardJobs))).flat()
+            : await loadAllJobs();
+        jobs = pool.filter(job => ids.has(job.id));
+    } catch (error) {
+        console.error('Error loading cluster jobs:', error);
+    }
+    
+    selectedCountry = null;
+    document.getElementById('countryName').textContent =
+        cluster.count > jobs.length ? `Newest ${jobs.length} of ${cluster.count} jobs here` : 'Jobs here';
+    document.getElementById('countryJobCount').textContent = cluster.count;
+    document.getElementById('selectedCountryBanner').classList.add('active');
+    displayJobs(jobs);
+}
+
+// Count jobs per GeoJSON country name from the manifest
+function countJobsFromManifest() {
+    const counts = {};
+    Object.entries(manifest.countries).forEach(([code, entry]) => {
+        // Remote and unresolved jobs are not a country
+        if (code === 'other') return;
+        const country = countryMapping[entry.name] || entry.name;
+        counts[country] = (counts[country] || 0) + entry.count;
+    });
+    return counts;
+}
+
+// Count jobs per GeoJSON country name from job records
+function countJobsByCountry(jobs) {
+    const counts = {};
+    jobs.forEach(job => {
+        const country = jobCountry(job);
         if (country !== 'Remote') {
-            countries.add(country);
+            counts[country] = (counts[country] || 0) + 1;
         }
     });
+    return counts;
+}
+
+// Jobs for one country - a single shard fetch when a manifest is available
+async function getCountryJobs(countryName) {
+    if (!manifest) {
+        return allJobs.filter(job => jobCountry(job) === countryName);
+    }
+    
+    const shards = Object.entries(manifest.countries)
+        .filter(([, entry]) => (countryMapping[entry.name] || entry.name) === countryName);
+    
+    const jobs = [];
+    for (const [code] of shards) {
+        jobs.push(...await getShardJobs(code));
+    }
+    return jobs;
+}
+
+// Update global statistics
+function updateGlobalStats() {
+    let totalJobs, remoteJobs, companies;
+    
+    if (aggregates) {
+        totalJobs = aggregates.count;
+        remoteJobs = aggregates.remoteJobs;
+        companies = aggregates.companies;
+    } else if (manifest) {
+        totalJobs = manifest.totalJobs;
+        remoteJobs = manifest.remoteJobs;
+        companies = manifest.companies;
+    } else {
+        totalJobs = allJobs.length;
+        remoteJobs = allJobs.filter(j => j.locationType === 'remote').length;
+        companies = new Set(allJobs.map(j => j.company)).size;
+    }
     
     document.getElementById('totalJobs').textContent = totalJobs;
-    document.getElementById('totalCountries').textContent = countries.size;
+    document.getElementById('totalCountries').textContent = Object.keys(jobCounts).length;
     document.getElementById('remoteJobs').textContent = remoteJobs;
     document.getElementById('companiesHiring').textContent = companies;
 }
@@ -370,13 +625,7 @@ async function loadCountryBoundaries() {
         const response = await fetch('https://raw.githubusercontent.com/johan/world.geo.json/master/countries.geo.json');
         const geojson = await response.json();
         
-        const jobsByCountry = {};
-        allJobs.forEach(job => {
-            const country = extractCountry(job.location);
-            if (country !== 'Remote') {
-                jobsByCountry[country] = (jobsByCountry[country] || 0) + 1;
-            }
-        });
+        const jobsByCountry = jobCounts;
         
         console.log('Jobs by country:', jobsByCountry);
         
@@ -440,13 +689,15 @@ function getCountryColor(jobCount) {
 }
 
 // Select a country and show its jobs
-function selectCountry(countryName) {
+async function selectCountry(countryName) {
     selectedCountry = countryName;
     
-    const countryJobs = allJobs.filter(job => {
-        const jobCountry = extractCountry(job.location);
-        return jobCountry === countryName;
-    });
+    let countryJobs = [];
+    try {
+        countryJobs = await getCountryJobs(countryName);
+    } catch (error) {
+        console.error('Error loading country jobs:', error);
+    }
     
     document.getElementById('countryName').textContent = countryName;
     document.getElementById('countryJobCount').textContent = countryJobs.length;
@@ -488,12 +739,8 @@ function clearCountrySelection() {
     map.setView([30, 0], 2);
     
     Object.entries(countryLayers).forEach(([name, layer]) => {
-        const jobCount = allJobs.filter(job => 
-            extractCountry(job.location) === name
-        ).length;
-        
         layer.setStyle({
-            fillColor: getCountryColor(jobCount),
+            fillColor: getCountryColor(jobCounts[name] || 0),
             weight: 1,
             color: 'white',
             fillOpacity: 0.7
@@ -516,19 +763,8 @@ function switchView(view) {
         }
     });
     
-    // Determine which jobs to display
-    let jobsToDisplay = [];
-    
-    if (selectedCountry === 'All Countries') {
-        jobsToDisplay = allJobs;
-    } else if (selectedCountry === 'Remote Positions') {
-        jobsToDisplay = allJobs.filter(job => job.locationType === 'remote');
-    } else {
-        jobsToDisplay = allJobs.filter(job => {
-            const jobCountry = extractCountry(job.location);
-            return jobCountry === selectedCountry;
-        });
-    }
+    // Redisplay whatever is currently selected
+    const jobsToDisplay = currentJobs;
     
     // Display in selected view
     if (view === 'card') {
@@ -544,6 +780,7 @@ function switchView(view) {
 
 // Display jobs in grid
 function displayJobs(jobs) {
+    currentJobs = jobs;
     if (currentView === 'card') {
         displayJobsGrid(jobs);
     } else {
@@ -695,8 +932,9 @@ function escapeHtml(text) {
 }
 
 // Show all jobs (when clicking total jobs stat)
-function showAllJobs() {
+async function showAllJobs() {
     selectedCountry = 'All Countries';
+    await loadAllJobs();
     
     document.getElementById('countryName').textContent = 'All Countries';
     document.getElementById('countryJobCount').textContent = allJobs.length;
@@ -707,12 +945,8 @@ function showAllJobs() {
     
     // Reset all country styles
     Object.entries(countryLayers).forEach(([name, layer]) => {
-        const jobCount = allJobs.filter(job => 
-            extractCountry(job.location) === name
-        ).length;
-        
         layer.setStyle({
-            fillColor: getCountryColor(jobCount),
+            fillColor: getCountryColor(jobCounts[name] || 0),
             weight: 1,
             color: 'white',
             fillOpacity: 0.7
@@ -730,8 +964,9 @@ function showAllJobs() {
 }
 
 // Show only remote jobs (when clicking remote positions stat)
-function showRemoteJobs() {
+async function showRemoteJobs() {
     selectedCountry = 'Remote Positions';
+    await loadAllJobs();
     
     const remoteJobs = allJobs.filter(job => job.locationType === 'remote');
     
@@ -743,12 +978,11 @@ function showRemoteJobs() {
     map.setView([30, 0], 2);
     
     // Highlight countries with remote jobs
+    const remoteCounts = aggregates
+        ? countJobsFromAggregates({ locationType: 'remote' })
+        : countJobsByCountry(remoteJobs);
     Object.entries(countryLayers).forEach(([name, layer]) => {
-        const countryRemoteJobs = remoteJobs.filter(job => 
-            extractCountry(job.location) === name
-        ).length;
-        
-        if (countryRemoteJobs > 0) {
+        if (remoteCounts[name] > 0) {
             layer.setStyle({
                 fillColor: '#27ae60',
                 weight: 2,
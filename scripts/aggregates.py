@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Precomputed facet counts for the map and the job table
+
+js/world-map.js used to count jobs per country (and remote jobs) from the
+job records on every load, and js/app.js re-parsed every `posted` date to
+sort. data/aggregates.json carries those numbers instead:
+
+- a sparse count cube over country × type × level × locationType ×
+  clearance × visaSponsorship: one row of value indexes plus a count per
+  combination that occurs. Any tooltip, colour or filter count is a sum over
+  the rows matching the selected values, without touching a job record.
+- a numeric posted sort key per job, in data/jobs.json order: seconds after
+  the oldest posting, -1 when the date is missing or unparsable (so those
+  sort last in the default newest-first order, as in the scraper).
+"""
+
+from typing import Callable, Dict, Iterable, Optional
+
+from search_index import facet_value
+from spill import posted_epoch
+
+AGGREGATES_VERSION = 1
+DIMENSIONS = ('country', 'type', 'level', 'locationType', 'clearance', 'visaSponsorship')
+
+
+def build_aggregates(jobs: Iterable[Dict], country_of: Callable[[Dict], str],
+                     country_names: Dict[str, str]) -> Dict:
+    """One pass over `jobs` (in jobs.json order), so it can be a stream"""
+    values: Dict[str, list] = {dimension: [] for dimension in DIMENSIONS}
+    positions: Dict[str, Dict[str, int]] = {dimension: {} for dimension in DIMENSIONS}
+    cells: Dict[tuple, int] = {}
+    companies = set()
+    epochs = []
+
+    for job in jobs:
+        cell = []
+        for dimension in DIMENSIONS:
+            if dimension == 'country':
+                value = country_of(job) or 'other'
+            else:
+                value = facet_value(job, dimension)
+            table = positions[dimension]
+            if value not in table:
+                table[value] = len(table)
+                values[dimension].append(value)
+            cell.append(table[value])
+        cells[tuple(cell)] = cells.get(tuple(cell), 0) + 1
+        companies.add(job.get('company', ''))
+        epochs.append(posted_epoch(job.get('posted')))
+
+    base = min((epoch for epoch in epochs if epoch), default=0)
+    return {
+        'v': AGGREGATES_VERSION,
+        'count': len(epochs),
+        'remoteJobs': sum(count for cell, count in cells.items()
+                          if values['locationType'][cell[3]] == 'remote'),
+        'companies': len(companies),
+        'dimensions': list(DIMENSIONS),
+        'values': values,
+        'countryNames': {code: country_names.get(code, 'Other') for code in values['country']},
+        'cube': [list(cell) + [count] for cell, count in sorted(cells.items())],
+        'posted': {
+            'base': base,
+            'keys': [epoch - base if epoch else -1 for epoch in epochs]
+        }
+    }
+
+
+def facet_counts(aggregates: Dict, dimension: str, where: Optional[Dict[str, str]] = None) -> Dict[str, int]:
+    """
+    Job count per value of `dimension` among jobs matching `where`
+    ({dimension: value}); the reference for the clients' cube sums.
+    """
+    dimensions = aggregates['dimensions']
+    values = aggregates['values']
+    axis = dimensions.index(dimension)
+    wanted = [(dimensions.index(name), value) for name, value in (where or {}).items() if value]
+
+    counts: Dict[str, int] = {}
+    for row in aggregates['cube']:
+        if all(values[dimensions[i]][row[i]] == value for i, value in wanted):
+            value = values[dimension][row[axis]]
+            counts[value] = counts.get(value, 0) + row[-1]
+    return counts
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Batch backfill: re-classify historical job records
+
+Streams JSONL job records (plain or .gz, e.g. the data/archive partitions),
+re-runs classify_job on each in chunks across a process pool and writes the
+records back out as JSONL in input order. Parsing, classification and
+serialization all happen in the workers, so throughput scales with cores;
+the parent only reads lines and writes the returned bytes.
+
+Progress goes to stderr. After every few chunks the output is fsynced and a
+checkpoint (<output>.checkpoint.json) records how many input lines are done
+and the committed output size; an interrupted run started again with the
+same arguments truncates the output to that size and carries on. With
+--dedupe, records repeating an earlier (company, title) are dropped, as in
+scrape_jobs.deduplicate_jobs.
+
+    python backfill.py ../data/archive/2026-09.jsonl.gz reclassified.jsonl.gz
+    python backfill.py jobs.jsonl out.jsonl --workers 16 --chunk-size 5000 --dedupe
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from publish import write_json
+from scrape_jobs import CLASSIFIER_VERSION, classify_job
+
+CHECKPOINT_VERSION = 1
+CLASSIFIED_FIELDS = ('locationType', 'type', 'level', 'clearance', 'visaSponsorship',
+                     'workAuthRequired', 'locationRestrictions')
+
+
+def dedupe_key(job: Dict) -> str:
+    return f"{job.get('company', '').lower().strip()}\0{job.get('title', '').lower().strip()}"
+
+
+# -- worker side ----------------------------------------------------------------
+
+def classify_chunk(lines: List[bytes], with_keys: bool) -> Tuple[List[Tuple[Optional[str], bytes]], int]:
+    """Re-classify one chunk; returns ([(dedupe key, output line)], invalid line count)"""
+    out = []
+    invalid = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+            labels = classify_job(job.get('title', ''), job.get('description', ''))
+        except (ValueError, AttributeError, TypeError):
+            invalid += 1
+            continue
+        job.update((field, labels[field]) for field in CLASSIFIED_FIELDS)
+        encoded = (json.dumps(job, ensure_ascii=False) + '\n').encode('utf-8')
+        out.append((dedupe_key(job) if with_keys else None, encoded))
+    return out, invalid
+
+
+# -- parent side ----------------------------------------------------------------
+
+class InputReader:
+    """Line chunks from a plain or gzip JSONL file, tracking the compressed position"""
+
+    def __init__(self, path: str):
+        self.raw = open(path, 'rb')
+        self.size = os.fstat(self.raw.fileno()).st_size
+        self.stream: BinaryIO = gzip.GzipFile(fileobj=self.raw) if path.endswith('.gz') else self.raw
+
+    def position(self) -> int:
+        return self.raw.tell()
+
+    def chunks(self, chunk_size: int, skip: int = 0) -> Iterator[List[bytes]]:
+        for _ in range(skip):
+            if not self.stream.readline():
+                return
+        chunk = []
+        for line in self.stream:
+            chunk.append(line)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def close(self):
+        self.stream.close()
+        self.raw.close()
+
+
+class OutputWriter:
+    """Appends chunks; gzip output gets one member per chunk so it can be cut at any chunk boundary"""
+
+    def __init__(self, path: str, resume_at: int):
+        self.compress = path.endswith('.gz')
+        self.file = open(path, 'r+b' if resume_at else 'wb')
+        self.file.truncate(resume_at)
+        self.file.seek(resume_at)
+
+    def write(self, lines: List[bytes]):
+        data = b''.join(lines)
+        if self.compress:
+            data = gzip.compress(data, compresslevel=6, mtime=0)
+        self.file.write(data)
+
+    def commit(self) -> int:
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        self.file.close()
+
+
+def read_keys(path: str) -> set:
+    """Dedupe keys of everything already written (to resume a --dedupe run)"""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rb') as f:
+        return {dedupe_key(json.loads(line)) for line in f if line.strip()}
+
+
+def load_checkpoint(path: str, expected: Dict) -> Optional[Dict]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    mismatched = [key for key, value in expected.items() if checkpoint.get(key) != value]
+    if mismatched:
+        raise SystemExit(f"Checkpoint {path} is for a different run ({', '.join(mismatched)} changed); "
+                         f"delete it to start over")
+    return checkpoint
+
+
+def run(input_path: str, output_path: str, workers: int, chunk_size: int, dedupe: bool,
+        checkpoint_every: int, progress_every: float) -> Dict:
+    checkpoint_path = output_path + '.checkpoint.json'
+    identity = {'v': CHECKPOINT_VERSION, 'input': os.path.abspath(input_path),
+                'classifier': CLASSIFIER_VERSION, 'dedupe': dedupe}
+    checkpoint = load_checkpoint(checkpoint_path, identity) if os.path.exists(output_path) else None
+    state = {'lines': 0, 'written': 0, 'duplicates': 0, 'invalid': 0, 'bytes': 0}
+    if checkpoint:
+        state.update({key: checkpoint[key] for key in state})
+        print(f"↻ Resuming after {state['lines']:,} lines ({state['written']:,} records written)",
+              file=sys.stderr)
+
+    reader = InputReader(input_path)
+    writer = OutputWriter(output_path, state['bytes'])
+    seen = read_keys(output_path) if dedupe and state['bytes'] else set()
+    started = time.monotonic()
+    resumed_lines = state['lines']
+    last_report = started
+    chunks_since_checkpoint = 0
+
+    def save_checkpoint():
+        state['bytes'] = writer.commit()
+        write_json(checkpoint_path, dict(identity, **state), indent=2)
+
+    def collect(future, consumed: int):
+        nonlocal chunks_since_checkpoint, last_report
+        results, invalid = future.result()
+        kept = []
+        for key, line in results:
+            if dedupe:
+                if key in seen:
+                    state['duplicates'] += 1
+                    continue
+                seen.add(key)
+            kept.append(line)
+        writer.write(kept)
+        state['lines'] += consumed
+        state['written'] += len(kept)
+        state['invalid'] += invalid
+
+        chunks_since_checkpoint += 1
+        if chunks_since_checkpoint >= checkpoint_every:
+            save_checkpoint()
+            chunks_since_checkpoint = 0
+        now = time.monotonic()
+        if now - last_report >= progress_every:
+            last_report = now
+            report_progress(state, reader, started, resumed_lines)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Bounded in-flight window: memory stays flat and results are collected in input order
+            pending = deque()
+            for chunk in reader.chunks(chunk_size, skip=state['lines']):
+                pending.append((pool.submit(classify_chunk, chunk, dedupe), len(chunk)))
+                if len(pending) >= workers * 2:
+                    collect(*pending.popleft())
+            while pending:
+                collect(*pending.popleft())
+        save_checkpoint()
+    finally:
+        writer.close()
+        reader.close()
+
+    report_progress(state, reader, started, resumed_lines, final=True)
+    os.remove(checkpoint_path)
+    return state
+
+
+def report_progress(state: Dict, reader: InputReader, started: float, resumed_lines: int,
+                    final: bool = False):
+    elapsed = max(time.monotonic() - started, 1e-9)
+    rate = (state['lines'] - resumed_lines) / elapsed
+    line = f"  {state['lines']:,} lines, {state['written']:,} written, {rate:,.0f} lines/s"
+    if final:
+        line = (f"✓ {state['lines']:,} lines in {elapsed:.1f}s ({rate:,.0f}/s): {state['written']:,} written, "
+                f"{state['duplicates']:,} duplicates, {state['invalid']:,} invalid")
+    elif not reader.raw.closed and reader.size:
+        done = reader.position() / reader.size
+        eta = elapsed / done * (1 - done) if done else 0
+        line += f", {done:.0%} read, ~{eta:.0f}s left"
+    print(line, file=sys.stderr, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('input', help='JSONL job records (.gz is decompressed)')
+    parser.add_argument('output', help='JSONL output (.gz is compressed)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=2000, help='records per task')
+    parser.add_argument('--dedupe', action='store_true', help='drop records repeating a (company, title)')
+    parser.add_argument('--checkpoint-every', type=int, default=10, help='chunks between checkpoints')
+    parser.add_argument('--progress-every', type=float, default=5.0, help='seconds between progress lines')
+    args = parser.parse_args()
+
+    print(f"🔁 Backfill {args.input} -> {args.output} ({args.workers} workers, "
+          f"{args.chunk_size:,} per chunk)", file=sys.stderr)
+    run(args.input, args.output, args.workers, args.chunk_size, args.dedupe,
+        args.checkpoint_every, args.progress_every)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Persistent classification cache
+
+Memoizes classify_job results in SQLite, keyed by a hash of the title, the
+description and the classifier version. Changing any phrase list changes the
+version, so stale labels can never be served. The table is kept to a fixed
+size by evicting the least recently used entries.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from typing import Callable, Dict, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    key         TEXT PRIMARY KEY,
+    version     TEXT NOT NULL,
+    value       TEXT NOT NULL,
+    used        INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS classifications_used ON classifications (used);
+"""
+
+COMMIT_EVERY = 500
+
+
+class ClassificationCache:
+    """Size-bounded LRU memo of classifier output"""
+
+    def __init__(self, path: str, version: str, max_entries: int = 100000):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+            # Entries from another classifier version can never be hit again
+            self._conn.execute("DELETE FROM classifications WHERE version != ?", (version,))
+            self._clock = self._conn.execute(
+                "SELECT COALESCE(MAX(used), 0) FROM classifications").fetchone()[0]
+
+    def key(self, title: str, description: str) -> str:
+        digest = hashlib.sha256()
+        for part in (self.version, title, description):
+            digest.update(part.encode('utf-8') + b'\0')
+        return digest.hexdigest()
+
+    def get(self, title: str, description: str) -> Optional[Dict]:
+        key = self.key(title, description)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM classifications WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._clock += 1
+            self._conn.execute("UPDATE classifications SET used = ? WHERE key = ?", (self._clock, key))
+            self._maybe_commit()
+        return json.loads(row[0])
+
+    def put(self, title: str, description: str, result: Dict):
+        key = self.key(title, description)
+        with self._lock:
+            self._clock += 1
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classifications (key, version, value, used) VALUES (?, ?, ?, ?)",
+                (key, self.version, json.dumps(result, ensure_ascii=False), self._clock))
+            self._maybe_commit()
+
+    def get_or_compute(self, title: str, description: str,
+                       classify: Callable[[str, str], Dict]) -> Dict:
+        cached = self.get(title, description)
+        if cached is not None:
+            return cached
+        result = classify(title, description)
+        self.put(title, description, result)
+        return result
+
+    def _maybe_commit(self):
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+    def evict(self) -> int:
+        """Drop least recently used entries beyond max_entries"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """DELETE FROM classifications WHERE key IN (
+                       SELECT key FROM classifications ORDER BY used DESC LIMIT -1 OFFSET ?)""",
+                (self.max_entries,))
+            return cursor.rowcount
+
+    def close(self):
+        self.evict()
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
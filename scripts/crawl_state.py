@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Persistent crawl state (SQLite)
+
+Keeps every job we have seen, keyed by Adzuna job id, plus a watermark per
+(country, query) so each run only has to fetch postings newer than the last one.
+Every job carries first_seen / last_seen run timestamps; last_seen moves
+whenever a fetched page lists the job again, and jobs not seen for a TTL
+are handed to the archive and dropped. Incremental crawls stop at the first
+page of known jobs, so each (country, query) also records its last refresh:
+a crawl that walked its pages regardless, to see held jobs again.
+It also logs how many new jobs each result page yielded and how many API
+requests were sent per day (retries and failures included), for the quota
+planner.
+"""
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT PRIMARY KEY,
+    country     TEXT NOT NULL,
+    query       TEXT NOT NULL,
+    posted      TEXT NOT NULL,
+    data        TEXT NOT NULL,
+    first_seen  TEXT NOT NULL,
+    last_seen   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_country ON jobs (country);
+CREATE INDEX IF NOT EXISTS jobs_last_seen ON jobs (last_seen);
+
+CREATE TABLE IF NOT EXISTS watermarks (
+    country     TEXT NOT NULL,
+    query       TEXT NOT NULL,
+    posted      TEXT NOT NULL,
+    updated     TEXT NOT NULL,
+    PRIMARY KEY (country, query)
+);
+
+CREATE TABLE IF NOT EXISTS page_yields (
+    country     TEXT NOT NULL,
+    query       TEXT NOT NULL,
+    page        INTEGER NOT NULL,
+    calls       INTEGER NOT NULL,
+    results     INTEGER NOT NULL,  -- results on the page last time
+    fresh       REAL NOT NULL,  -- smoothed new jobs per call
+    updated     TEXT NOT NULL,
+    PRIMARY KEY (country, query, page)
+);
+
+CREATE TABLE IF NOT EXISTS refreshes (
+    country     TEXT NOT NULL,
+    query       TEXT NOT NULL,
+    refreshed   TEXT NOT NULL,
+    PRIMARY KEY (country, query)
+);
+
+CREATE TABLE IF NOT EXISTS api_calls (
+    day         TEXT PRIMARY KEY,
+    calls       INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS duplicates (
+    id          TEXT PRIMARY KEY,
+    canonical   TEXT NOT NULL,
+    similarity  REAL NOT NULL,
+    detected    TEXT NOT NULL
+);
+"""
+
+# Adzuna links come as .../details/<id> or .../land/ad/<id>?...
+ADZUNA_ID = re.compile(r'/(?:details|land/ad)/(\d+)')
+
+
+def job_id(job: Dict) -> str:
+    """
+    Adzuna id of a job, recovered from its URL for records that predate the
+    id field. Records without one get a stable 'h'-prefixed key hashed from
+    their URL, company and title, so they are still stored and diffed.
+    """
+    if job.get('id'):
+        return str(job['id'])
+    match = ADZUNA_ID.search(job.get('url', ''))
+    if match:
+        return match.group(1)
+    fingerprint = '\x1f'.join((job.get('url', ''), job.get('company', ''), job.get('title', '')))
+    return 'h' + hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+
+class CrawlState:
+    """Thread-safe wrapper around the crawl-state database"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+
+    def known_ids(self, country: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM jobs WHERE country = ?", (country,))
+            return {row[0] for row in rows}
+
+    def watermark(self, country: str, query: str) -> Optional[str]:
+        """Newest `posted` value seen by the last complete crawl of (country, query)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT posted FROM watermarks WHERE country = ? AND query = ?",
+                (country, query)).fetchone()
+        return row[0] if row else None
+
+    def record(self, country: str, query: str, jobs: Iterable[Dict], complete: bool = True):
+        """
+        Upsert fetched jobs. The watermark only advances after a complete crawl,
+        otherwise pages we never reached would be skipped next time.
+        """
+        now = datetime.now().isoformat() + 'Z'
+        jobs = list(jobs)
+        with self._lock, self._conn:
+            for job in jobs:
+                self._conn.execute(
+                    """INSERT INTO jobs (id, country, query, posted, data, first_seen, last_seen)
+                       VALUES (?, ?, ?, ?, ?, ?, ?)
+                       ON CONFLICT (id) DO UPDATE SET
+                           posted = excluded.posted, data = excluded.data,
+                           last_seen = excluded.last_seen""",
+                    (job_id(job), country, query, job.get('posted', ''),
+                     json.dumps(job, ensure_ascii=False), now, now))
+            if complete and jobs:
+                newest = max(job.get('posted', '') for job in jobs)
+                self._conn.execute(
+                    """INSERT INTO watermarks (country, query, posted, updated)
+                       VALUES (?, ?, ?, ?)
+                       ON CONFLICT (country, query) DO UPDATE SET
+                           posted = MAX(posted, excluded.posted), updated = excluded.updated""",
+                    (country, query, newest, now))
+
+    def refresh_due(self, queries: Iterable[Tuple[str, str]], before: str) -> List[Tuple[str, str]]:
+        """
+        The (country, query) pairs not refreshed since the ISO timestamp
+        `before`, longest overdue (never refreshed) first, then in the given order
+        """
+        with self._lock:
+            refreshed = {(country, query): when for country, query, when in
+                         self._conn.execute("SELECT country, query, refreshed FROM refreshes")}
+        return sorted((key for key in queries if refreshed.get(key, '') < before),
+                      key=lambda key: refreshed.get(key, ''))
+
+    def mark_refreshed(self, country: str, query: str):
+        now = datetime.now().isoformat() + 'Z'
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO refreshes (country, query, refreshed) VALUES (?, ?, ?)
+                   ON CONFLICT (country, query) DO UPDATE SET refreshed = excluded.refreshed""",
+                (country, query, now))
+
+    def update(self, jobs: Iterable[Dict]):
+        """Replace the stored records of held jobs (after re-classification)"""
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE jobs SET data = ? WHERE id = ?",
+                                   [(json.dumps(job, ensure_ascii=False), job_id(job)) for job in jobs])
+
+    def touch(self, ids: Iterable[str]):
+        """Mark already-held jobs as seen again in this run"""
+        now = datetime.now().isoformat() + 'Z'
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE jobs SET last_seen = ? WHERE id = ?",
+                                   [(now, jid) for jid in ids])
+
+    def expired(self, before: str) -> List[Dict]:
+        """Jobs last seen before the ISO timestamp `before`, with firstSeen/lastSeen filled in"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data, first_seen, last_seen FROM jobs WHERE last_seen < ? ORDER BY last_seen, id",
+                (before,))
+            return [dict(json.loads(data), firstSeen=first_seen, lastSeen=last_seen)
+                    for data, first_seen, last_seen in rows]
+
+    def forget(self, ids: Iterable[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM jobs WHERE id = ?", [(jid,) for jid in ids])
+
+    def seed(self, jobs: Iterable[Dict], country_of) -> int:
+        """Bootstrap an empty store from a previously published corpus (no watermarks)"""
+        now = datetime.now().isoformat() + 'Z'
+        added = 0
+        with self._lock, self._conn:
+            for job in jobs:
+                jid = job_id(job)
+                job = dict(job, id=jid)
+                first_seen = job.pop('firstSeen', None) or now
+                cursor = self._conn.execute(
+                    """INSERT OR IGNORE INTO jobs (id, country, query, posted, data, first_seen, last_seen)
+                       VALUES (?, ?, '', ?, ?, ?, ?)""",
+                    (jid, country_of(job), job.get('posted', ''),
+                     json.dumps(job, ensure_ascii=False), first_seen, now))
+                added += cursor.rowcount
+        return added
+
+    def record_call(self):
+        """Count one request sent to the API against today's quota"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO api_calls (day, calls) VALUES (?, 1)
+                   ON CONFLICT (day) DO UPDATE SET calls = calls + 1""",
+                (datetime.now().strftime('%Y-%m-%d'),))
+
+    def record_page(self, country: str, query: str, page: int, results: int, fresh: int,
+                    smoothing: float = 0.5):
+        """
+        Fold a fetched page's yield of new jobs into the page's moving
+        average (weight `smoothing` on the newest observation). The requests
+        it took are counted by record_call.
+        """
+        now = datetime.now()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT INTO page_yields (country, query, page, calls, results, fresh, updated)
+                   VALUES (?, ?, ?, 1, ?, ?, ?)
+                   ON CONFLICT (country, query, page) DO UPDATE SET
+                       calls = calls + 1,
+                       results = excluded.results,
+                       fresh = ? * excluded.fresh + (1 - ?) * fresh,
+                       updated = excluded.updated""",
+                (country, query, page, results, fresh, now.isoformat() + 'Z', smoothing, smoothing))
+
+    def page_yields(self, page_size: int) -> Dict[Tuple[str, str], Dict[int, float]]:
+        """
+        {(country, query): {page: smoothed new jobs per call}}. A page that
+        came back short last time is the end of the results, so the page
+        after it is listed with a yield of 0.
+        """
+        history: Dict[Tuple[str, str], Dict[int, float]] = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT country, query, page, results, fresh FROM page_yields ORDER BY page").fetchall()
+        for country, query, page, results, fresh in rows:
+            pages = history.setdefault((country, query), {})
+            pages[page] = fresh
+            if results < page_size:
+                pages[page + 1] = 0.0
+        return history
+
+    def calls_today(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT calls FROM api_calls WHERE day = ?",
+                                     (datetime.now().strftime('%Y-%m-%d'),)).fetchone()
+        return row[0] if row else 0
+
+    def record_duplicates(self, pairs: Iterable[Tuple[Dict, Dict, float]]):
+        """Remember which posting was kept for each near-duplicate that was dropped"""
+        now = datetime.now().isoformat() + 'Z'
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO duplicates (id, canonical, similarity, detected) VALUES (?, ?, ?, ?)",
+                [(job_id(dup), job_id(canonical), score, now) for dup, canonical, score in pairs])
+
+    def iter_jobs(self) -> Iterator[Dict]:
+        """
+        Every held job, newest first, with the run it was first seen in as
+        firstSeen. Holds the lock until exhausted - don't call back into the state meanwhile.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT data, first_seen FROM jobs ORDER BY posted DESC, id")
+            for data, first_seen in rows:
+                yield dict(json.loads(data), firstSeen=first_seen)
+
+    def all_jobs(self) -> List[Dict]:
+        return list(self.iter_jobs())
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Full posting text for new jobs
+
+Search results carry a truncated description, so phrases further down a
+posting (visa sponsorship, clearance, remote) are missed by the classifier.
+DetailFetcher fetches the posting page of each new job, extracts the
+description from its div.adp-body and caches the text in SQLite by job id,
+so every posting is fetched at most once across runs. The page is
+/details/<id> on the Adzuna site the job came from (details_url); the
+result's redirect_url itself is a /land/ad/ tracking link that ends up on
+the employer's site. Pages that are gone (4xx) are cached as empty for
+good; a page without a description block is cached as empty for
+`retry_empty_days` only, in case the markup was a one-off. Network errors,
+429 and 5xx are not cached and are tried again on a later run.
+
+Fetches run on a small thread pool through the shared HttpClient (retries,
+rate limit, circuit breaker), with at most `per_host` requests in flight
+per host of the pages actually fetched.
+"""
+
+import re
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from http_client import CircuitOpen, RETRY_STATUSES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS details (
+    id       TEXT PRIMARY KEY,
+    url      TEXT NOT NULL,
+    status   INTEGER NOT NULL,
+    text     TEXT NOT NULL,
+    fetched  TEXT NOT NULL
+);
+"""
+
+DESCRIPTION_CLASS = 'adp-body'
+_BLOCK_TAGS = {'p', 'div', 'br', 'li', 'ul', 'ol', 'h1', 'h2', 'h3', 'h4', 'tr'}
+_VOID_TAGS = {'br', 'img', 'hr', 'input', 'meta', 'link', 'wbr'}
+_SPACES = re.compile(r'[ \t\r\f\v]+')
+# Path of an Adzuna link to a posting, keeping any prefix before it (/jobs/...)
+_POSTING_PATH = re.compile(r'/(?:details|land/ad)/\d+')
+
+
+class _DescriptionParser(HTMLParser):
+    """Collects the text inside the first element with class `adp-body`"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.depth = 0
+        self.done = False
+        self.parts: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if self.depth:
+            if tag in _BLOCK_TAGS:
+                self.parts.append('\n')
+            if tag not in _VOID_TAGS:
+                self.depth += 1
+        elif DESCRIPTION_CLASS in (dict(attrs).get('class') or '').split() and tag not in _VOID_TAGS:
+            self.depth = 1
+
+    def handle_endtag(self, tag):
+        if self.depth and tag not in _VOID_TAGS:
+            self.depth -= 1
+            if tag in _BLOCK_TAGS:
+                self.parts.append('\n')
+            if not self.depth:
+                self.done = True
+
+    def handle_data(self, data):
+        if self.depth:
+            self.parts.append(data)
+
+
+def extract_description(html: str) -> str:
+    """Text of a posting page's description block, '' if the page has none"""
+    parser = _DescriptionParser()
+    parser.feed(html)
+    parser.close()
+    lines = (_SPACES.sub(' ', line).strip() for line in ''.join(parser.parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+
+def details_url(job_id: str, url: str) -> Optional[str]:
+    """
+    The /details/<id> page for an Adzuna job, on the host of its link (a
+    /land/ad/ or /details/ URL); None for jobs without a numeric Adzuna id
+    """
+    parts = urlparse(url or '')
+    if not (job_id and job_id.isdigit() and parts.scheme and parts.netloc):
+        return None
+    match = _POSTING_PATH.search(parts.path)
+    prefix = parts.path[:match.start()] if match else ''
+    return f"{parts.scheme}://{parts.netloc}{prefix}/details/{job_id}"
+
+
+class DetailCache:
+    """
+    Fetched posting text by job id (SQLite). Empty texts from a 200 are
+    served for `retry_empty_days`, then treated as missing.
+    """
+
+    def __init__(self, path: str, retry_empty_days: float = 7.0):
+        self.path = path
+        self.retry_empty_days = retry_empty_days
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, str]:
+        ids = list(ids)
+        found = {}
+        retry_before = (datetime.now() - timedelta(days=self.retry_empty_days)).isoformat() + 'Z'
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, text FROM details WHERE id IN ({','.join('?' * len(chunk))}) "
+                    "AND (text != '' OR status != 200 OR fetched >= ?)", chunk + [retry_before])
+                found.update(rows)
+        return found
+
+    def put(self, job_id: str, url: str, status: int, text: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO details (id, url, status, text, fetched) VALUES (?, ?, ?, ?, ?)",
+                (job_id, url, status, text, datetime.now().isoformat() + 'Z'))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM details").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class DetailFetcher:
+    """Full texts for (id, url) pairs: cached ones from the cache, the rest fetched concurrently"""
+
+    def __init__(self, client, cache: DetailCache, workers: int = 8, per_host: int = 2,
+                 timeout: float = 15.0, offline: bool = False, source: str = 'details'):
+        self.client = client
+        self.cache = cache
+        self.workers = workers
+        self.per_host = per_host
+        self.timeout = timeout
+        self.offline = offline
+        self.source = source
+        self.hits = 0
+        self.fetched = 0
+        self.failed = 0
+        self._hosts: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def fetch(self, job_id: str, url: str) -> Optional[str]:
+        """Fetch and cache one posting's text; None on a transient failure"""
+        try:
+            with self._host_slot(url):
+                response = self.client.get(url, timeout=self.timeout, source=self.source)
+        except (requests.RequestException, CircuitOpen):
+            response = None
+        if response is None or response.status_code in RETRY_STATUSES:
+            with self._lock:
+                self.failed += 1
+            return None
+
+        text = extract_description(response.text) if response.status_code == 200 else ''
+        self.cache.put(job_id, url, response.status_code, text)
+        with self._lock:
+            self.fetched += 1
+        return text
+
+    def full_texts(self, postings: Iterable[Tuple[str, Optional[str]]]) -> Dict[str, str]:
+        """{id: text} for the (id, page url) pairs that have a cached or freshly fetched text"""
+        postings = {job_id: url for job_id, url in postings if job_id and url}
+        texts = self.cache.get_many(postings)
+        self.hits += len(texts)
+
+        missing = [(job_id, url) for job_id, url in postings.items() if job_id not in texts]
+        if missing and not self.offline:
+            with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+                for (job_id, _), text in zip(missing, pool.map(lambda item: self.fetch(*item), missing)):
+                    if text is not None:
+                        texts[job_id] = text
+        return {job_id: text for job_id, text in texts.items() if text}
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Offline gazetteer for resolving job locations
+
+Locations are resolved once at scrape time into an ISO country code, the
+country name used by the map's GeoJSON and a city, so the browser never has
+to parse free-text locations. Lookups are hash-table hits on the
+comma-separated parts of a location (and the word runs inside them),
+memoized per distinct location string. Known cities and every country also
+carry coordinates, so the publish step can place jobs on map tiles.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+# ISO 3166-1 alpha-2 -> country name as used by the map's GeoJSON
+COUNTRIES = {
+    'US': 'United States of America', 'GB': 'United Kingdom', 'CA': 'Canada',
+    'DE': 'Germany', 'FR': 'France', 'ES': 'Spain', 'IT': 'Italy', 'NL': 'Netherlands',
+    'BE': 'Belgium', 'CH': 'Switzerland', 'AT': 'Austria', 'SE': 'Sweden', 'NO': 'Norway',
+    'DK': 'Denmark', 'FI': 'Finland', 'PL': 'Poland', 'PT': 'Portugal', 'IE': 'Ireland',
+    'GR': 'Greece', 'CZ': 'Czech Republic', 'HU': 'Hungary', 'RO': 'Romania',
+    'IN': 'India', 'CN': 'China', 'JP': 'Japan', 'KR': 'South Korea', 'SG': 'Singapore',
+    'HK': 'Hong Kong', 'TW': 'Taiwan', 'TH': 'Thailand', 'VN': 'Vietnam',
+    'PH': 'Philippines', 'ID': 'Indonesia', 'MY': 'Malaysia', 'PK': 'Pakistan',
+    'BD': 'Bangladesh', 'IL': 'Israel', 'AE': 'United Arab Emirates', 'SA': 'Saudi Arabia',
+    'QA': 'Qatar', 'KW': 'Kuwait', 'TR': 'Turkey', 'AU': 'Australia', 'NZ': 'New Zealand',
+    'MX': 'Mexico', 'BR': 'Brazil', 'AR': 'Argentina', 'CL': 'Chile', 'CO': 'Colombia',
+    'PE': 'Peru', 'ZA': 'South Africa', 'EG': 'Egypt', 'NG': 'Nigeria', 'KE': 'Kenya',
+    'MA': 'Morocco', 'RU': 'Russia', 'UA': 'Ukraine', 'BY': 'Belarus', 'EE': 'Estonia',
+    'LV': 'Latvia', 'LT': 'Lithuania'
+}
+
+# Other spellings of country names (lowercase)
+COUNTRY_ALIASES = {
+    'united states': 'US', 'usa': 'US', 'us': 'US', 'u.s.': 'US', 'u.s.a.': 'US',
+    'uk': 'GB', 'great britain': 'GB', 'england': 'GB', 'scotland': 'GB', 'wales': 'GB',
+    'northern ireland': 'GB', 'czechia': 'CZ', 'uae': 'AE', 'dubai': 'AE', 'abu dhabi': 'AE',
+    'deutschland': 'DE', 'schweiz': 'CH', 'suisse': 'CH', 'österreich': 'AT',
+    'nederland': 'NL', 'españa': 'ES', 'italia': 'IT', 'polska': 'PL', 'brasil': 'BR',
+    'méxico': 'MX'
+}
+
+# Major cities (lowercase) -> ISO code
+CITIES = {
+    'new york': 'US', 'los angeles': 'US', 'chicago': 'US', 'houston': 'US', 'phoenix': 'US',
+    'philadelphia': 'US', 'san antonio': 'US', 'san diego': 'US', 'dallas': 'US',
+    'san jose': 'US', 'austin': 'US', 'jacksonville': 'US', 'san francisco': 'US',
+    'seattle': 'US', 'denver': 'US', 'washington': 'US', 'boston': 'US', 'nashville': 'US',
+    'detroit': 'US', 'portland': 'US', 'las vegas': 'US', 'memphis': 'US', 'baltimore': 'US',
+    'atlanta': 'US', 'miami': 'US', 'minneapolis': 'US', 'cleveland': 'US', 'arlington': 'US',
+    'raleigh': 'US', 'tampa': 'US', 'pittsburgh': 'US', 'cincinnati': 'US', 'redmond': 'US',
+    'mountain view': 'US', 'palo alto': 'US', 'cambridge': 'GB', 'ann arbor': 'US',
+    'malden': 'US', 'bedford': 'US', 'mclean': 'US', 'fort worth': 'US', 'london': 'GB',
+    'manchester': 'GB', 'birmingham': 'GB', 'leeds': 'GB', 'glasgow': 'GB', 'edinburgh': 'GB',
+    'liverpool': 'GB', 'bristol': 'GB', 'oxford': 'GB', 'toronto': 'CA', 'montreal': 'CA',
+    'vancouver': 'CA', 'calgary': 'CA', 'ottawa': 'CA', 'edmonton': 'CA', 'winnipeg': 'CA',
+    'berlin': 'DE', 'munich': 'DE', 'frankfurt': 'DE', 'hamburg': 'DE', 'paris': 'FR',
+    'lyon': 'FR', 'marseille': 'FR', 'madrid': 'ES', 'barcelona': 'ES', 'rome': 'IT',
+    'milan': 'IT', 'amsterdam': 'NL', 'rotterdam': 'NL', 'brussels': 'BE', 'zurich': 'CH',
+    'geneva': 'CH', 'vienna': 'AT', 'stockholm': 'SE', 'oslo': 'NO', 'copenhagen': 'DK',
+    'helsinki': 'FI', 'warsaw': 'PL', 'lisbon': 'PT', 'dublin': 'IE', 'athens': 'GR',
+    'prague': 'CZ', 'budapest': 'HU', 'bucharest': 'RO', 'tokyo': 'JP', 'osaka': 'JP',
+    'kyoto': 'JP', 'seoul': 'KR', 'busan': 'KR', 'singapore': 'SG', 'hong kong': 'HK',
+    'taipei': 'TW', 'bangkok': 'TH', 'mumbai': 'IN', 'delhi': 'IN', 'bangalore': 'IN',
+    'hyderabad': 'IN', 'chennai': 'IN', 'pune': 'IN', 'kolkata': 'IN', 'beijing': 'CN',
+    'shanghai': 'CN', 'shenzhen': 'CN', 'guangzhou': 'CN', 'manila': 'PH', 'jakarta': 'ID',
+    'kuala lumpur': 'MY', 'tel aviv': 'IL', 'jerusalem': 'IL', 'dubai': 'AE',
+    'abu dhabi': 'AE', 'riyadh': 'SA', 'doha': 'QA', 'istanbul': 'TR', 'ankara': 'TR',
+    'sydney': 'AU', 'melbourne': 'AU', 'brisbane': 'AU', 'perth': 'AU', 'auckland': 'NZ',
+    'wellington': 'NZ', 'mexico city': 'MX', 'guadalajara': 'MX', 'monterrey': 'MX',
+    'são paulo': 'BR', 'rio de janeiro': 'BR', 'buenos aires': 'AR', 'santiago': 'CL',
+    'bogotá': 'CO', 'lima': 'PE', 'cape town': 'ZA', 'johannesburg': 'ZA', 'cairo': 'EG',
+    'lagos': 'NG', 'nairobi': 'KE', 'casablanca': 'MA'
+}
+
+US_STATES = {
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA',
+    'KS', 'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
+    'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT',
+    'VA', 'WA', 'WV', 'WI', 'WY', 'DC'
+}
+
+CANADIAN_PROVINCES = {'AB', 'BC', 'MB', 'NB', 'NL', 'NS', 'NT', 'NU', 'ON', 'PE', 'QC', 'SK', 'YT'}
+
+# (latitude, longitude) of each city in CITIES, for placing jobs on the map
+CITY_COORDINATES = {
+    'new york': (40.71, -74.01), 'los angeles': (34.05, -118.24), 'chicago': (41.88, -87.63),
+    'houston': (29.76, -95.37), 'phoenix': (33.45, -112.07), 'philadelphia': (39.95, -75.17),
+    'san antonio': (29.42, -98.49), 'san diego': (32.72, -117.16), 'dallas': (32.78, -96.80),
+    'san jose': (37.34, -121.89), 'austin': (30.27, -97.74), 'jacksonville': (30.33, -81.66),
+    'san francisco': (37.77, -122.42), 'seattle': (47.61, -122.33), 'denver': (39.74, -104.99),
+    'washington': (38.91, -77.04), 'boston': (42.36, -71.06), 'nashville': (36.16, -86.78),
+    'detroit': (42.33, -83.05), 'portland': (45.52, -122.68), 'las vegas': (36.17, -115.14),
+    'memphis': (35.15, -90.05), 'baltimore': (39.29, -76.61), 'atlanta': (33.75, -84.39),
+    'miami': (25.76, -80.19), 'minneapolis': (44.98, -93.27), 'cleveland': (41.50, -81.69),
+    'arlington': (38.88, -77.10), 'raleigh': (35.78, -78.64), 'tampa': (27.95, -82.46),
+    'pittsburgh': (40.44, -80.00), 'cincinnati': (39.10, -84.51), 'redmond': (47.67, -122.12),
+    'mountain view': (37.39, -122.08), 'palo alto': (37.44, -122.14), 'cambridge': (52.21, 0.12),
+    'ann arbor': (42.28, -83.74), 'malden': (42.43, -71.07), 'bedford': (42.49, -71.28),
+    'mclean': (38.93, -77.18), 'fort worth': (32.76, -97.33), 'london': (51.51, -0.13),
+    'manchester': (53.48, -2.24), 'birmingham': (52.49, -1.89), 'leeds': (53.80, -1.55),
+    'glasgow': (55.86, -4.25), 'edinburgh': (55.95, -3.19), 'liverpool': (53.41, -2.99),
+    'bristol': (51.45, -2.59), 'oxford': (51.75, -1.26), 'toronto': (43.65, -79.38),
+    'montreal': (45.50, -73.57), 'vancouver': (49.28, -123.12), 'calgary': (51.05, -114.07),
+    'ottawa': (45.42, -75.70), 'edmonton': (53.55, -113.49), 'winnipeg': (49.90, -97.14),
+    'berlin': (52.52, 13.40), 'munich': (48.14, 11.58), 'frankfurt': (50.11, 8.68),
+    'hamburg': (53.55, 9.99), 'paris': (48.86, 2.35), 'lyon': (45.76, 4.84),
+    'marseille': (43.30, 5.37), 'madrid': (40.42, -3.70), 'barcelona': (41.39, 2.17),
+    'rome': (41.90, 12.50), 'milan': (45.46, 9.19), 'amsterdam': (52.37, 4.90),
+    'rotterdam': (51.92, 4.48), 'brussels': (50.85, 4.35), 'zurich': (47.38, 8.54),
+    'geneva': (46.20, 6.14), 'vienna': (48.21, 16.37), 'stockholm': (59.33, 18.07),
+    'oslo': (59.91, 10.75), 'copenhagen': (55.68, 12.57), 'helsinki': (60.17, 24.94),
+    'warsaw': (52.23, 21.01), 'lisbon': (38.72, -9.14), 'dublin': (53.35, -6.26),
+    'athens': (37.98, 23.73), 'prague': (50.08, 14.44), 'budapest': (47.50, 19.04),
+    'bucharest': (44.43, 26.10), 'tokyo': (35.68, 139.69), 'osaka': (34.69, 135.50),
+    'kyoto': (35.01, 135.77), 'seoul': (37.57, 126.98), 'busan': (35.18, 129.08),
+    'singapore': (1.35, 103.82), 'hong kong': (22.32, 114.17), 'taipei': (25.03, 121.57),
+    'bangkok': (13.76, 100.50), 'mumbai': (19.08, 72.88), 'delhi': (28.70, 77.10),
+    'bangalore': (12.97, 77.59), 'hyderabad': (17.39, 78.49), 'chennai': (13.08, 80.27),
+    'pune': (18.52, 73.86), 'kolkata': (22.57, 88.36), 'beijing': (39.90, 116.41),
+    'shanghai': (31.23, 121.47), 'shenzhen': (22.54, 114.06), 'guangzhou': (23.13, 113.26),
+    'manila': (14.60, 120.98), 'jakarta': (-6.21, 106.85), 'kuala lumpur': (3.14, 101.69),
+    'tel aviv': (32.09, 34.78), 'jerusalem': (31.77, 35.21), 'dubai': (25.20, 55.27),
+    'abu dhabi': (24.45, 54.38), 'riyadh': (24.71, 46.68), 'doha': (25.29, 51.53),
+    'istanbul': (41.01, 28.98), 'ankara': (39.93, 32.86), 'sydney': (-33.87, 151.21),
+    'melbourne': (-37.81, 144.96), 'brisbane': (-27.47, 153.03), 'perth': (-31.95, 115.86),
+    'auckland': (-36.85, 174.76), 'wellington': (-41.29, 174.78), 'mexico city': (19.43, -99.13),
+    'guadalajara': (20.66, -103.35), 'monterrey': (25.69, -100.32), 'são paulo': (-23.55, -46.63),
+    'rio de janeiro': (-22.91, -43.17), 'buenos aires': (-34.60, -58.38), 'santiago': (-33.45, -70.67),
+    'bogotá': (4.71, -74.07), 'lima': (-12.05, -77.04), 'cape town': (-33.92, 18.42),
+    'johannesburg': (-26.20, 28.05), 'cairo': (30.04, 31.24), 'lagos': (6.52, 3.38),
+    'nairobi': (-1.29, 36.82), 'casablanca': (33.57, -7.59)
+}
+
+# Representative point of each country in COUNTRIES, for jobs without a known city
+COUNTRY_COORDINATES = {
+    'US': (39.83, -98.58), 'GB': (53.00, -1.50), 'CA': (56.13, -106.35), 'DE': (51.17, 10.45),
+    'FR': (46.60, 2.35), 'ES': (40.46, -3.75), 'IT': (42.83, 12.83), 'NL': (52.13, 5.29),
+    'BE': (50.50, 4.47), 'CH': (46.82, 8.23), 'AT': (47.52, 14.55), 'SE': (60.13, 18.64),
+    'NO': (60.47, 8.47), 'DK': (56.26, 9.50), 'FI': (61.92, 25.75), 'PL': (51.92, 19.15),
+    'PT': (39.40, -8.22), 'IE': (53.41, -8.24), 'GR': (39.07, 21.82), 'CZ': (49.82, 15.47),
+    'HU': (47.16, 19.50), 'RO': (45.94, 24.97), 'IN': (20.59, 78.96), 'CN': (35.86, 104.20),
+    'JP': (36.20, 138.25), 'KR': (35.91, 127.77), 'SG': (1.35, 103.82), 'HK': (22.32, 114.17),
+    'TW': (23.70, 120.96), 'TH': (15.87, 100.99), 'VN': (14.06, 108.28), 'PH': (12.88, 121.77),
+    'ID': (-0.79, 113.92), 'MY': (4.21, 101.98), 'PK': (30.38, 69.35), 'BD': (23.68, 90.36),
+    'IL': (31.05, 34.85), 'AE': (23.42, 53.85), 'SA': (23.89, 45.08), 'QA': (25.35, 51.18),
+    'KW': (29.31, 47.48), 'TR': (38.96, 35.24), 'AU': (-25.27, 133.78), 'NZ': (-40.90, 174.89),
+    'MX': (23.63, -102.55), 'BR': (-14.24, -51.93), 'AR': (-38.42, -63.62), 'CL': (-35.68, -71.54),
+    'CO': (4.57, -74.30), 'PE': (-9.19, -75.02), 'ZA': (-30.56, 22.94), 'EG': (26.82, 30.80),
+    'NG': (9.08, 8.68), 'KE': (-0.02, 37.91), 'MA': (31.79, -7.09), 'RU': (61.52, 105.32),
+    'UA': (48.38, 31.17), 'BY': (53.71, 27.95), 'EE': (58.60, 25.01), 'LV': (56.88, 24.60),
+    'LT': (55.17, 23.88)
+}
+
+# Every name that identifies a country, lowercase
+_COUNTRY_INDEX = {name.lower(): code for code, name in COUNTRIES.items()}
+_COUNTRY_INDEX.update(COUNTRY_ALIASES)
+
+_WORD = re.compile(r"[^\W\d_]+(?:[.'-][^\W\d_]+)*\.?")
+_MAX_NAME_WORDS = 3
+
+
+def _lookup_key(part: str, index: Dict) -> Optional[str]:
+    """Longest run of up to three words inside `part` that is a key of `index`"""
+    words = _WORD.findall(part.lower())
+    for size in range(min(_MAX_NAME_WORDS, len(words)), 0, -1):
+        for start in range(len(words) - size + 1):
+            key = ' '.join(words[start:start + size])
+            if index.get(key):
+                return key
+    return None
+
+
+def _lookup_words(part: str, index: Dict[str, str]) -> Optional[str]:
+    key = _lookup_key(part, index)
+    return index[key] if key else None
+
+
+def _place(code: Optional[str], city: str) -> Dict[str, str]:
+    code = code or ''
+    return {
+        'countryCode': code,
+        'country': COUNTRIES.get(code, ''),
+        'city': city
+    }
+
+
+@lru_cache(maxsize=65536)
+def resolve_location(location: str, country_hint: str = '') -> Dict[str, str]:
+    """
+    Resolve a free-text location to {'countryCode', 'country', 'city'}.
+    `country_hint` is the ISO/Adzuna code of the market the job came from and
+    always wins; otherwise the parts are checked right to left for a country,
+    a US state or Canadian province, then a known city. Unresolvable and
+    remote-only locations get an empty country code. Callers must not mutate
+    the returned dict, it is shared through the memo.
+    """
+    parts = [part.strip() for part in (location or '').split(',') if part.strip()]
+    code = country_hint.upper() or None
+
+    if code is None:
+        for part in reversed(parts):
+            code = _COUNTRY_INDEX.get(part.lower())
+            if code:
+                break
+            if part in US_STATES:
+                code = 'US'
+                break
+            if part in CANADIAN_PROVINCES:
+                code = 'CA'
+                break
+
+    if code is None:
+        for part in parts:
+            code = CITIES.get(part.lower()) or _lookup_words(part, CITIES) or _lookup_words(part, _COUNTRY_INDEX)
+            if code:
+                break
+
+    # The first part is the city unless it just names the country (or "Remote")
+    city = parts[0] if parts else ''
+    if city.lower() == 'remote' or (code and _COUNTRY_INDEX.get(city.lower()) == code):
+        city = ''
+
+    return _place(code, city)
+
+
+@lru_cache(maxsize=65536)
+def coordinates(country_code: str, city: str = '') -> Optional[Tuple[float, float]]:
+    """
+    (latitude, longitude) for a resolved place: the city's when it is a known
+    city of that country, else the country's representative point. None for
+    remote and unresolved jobs.
+    """
+    code = country_code.upper()
+    if city:
+        key = city.lower() if city.lower() in CITIES else _lookup_key(city, CITIES)
+        if key and CITIES[key] == code:
+            return CITY_COORDINATES[key]
+    return COUNTRY_COORDINATES.get(code)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+On-disk HTTP response cache (SQLite)
+
+Successful GET responses are stored by URL and query parameters. Within an
+endpoint's TTL a stored response is served without touching the network;
+after that it is revalidated with If-None-Match / If-Modified-Since, so an
+unchanged page costs a 304 instead of a full download.
+
+Modes (HTTP_CACHE_MODE):
+  use     serve fresh entries, revalidate stale ones (default)
+  record  always go to the network and store what comes back
+  replay  serve stored responses only - no network, a miss is an error
+  off     plain requests, nothing stored
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+import requests
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key            TEXT PRIMARY KEY,
+    url            TEXT NOT NULL,
+    status         INTEGER NOT NULL,
+    headers        TEXT NOT NULL,
+    body           BLOB NOT NULL,
+    etag           TEXT,
+    last_modified  TEXT,
+    fetched        REAL NOT NULL
+);
+"""
+
+MODES = ('use', 'record', 'replay', 'off')
+
+# Credentials are left out of the cache key so recordings replay with any keys
+SECRET_PARAMS = ('app_id', 'app_key', 'api_key', 'access_token')
+
+
+class CacheMiss(RuntimeError):
+    """Raised in replay mode for a request that was never recorded"""
+
+
+class CachedResponse:
+    """The parts of requests.Response the scrapers use"""
+
+    def __init__(self, status_code: int, headers: Dict[str, str], content: bytes, from_cache: bool):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.from_cache = from_cache
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class HttpCache:
+    """Thread-safe response store with TTL freshness and conditional revalidation"""
+
+    def __init__(self, path: str, mode: str = 'use', secret_params: Iterable[str] = SECRET_PARAMS):
+        if mode not in MODES:
+            raise ValueError(f"HTTP cache mode must be one of {', '.join(MODES)}, not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.secret_params = set(secret_params)
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if mode != 'off':
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            with self._lock, self._conn:
+                self._conn.executescript(SCHEMA)
+
+    def key(self, url: str, params: Optional[Dict] = None) -> str:
+        kept = sorted((k, str(v)) for k, v in (params or {}).items() if k not in self.secret_params)
+        return hashlib.sha256(json.dumps([url, kept]).encode('utf-8')).hexdigest()
+
+    def _load(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT status, headers, body, etag, last_modified, fetched FROM responses WHERE key = ?",
+                (key,)).fetchone()
+
+    def _store(self, key: str, url: str, response) -> None:
+        headers = {k: v for k, v in response.headers.items()
+                   if k.lower() in ('content-type', 'etag', 'last-modified')}
+        with self._lock, self._conn:
+            self._conn.execute(
+                """INSERT OR REPLACE INTO responses
+                   (key, url, status, headers, body, etag, last_modified, fetched)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (key, url, response.status_code, json.dumps(headers), response.content,
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'), time.time()))
+
+    def _touch(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE responses SET fetched = ? WHERE key = ?", (time.time(), key))
+
+    def get(self, url: str, params: Optional[Dict] = None, ttl: float = 0,
+            timeout: float = 15, fetch: Callable = requests.get, **kwargs):
+        """
+        GET through the cache. `ttl` is how many seconds a stored response is
+        served without asking the server. `fetch` does the network call with
+        requests.get's signature (e.g. a rate-limited wrapper).
+        """
+        if self.mode == 'off':
+            return fetch(url, params=params, timeout=timeout, **kwargs)
+
+        key = self.key(url, params)
+        row = self._load(key) if self.mode != 'record' else None
+
+        if self.mode == 'replay':
+            if row is None:
+                raise CacheMiss(f"No recorded response for {url} (key {key[:12]})")
+            self.hits += 1
+            return CachedResponse(row[0], json.loads(row[1]), row[2], True)
+
+        if row is not None and time.time() - row[5] < ttl:
+            self.hits += 1
+            return CachedResponse(row[0], json.loads(row[1]), row[2], True)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if row is not None:
+            if row[3]:
+                headers['If-None-Match'] = row[3]
+            if row[4]:
+                headers['If-Modified-Since'] = row[4]
+
+        response = fetch(url, params=params, timeout=timeout, headers=headers, **kwargs)
+
+        if response.status_code == 304 and row is not None:
+            self.revalidated += 1
+            self._touch(key)
+            return CachedResponse(row[0], json.loads(row[1]), row[2], True)
+
+        self.misses += 1
+        if response.status_code == 200:
+            self._store(key, url, response)
+        return response
+
+    def close(self):
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for every job source
+
+One keep-alive requests.Session with a bounded connection pool per host.
+429 and 5xx responses and connection errors are retried with jittered
+exponential backoff, waiting at least as long as the server's Retry-After.
+Each source gets a circuit breaker: after repeated failed requests it fails
+fast for a cool-down period instead of stalling the run with more retries.
+Given a metrics collector, every attempt's latency, status, retry, backoff
+and rate-limit wait is recorded per source; an `on_attempt(source, status)`
+hook sees every network attempt too, retries and failed ones included
+(status 'error' for a connection error or timeout), e.g. to count quota.
+"""
+
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Never sleep longer than this for a single Retry-After
+MAX_RETRY_AFTER = 120.0
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling a source whose breaker is open"""
+
+
+def retry_after_seconds(response) -> Optional[float]:
+    """Retry-After as seconds (it may be a delay or an HTTP date), None if absent or unparsable"""
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class CircuitBreaker:
+    """
+    Closed until `threshold` consecutive failures, then open for `reset_after`
+    seconds. After that one trial request is let through (half-open): success
+    closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, threshold: int = 5, reset_after: float = 60.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return 'half-open'
+        return 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                if self.opened_at is None or self._trial:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+                self._trial = False
+
+
+class HttpClient:
+    """Pooled, retrying GET client; thread-safe and shared by all sources"""
+
+    def __init__(self, pool_size: int = 10, max_retries: int = 4, backoff: float = 0.5,
+                 max_backoff: float = 30.0, timeout: float = 15.0, rate_limiter=None,
+                 breaker_threshold: int = 5, breaker_reset: float = 60.0,
+                 user_agent: str = 'JobMap scraper', metrics=None,
+                 on_attempt: Optional[Callable[[str, str], None]] = None):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.metrics = metrics
+        self.on_attempt = on_attempt
+        self.requests = 0
+        self.retries = 0
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = user_agent
+        # pool_block caps open connections per host at pool_size, even with more threads
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def breaker(self, source: str) -> CircuitBreaker:
+        with self._lock:
+            if source not in self._breakers:
+                self._breakers[source] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+            return self._breakers[source]
+
+    def backoff_delay(self, attempt: int, response=None) -> float:
+        """Full-jitter exponential backoff, never shorter than Retry-After"""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        if response is not None:
+            retry_after = retry_after_seconds(response)
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, MAX_RETRY_AFTER))
+        return delay
+
+    def get(self, url: str, params: Optional[Dict] = None, timeout: Optional[float] = None,
+            source: Optional[str] = None, **kwargs) -> requests.Response:
+        """
+        GET with retries. `source` names the circuit breaker (defaults to the
+        host). Returns the final response - possibly still a 429/5xx once the
+        retries are used up - and re-raises the last network error.
+        """
+        source = source or urlparse(url).netloc
+        breaker = self.breaker(source)
+        labels = {'source': source}
+        if not breaker.allow():
+            if self.metrics is not None:
+                self.metrics.inc('http_circuit_rejections_total', labels=labels)
+            raise CircuitOpen(f"{source} circuit open after {breaker.failures} failed requests")
+
+        timeout = self.timeout if timeout is None else timeout
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                waited = self.rate_limiter.acquire(url)
+                if self.metrics is not None and waited:
+                    self.metrics.inc('rate_limit_wait_seconds_total', waited, labels)
+            with self._lock:
+                self.requests += 1
+            last = attempt == self.max_retries
+
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                self._record(labels, 'error', started)
+                if last:
+                    breaker.record_failure()
+                    raise
+                response = None
+            else:
+                self._record(labels, str(response.status_code), started)
+                if response.status_code not in RETRY_STATUSES:
+                    breaker.record_success()
+                    return response
+                if last:
+                    breaker.record_failure()
+                    return response
+
+            with self._lock:
+                self.retries += 1
+            delay = self.backoff_delay(attempt, response)
+            if self.metrics is not None:
+                self.metrics.inc('http_retries_total', labels=labels)
+                self.metrics.inc('http_backoff_seconds_total', delay, labels)
+            time.sleep(delay)
+
+    def _record(self, labels: Dict[str, str], status: str, started: float):
+        if self.on_attempt is not None:
+            self.on_attempt(labels['source'], status)
+        if self.metrics is not None:
+            self.metrics.observe('http_request_seconds', time.perf_counter() - started, labels)
+            self.metrics.inc('http_requests_total', labels=dict(labels, status=status))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'retries': self.retries,
+                'breakers': {name: {'state': b.state, 'trips': b.trips}
+                             for name, b in self._breakers.items()}
+            }
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
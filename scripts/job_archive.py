@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Archive of expired job postings
+
+Postings that drop out of the live corpus are appended to one gzip file per
+month of expiry (archive/YYYY-MM.jsonl.gz), one JSON record per line. Each
+append adds a new gzip member, so existing bytes are never rewritten; an
+index records every partition's committed size, and a partial member left by
+a crash is cut off before the next append. Compaction merges a partition's
+members into one, dropping repeated records - once per finished month, and
+earlier for the current month when it has collected too many members.
+"""
+
+import gzip
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from publish import write_atomic, write_json
+
+ARCHIVE_VERSION = 1
+
+
+def record_key(record: Dict) -> tuple:
+    # A posting can expire, come back and expire again - each stint is kept
+    return (record.get('id', ''), record.get('firstSeen', ''))
+
+
+class JobArchive:
+    """Append-only, month-partitioned JSONL.gz store"""
+
+    def __init__(self, directory: str, compact_members: int = 60):
+        self.directory = directory
+        self.compact_members = compact_members
+        self.index_path = os.path.join(directory, 'index.json')
+        self.partitions: Dict[str, Dict] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path, encoding='utf-8') as f:
+                self.partitions = json.load(f).get('partitions', {})
+        self._recover()
+
+    def path(self, partition: str) -> str:
+        return os.path.join(self.directory, f"{partition}.jsonl.gz")
+
+    def _committed(self, partition: str) -> int:
+        return self.partitions.get(partition, {}).get('bytes', 0)
+
+    def _recover(self):
+        """
+        Truncate any bytes past a partition's committed size (an interrupted
+        append), including a partition whose first append never reached the index
+        """
+        if not os.path.isdir(self.directory):
+            return
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.jsonl.gz'):
+                continue
+            path = os.path.join(self.directory, filename)
+            committed = self._committed(filename[:-len('.jsonl.gz')])
+            if os.path.getsize(path) > committed:
+                with open(path, 'r+b') as f:
+                    f.truncate(committed)
+
+    def _save_index(self):
+        write_json(self.index_path, {'v': ARCHIVE_VERSION, 'partitions': self.partitions}, indent=2)
+
+    def append(self, records: Iterable[Dict], when: Optional[datetime] = None) -> Dict[str, int]:
+        """Append records to the partition for `when` (default now); returns {partition: count}"""
+        records = list(records)
+        if not records:
+            return {}
+        partition = (when or datetime.now()).strftime('%Y-%m')
+        lines = ''.join(json.dumps(record, ensure_ascii=False, sort_keys=True) + '\n' for record in records)
+        member = gzip.compress(lines.encode('utf-8'), compresslevel=9, mtime=0)
+
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path(partition), 'ab') as f:
+            # The file may hold a member from a failed append after recovery ran
+            f.truncate(self._committed(partition))
+            f.write(member)
+            f.flush()
+            os.fsync(f.fileno())
+
+        info = self.partitions.setdefault(partition, {'records': 0, 'members': 0, 'bytes': 0,
+                                                      'compacted': None})
+        info['records'] += len(records)
+        info['members'] += 1
+        info['bytes'] += len(member)
+        info['compacted'] = None
+        self._save_index()
+        return {partition: len(records)}
+
+    def records(self, partition: Optional[str] = None) -> Iterator[Dict]:
+        """Every archived record, oldest partition first"""
+        for name in sorted(self.partitions) if partition is None else [partition]:
+            if not os.path.exists(self.path(name)):
+                continue
+            with gzip.open(self.path(name), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    yield json.loads(line)
+
+    def compact(self, partition: str) -> Dict:
+        """Rewrite a partition as a single member, deduplicated and sorted by posting date"""
+        latest: Dict[tuple, Dict] = {}
+        for record in self.records(partition):
+            latest[record_key(record)] = record
+        ordered = sorted(latest.values(), key=lambda r: (r.get('posted', ''), r.get('id', '')))
+        lines = ''.join(json.dumps(record, ensure_ascii=False, sort_keys=True) + '\n' for record in ordered)
+        payload = gzip.compress(lines.encode('utf-8'), compresslevel=9, mtime=0)
+        write_atomic(self.path(partition), payload)
+
+        self.partitions[partition] = {
+            'records': len(ordered),
+            'members': 1,
+            'bytes': len(payload),
+            'compacted': datetime.now().isoformat() + 'Z'
+        }
+        self._save_index()
+        return self.partitions[partition]
+
+    def compaction_due(self, now: Optional[datetime] = None) -> List[str]:
+        current = (now or datetime.now()).strftime('%Y-%m')
+        return [partition for partition, info in sorted(self.partitions.items())
+                if (partition < current and not info['compacted'] and info['members'] > 1)
+                or info['members'] > self.compact_members]
+
+    def compact_due(self, now: Optional[datetime] = None) -> List[str]:
+        due = self.compaction_due(now)
+        for partition in due:
+            self.compact(partition)
+        return due
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Compact in-memory job records
+
+A job dict costs a hash table plus its own string object for every value,
+even the handful of enum labels ("iam", "senior", "unknown") that every
+job repeats. JobRecord keeps the published fields in __slots__ and interns
+the low-cardinality strings (enums, company, location parts, run
+timestamps), so a million held jobs share one copy of each. The location
+restrictions become interned tuples.
+
+Records convert losslessly to and from the jobs.json shape: absent fields
+stay absent, unknown keys are carried along, and the original key order is
+kept (as a shared, interned layout tuple). They also answer the read-only
+dict calls (job['title'], job.get('posted'), 'id' in job), so dedupe, the
+near-duplicate pass and sorting work on them unchanged.
+"""
+
+import sys
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from publish import DICTIONARY_FIELDS
+
+FIELDS = ('id', 'company', 'title', 'location', 'countryCode', 'country', 'city', 'locationType',
+          'type', 'level', 'clearance', 'visaSponsorship', 'workAuthRequired',
+          'locationRestrictions', 'posted', 'url', 'description', 'firstSeen')
+INTERNED_FIELDS = frozenset(DICTIONARY_FIELDS) | {'firstSeen'}
+_FIELD_SET = frozenset(FIELDS)
+
+# Shared tuples: key layouts and location restrictions
+_TUPLES: Dict[Tuple, Tuple] = {}
+
+
+def _shared(values: Iterable) -> Tuple:
+    items = tuple(values)
+    return _TUPLES.setdefault(items, items)
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class JobRecord:
+    __slots__ = FIELDS + ('_keys', '_extra')
+
+    @classmethod
+    def from_dict(cls, job: Dict) -> 'JobRecord':
+        record = cls.__new__(cls)
+        extra = None
+        for key, value in job.items():
+            if key not in _FIELD_SET:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+            elif key in INTERNED_FIELDS:
+                setattr(record, key, _intern(value))
+            elif key == 'locationRestrictions' and isinstance(value, list):
+                setattr(record, key, _shared(_intern(item) for item in value))
+            else:
+                setattr(record, key, value)
+        record._keys = _shared(sys.intern(key) for key in job)
+        record._extra = extra
+        return record
+
+    def to_dict(self) -> Dict:
+        job = {}
+        for key in self._keys:
+            if key in _FIELD_SET:
+                value = getattr(self, key)
+                job[key] = list(value) if key == 'locationRestrictions' and isinstance(value, tuple) else value
+            else:
+                job[key] = self._extra[key]
+        return job
+
+    # -- read-only mapping access --------------------------------------------
+
+    def __getitem__(self, key: str):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, JobRecord):
+            other = other.to_dict()
+        return isinstance(other, dict) and self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"JobRecord({self.get('id')!r}, {self.get('title')!r})"
+
+
+def to_records(jobs: Iterable[Dict]) -> List[JobRecord]:
+    return [JobRecord.from_dict(job) for job in jobs]
+
+
+def to_dicts(records: Iterable[JobRecord]) -> List[Dict]:
+    return [record.to_dict() for record in records]
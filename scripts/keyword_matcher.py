@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Single-pass phrase matching for job classification
+
+All phrase lists are compiled once into a trie-shaped regex per scope (title
+or full text). A scan reads each document once per scope and reports which
+named phrase groups occur, so the cost no longer grows with the number of
+phrase lists.
+"""
+
+import hashlib
+import re
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Sequence, Tuple
+
+
+class Hits(NamedTuple):
+    title: FrozenSet[str]  # title-scoped groups with a phrase inside the title
+    text: FrozenSet[str]   # text-scoped groups with a phrase anywhere in "title description"
+
+
+def rule_groups(field: str, rules: Sequence[Tuple[str, Iterable[str]]]) -> Dict[str, List[str]]:
+    """Name an ordered (label, phrases) rule list as `field:label` groups"""
+    return {f"{field}:{label}": list(phrases) for label, phrases in rules}
+
+
+def first_label(hits: FrozenSet[str], field: str, rules: Sequence[Tuple[str, Iterable[str]]],
+                default: str) -> str:
+    """Label of the first rule whose group was hit - the old if/elif ladder"""
+    for label, _ in rules:
+        if f"{field}:{label}" in hits:
+            return label
+    return default
+
+
+def _trie_pattern(phrases: Iterable[str]) -> str:
+    """Regex for a set of literals, factored by common prefix with greedy optional tails"""
+    root: Dict[str, dict] = {}
+    for phrase in phrases:
+        node = root
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(root) or '(?!)'
+
+
+class _CompiledGroups:
+    """One regex over every phrase of a set of groups"""
+
+    def __init__(self, groups: Dict[str, List[str]]):
+        owners: Dict[str, set] = {}
+        for name, phrases in groups.items():
+            for phrase in phrases:
+                owners.setdefault(phrase, set()).add(name)
+        phrases = sorted(owners)
+
+        # The regex reports the longest phrase at each match position. Shorter
+        # phrases starting at the same position are its prefixes.
+        self.regex = re.compile(_trie_pattern(phrases))
+        self.implied = {
+            longest: frozenset().union(*(owners[p] for p in phrases if longest.startswith(p)))
+            for longest in phrases
+        }
+        # Matches do not overlap, so a phrase starting inside another match is
+        # hidden. Only the few phrases that can be hidden that way are re-checked.
+        self.hidden = {
+            outer: [p for p in phrases
+                    if any(outer[k:].startswith(p) or p.startswith(outer[k:])
+                           for k in range(1, len(outer)))]
+            for outer in phrases
+        }
+        self.owners = {p: frozenset(names) for p, names in owners.items()}
+
+    def groups_in(self, text: str) -> FrozenSet[str]:
+        found = set(self.regex.findall(text))
+        names = set()
+        for phrase in found:
+            names |= self.implied[phrase]
+        for phrase in {p for outer in found for p in self.hidden[outer]} - found:
+            if phrase in text:
+                names |= self.owners[phrase]
+        return frozenset(names)
+
+
+class PhraseMatcher:
+    """Compiled matcher for named groups of lowercase phrases"""
+
+    def __init__(self, text_groups: Dict[str, Iterable[str]],
+                 title_groups: Dict[str, Iterable[str]] = None):
+        self.text_groups = {name: list(phrases) for name, phrases in text_groups.items()}
+        self.title_groups = {name: list(phrases) for name, phrases in (title_groups or {}).items()}
+        self._text = _CompiledGroups(self.text_groups)
+        self._title = _CompiledGroups(self.title_groups)
+
+        # Stable fingerprint of every phrase list, for cache invalidation
+        digest = hashlib.sha256()
+        for scope, groups in (('title', self.title_groups), ('text', self.text_groups)):
+            for name in sorted(groups):
+                digest.update(f"{scope}:{name}".encode('utf-8'))
+                for phrase in groups[name]:
+                    digest.update(b'\0' + phrase.encode('utf-8'))
+                digest.update(b'\1')
+        self.signature = digest.hexdigest()[:16]
+
+    def scan(self, title: str, description: str = '') -> Hits:
+        title_lower = title.lower()
+        text = f"{title_lower} {description.lower()}"
+        return Hits(self._title.groups_in(title_lower), self._text.groups_in(text))
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Run metrics for the scraper
+
+Stage timers with jobs in/out, labelled counters and latency histograms,
+collected thread-safely during a run and exported as a JSON run report and a
+Prometheus textfile (for node_exporter's textfile collector). An opt-in
+cProfile hook profiles chosen hot paths in every thread that runs them.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Seconds; the last bucket is +Inf
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 4),
+            'buckets': dict([(f"{bound:g}", n) for bound, n in zip(self.buckets, self.counts)]
+                            + [('+Inf', self.counts[-1])])
+        }
+
+
+class StageStats:
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self.jobs_in = 0
+        self.jobs_out = 0
+
+
+class Metrics:
+    """Collects one run's measurements; every method is safe to call from worker threads"""
+
+    def __init__(self, namespace: str = 'jobmap'):
+        self.namespace = namespace
+        self.started = time.time()
+        self.stages: Dict[str, StageStats] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.histograms: Dict[Tuple[str, Labels], Histogram] = {}
+        self._profiles: List[cProfile.Profile] = []
+        self._profiled: set = set()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # -- stages --------------------------------------------------------------
+
+    @contextmanager
+    def stage(self, name: str, jobs_in: int = 0) -> Iterator[StageStats]:
+        """
+        Time a stage. Set `.jobs_out` on the yielded object (and `.jobs_in` if
+        not known up front); repeated entries accumulate.
+        """
+        run = StageStats()
+        run.jobs_in = jobs_in
+        started = time.perf_counter()
+        try:
+            yield run
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                total = self.stages.setdefault(name, StageStats())
+                total.seconds += elapsed
+                total.calls += 1
+                total.jobs_in += run.jobs_in
+                total.jobs_out += run.jobs_out
+
+    # -- counters and histograms --------------------------------------------
+
+    def inc(self, name: str, amount: float = 1, labels: Optional[Dict[str, str]] = None):
+        key = (name, _labels(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        key = (name, _labels(labels))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    # -- profiling -----------------------------------------------------------
+
+    def enable_profiling(self, *sections: str):
+        self._profiled.update(sections)
+
+    @contextmanager
+    def profile(self, section: str):
+        """cProfile the block if `section` was enabled; one profiler per thread, merged on export"""
+        if section not in self._profiled:
+            yield
+            return
+        profiler = getattr(self._local, 'profiler', None)
+        if profiler is None:
+            profiler = self._local.profiler = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profiler)
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler owns this thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            profiler.disable()
+
+    # -- export --------------------------------------------------------------
+
+    def report(self, extra: Optional[Dict] = None) -> Dict:
+        with self._lock:
+            counters: Dict[str, List[Dict]] = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                counters.setdefault(name, []).append({'labels': dict(labels), 'value': round(value, 4)})
+            histograms: Dict[str, List[Dict]] = {}
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                histograms.setdefault(name, []).append(dict(histogram.to_dict(), labels=dict(labels)))
+            report = {
+                'started': datetime.fromtimestamp(self.started).isoformat() + 'Z',
+                'durationSeconds': round(time.time() - self.started, 3),
+                'stages': {
+                    name: {'seconds': round(s.seconds, 4), 'calls': s.calls,
+                           'jobsIn': s.jobs_in, 'jobsOut': s.jobs_out}
+                    for name, s in self.stages.items()
+                },
+                'counters': counters,
+                'histograms': histograms
+            }
+        report.update(extra or {})
+        return report
+
+    def prometheus(self) -> str:
+        ns = self.namespace
+        lines = [
+            f"# TYPE {ns}_run_duration_seconds gauge",
+            f"{ns}_run_duration_seconds {time.time() - self.started:.3f}",
+            f"# TYPE {ns}_last_run_timestamp_seconds gauge",
+            f"{ns}_last_run_timestamp_seconds {self.started:.0f}"
+        ]
+        with self._lock:
+            for metric, attribute in (('stage_seconds', 'seconds'), ('stage_jobs_in', 'jobs_in'),
+                                      ('stage_jobs_out', 'jobs_out')):
+                lines.append(f"# TYPE {ns}_{metric} gauge")
+                for name, stats in self.stages.items():
+                    lines.append(f'{ns}_{metric}{{stage="{name}"}} {getattr(stats, attribute):g}')
+
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {ns}_{name} counter")
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{ns}_{name}{_format_labels(labels)} {value:g}")
+
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {ns}_{name} histogram")
+                for (histogram_name, labels), histogram in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, n in zip(histogram.buckets, histogram.counts):
+                        cumulative += n
+                        le = _format_labels(labels, 'le="%g"' % bound)
+                        lines.append(f"{ns}_{name}_bucket{le} {cumulative}")
+                    le = _format_labels(labels, 'le="+Inf"')
+                    lines.append(f"{ns}_{name}_bucket{le} {histogram.count}")
+                    lines.append(f"{ns}_{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{ns}_{name}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, directory: str, extra: Optional[Dict] = None) -> List[str]:
+        """Write run_report.json, <namespace>.prom and any profiles; returns the paths"""
+        os.makedirs(directory, exist_ok=True)
+        written = []
+
+        path = os.path.join(directory, 'run_report.json')
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(extra), f, indent=2)
+        written.append(path)
+
+        # The textfile collector may read at any moment, so never expose a half-written file
+        path = os.path.join(directory, f"{self.namespace}.prom")
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self.prometheus())
+        os.replace(path + '.tmp', path)
+        written.append(path)
+
+        with self._lock:
+            profiles = [profile for profile in self._profiles if profile.getstats()]
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            path = os.path.join(directory, 'profile.prof')
+            stats.dump_stats(path)
+            written.append(path)
+
+            text = io.StringIO()
+            pstats.Stats(path, stream=text).sort_stats('cumulative').print_stats(40)
+            path = os.path.join(directory, 'profile.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text.getvalue())
+            written.append(path)
+        return written
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection with MinHash signatures and LSH banding
+
+Reposts of the same role under a tweaked title, a reference number or another
+agency's name are not caught by the exact (company, title) key. Each job is
+reduced to a MinHash signature over shingles of its normalized company, title
+and description. Jobs that share an LSH band become candidates and are only
+compared to each other, so the whole pass stays roughly linear in the number
+of jobs.
+"""
+
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+NUM_BINS = 64
+# Title shingles are counted this many times, so shared company boilerplate
+# in descriptions cannot make two unrelated titles look alike
+TITLE_WEIGHT = 3
+_MASK64 = (1 << 64) - 1
+_MIX = 0x9E3779B97F4A7C15
+_EMPTY = _MASK64
+_TOKEN = re.compile(r'[a-z]+')
+
+
+def normalize(text: str) -> List[str]:
+    """Lowercase word tokens; digits and punctuation (reference numbers, dashes) are dropped"""
+    return _TOKEN.findall((text or '').lower())
+
+
+def shingles(job: Dict) -> Set[str]:
+    """Company words, (weighted) title words and word pairs, and description word triples"""
+    company = normalize(job.get('company', ''))
+    title = normalize(job.get('title', ''))
+    description = normalize(job.get('description', ''))
+
+    title_shingles = set(title) | {f"{a} {b}" for a, b in zip(title, title[1:])}
+
+    result = {f"c:{word}" for word in company}
+    for copy in range(TITLE_WEIGHT):
+        result.update(f"t{copy}:{shingle}" for shingle in title_shingles)
+    result.update(f"d:{a} {b} {c}" for a, b, c in zip(description, description[1:], description[2:]))
+    return result
+
+
+def signature(features: Set[str], num_bins: int = NUM_BINS) -> Tuple[int, ...]:
+    """
+    One-permutation MinHash: every shingle is hashed once and lands in one of
+    `num_bins` bins, each keeping its minimum. Empty bins borrow from the next
+    filled bin (rotation densification), so the estimate stays unbiased for
+    short texts.
+    """
+    bins = [_EMPTY] * num_bins
+    for feature in features:
+        h = (zlib.crc32(feature.encode('utf-8')) * _MIX) & _MASK64
+        index = h % num_bins
+        value = h // num_bins
+        if value < bins[index]:
+            bins[index] = value
+
+    if all(value == _EMPTY for value in bins):
+        return tuple(bins)
+
+    for i in range(num_bins):
+        if bins[i] == _EMPTY:
+            offset = 1
+            while bins[(i + offset) % num_bins] == _EMPTY:
+                offset += 1
+            # Offset keeps borrowed values distinct from the donor's own
+            bins[i] = bins[(i + offset) % num_bins] + offset * (_MASK64 // num_bins)
+    return tuple(bins)
+
+
+def similarity(a: Sequence[int], b: Sequence[int]) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+def choose_bands(threshold: float, num_bins: int = NUM_BINS) -> Tuple[int, int]:
+    """
+    (bands, rows) whose LSH S-curve midpoint, (1/bands) ** (1/rows), sits just
+    below the threshold - a little extra recall, with candidates verified anyway.
+    """
+    options = [(b, num_bins // b) for b in range(1, num_bins + 1) if num_bins % b == 0]
+    below = [o for o in options if (1 / o[0]) ** (1 / o[1]) <= threshold] or options
+    return min(below, key=lambda o: threshold - (1 / o[0]) ** (1 / o[1]))
+
+
+def find_near_duplicates(jobs: Iterable[Dict], threshold: float = 0.85,
+                         num_bins: int = NUM_BINS) -> Dict[int, Tuple[int, float]]:
+    """
+    Map each duplicate's index to (canonical index, similarity of the two).
+    Only jobs in the same country are compared. In input order, a job is a
+    duplicate of the earliest kept job it matches; matching only jobs that
+    were dropped themselves keeps it, so a chain A~B~C never drops C for A
+    unless C matches A. `jobs` is read once, so it may be a stream.
+    """
+    bands, rows = choose_bands(threshold, num_bins)
+    signatures = []
+    buckets = defaultdict(list)
+    for index, job in enumerate(jobs):
+        sig = signature(shingles(job), num_bins)
+        signatures.append(sig)
+        if sig[0] == _EMPTY:
+            continue
+        country = job.get('countryCode') or job.get('location', '').split(', ')[-1]
+        for band in range(bands):
+            buckets[(country, band, sig[band * rows:(band + 1) * rows])].append(index)
+
+    # Verified pairs: later index -> [(earlier index, similarity)]
+    matches: Dict[int, List[Tuple[int, float]]] = defaultdict(list)
+    checked = set()
+    for members in buckets.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                if (a, b) in checked:
+                    continue
+                checked.add((a, b))
+                score = similarity(signatures[a], signatures[b])
+                if score >= threshold:
+                    matches[b].append((a, score))
+
+    duplicates: Dict[int, Tuple[int, float]] = {}
+    for index in sorted(matches):
+        canonical = [(a, score) for a, score in matches[index] if a not in duplicates]
+        if canonical:
+            duplicates[index] = min(canonical)
+    return duplicates
+
+
+def collapse_near_duplicates(jobs: List[Dict], threshold: float = 0.85
+                             ) -> Tuple[List[Dict], List[Tuple[Dict, Dict, float]]]:
+    """Keep one job per near-duplicate cluster; also return (duplicate, canonical, similarity)"""
+    duplicates = find_near_duplicates(jobs, threshold)
+    kept = [job for index, job in enumerate(jobs) if index not in duplicates]
+    dropped = [(jobs[index], jobs[canonical], score)
+               for index, (canonical, score) in sorted(duplicates.items())]
+    return kept, dropped
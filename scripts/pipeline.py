@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Pluggable job sources and a streaming pipeline
+
+Sources are registered by name with a time budget and run concurrently, each
+in its own thread, feeding one bounded queue. Arrival order depends on
+thread timing, so run_sources can instead deliver postings in registry
+order: the earliest unfinished source streams straight through while the
+postings of later ones are held until it is done. Stages that keep the
+first of several postings then pick the same one every run. The pipeline
+stages are plain generator functions (iterator in, iterator out) and
+`buffered` puts a bounded queue between two of them, so at most
+`queue_size` postings wait at any point no matter how many sources or pages
+there are (plus, in registry order, what later sources have produced while
+an earlier one is still running).
+
+A budget only stops the pipeline reading from a source; a thread blocked in
+a request runs on until that request returns. Sources should cap their
+request timeouts at time_left() so that happens about when the budget ends.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+Stage = Callable[[Iterable[Dict]], Iterator[Dict]]
+
+_DONE = object()
+_local = threading.local()
+
+
+def time_left(default: float) -> float:
+    """Seconds left in the calling source's budget; `default` outside a source thread"""
+    deadline = getattr(_local, 'deadline', None)
+    return default if deadline is None else deadline - time.monotonic()
+
+
+class Source:
+    """A named posting generator with a wall-clock budget in seconds"""
+
+    def __init__(self, name: str, fetch: Callable[[], Iterable[Dict]], budget: float):
+        self.name = name
+        self.fetch = fetch
+        self.budget = budget
+        self.count = 0
+        self.status = 'pending'
+        self.elapsed = 0.0
+
+
+class SourceRegistry:
+    """Ordered set of sources; use `register` as a decorator on a generator function"""
+
+    def __init__(self, default_budget: float = 120.0):
+        self.default_budget = default_budget
+        self._sources: Dict[str, Source] = {}
+
+    def register(self, name: str, budget: Optional[float] = None):
+        def decorator(fetch: Callable[[], Iterable[Dict]]):
+            self._sources[name] = Source(name, fetch, self.default_budget if budget is None else budget)
+            return fetch
+        return decorator
+
+    def sources(self, names: Optional[Iterable[str]] = None) -> List[Source]:
+        if names is None:
+            return list(self._sources.values())
+        return [self._sources[name] for name in names]
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up once `stop` is set"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def run_sources(sources: List[Source], queue_size: int = 100, in_order: bool = False) -> Iterator[Dict]:
+    """
+    Run every source in its own thread and yield postings as they arrive, or
+    with `in_order` each source's postings after those of the sources before
+    it in `sources`. A source still running when its budget is spent is cut
+    off (status 'timeout'); what it produced so far is kept.
+    """
+    q: queue.Queue = queue.Queue(maxsize=queue_size)
+    by_name = {source.name: source for source in sources}
+    stops = {source.name: threading.Event() for source in sources}
+    started = time.monotonic()
+
+    def produce(source: Source):
+        stop = stops[source.name]
+        source.status = 'running'
+        _local.deadline = started + source.budget
+        try:
+            for posting in source.fetch():
+                if stop.is_set() or not _put(q, (source.name, posting), stop):
+                    break
+                source.count += 1
+            else:
+                source.status = 'ok'
+        except Exception as e:  # a source bug must not take the others down
+            source.status = f"error: {e}"
+        finally:
+            if source.status == 'running':
+                source.status = 'timeout'
+            source.elapsed = time.monotonic() - started
+            _put(q, (source.name, _DONE), stop)
+
+    for source in sources:
+        threading.Thread(target=produce, args=(source,), name=f"source-{source.name}", daemon=True).start()
+
+    deadlines = {source.name: started + source.budget for source in sources}
+    pending = set(deadlines)
+    # In order: the sources not yet finished and passed on, earliest first, and what later ones sent meanwhile
+    order = [source.name for source in sources] if in_order else []
+    held: Dict[str, List[Dict]] = {name: [] for name in order}
+
+    def release() -> Iterator[Dict]:
+        while order and order[0] not in pending:
+            yield from held.pop(order.pop(0))
+        if order:
+            yield from held[order[0]]
+            held[order[0]] = []
+
+    try:
+        while pending:
+            now = time.monotonic()
+            for name in [n for n in pending if deadlines[n] <= now]:
+                # Past its budget: stop reading from it, its thread exits at the next posting
+                stops[name].set()
+                pending.discard(name)
+                if by_name[name].status == 'running':
+                    by_name[name].status = 'timeout'
+                    by_name[name].elapsed = now - started
+            yield from release()
+            if not pending:
+                break
+            try:
+                item = q.get(timeout=max(0.0, min(deadlines[n] for n in pending) - now))
+            except queue.Empty:
+                continue
+            name, posting = item
+            if posting is _DONE:
+                pending.discard(name)
+                yield from release()
+            elif stops[name].is_set():
+                continue
+            elif not in_order or name == order[0]:
+                yield posting
+            else:
+                held[name].append(posting)
+    finally:
+        for stop in stops.values():
+            stop.set()
+
+
+def buffered(items: Iterable[Dict], queue_size: int = 100) -> Iterator[Dict]:
+    """
+    Pull `items` on a background thread through a bounded queue, so the
+    upstream stage (e.g. network-bound) overlaps with the downstream one.
+    """
+    q: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    failure: List[BaseException] = []
+
+    def pump():
+        try:
+            for item in items:
+                if not _put(q, item, stop):
+                    return
+        except BaseException as e:
+            failure.append(e)
+        finally:
+            _put(q, _DONE, stop)
+
+    threading.Thread(target=pump, daemon=True).start()
+    try:
+        while True:
+            item = q.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        stop.set()
+    if failure:
+        raise failure[0]
+
+
+def run_pipeline(items: Iterable[Dict], stages: Iterable[Stage], queue_size: int = 100) -> Iterator[Dict]:
+    """Chain `stages` over `items` with a bounded queue after each one"""
+    for stage in stages:
+        items = buffered(stage(items), queue_size)
+    return iter(items)
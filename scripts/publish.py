@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+Publishing helpers for the static site
+
+Besides the legacy data/jobs.json, the corpus is split into one small shard
+per country plus a manifest with per-country counts and shard hashes, so the
+map can colour itself from the manifest and fetch a country's jobs on click.
+
+The whole corpus is also published in a compact columnar form with
+dictionary-encoded enums and interned strings, precompressed with gzip and
+(when the brotli package is installed) brotli under content-hashed names
+that CDNs can cache forever.
+
+Each run is diffed against the previously published corpus. When nothing
+material changed the published files are left untouched; otherwise a small
+delta (added, updated and removed jobs) is added to data/deltas/ so clients
+holding an earlier copy can catch up without re-downloading everything
+(js/corpus.js does). Jobs are keyed by crawl_state.job_id and published in
+corpus_order, which apply_delta restores; the manifest's orderHash lets a
+client check that it did.
+Every file is written atomically, so a crash never leaves a half-written one.
+
+jobs.json itself is streamed job by job in exactly json.dump's indent=2
+layout, and read back the same way, so neither side needs the serialized
+corpus in memory. Country shards are streamed into their files the same
+way, and the compact corpus and order hash are built in one pass, so every
+writer can take a stream of jobs (e.g. a spill re-read per output).
+Anything with a to_dict() (JobRecord) can be published.
+"""
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import ExitStack, contextmanager
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from crawl_state import job_id
+from spill import posted_epoch
+
+try:
+    import brotli
+except ImportError:  # optional - .br variants are skipped without it
+    brotli = None
+
+COMPACT_VERSION = 1
+DELTA_VERSION = 1
+
+# mkstemp creates files as 0600; published files get the usual umask-based mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+# Low-cardinality fields stored as indexes into a per-field dictionary
+DICTIONARY_FIELDS = ('company', 'location', 'countryCode', 'country', 'city', 'locationType',
+                     'type', 'level', 'clearance', 'visaSponsorship')
+
+
+def content_hash(payload: bytes) -> str:
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+def encode_record(value):
+    """json `default` hook: publish JobRecords (anything with to_dict) as plain objects"""
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+@contextmanager
+def atomic_file(path: str) -> Iterator[BinaryIO]:
+    """Binary file that replaces `path` only once the block completes"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                                    prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_atomic(path: str, data: bytes):
+    """Write via a temp file in the same directory and rename it into place"""
+    with atomic_file(path) as f:
+        f.write(data)
+
+
+def write_json(path: str, doc, **dump_args):
+    write_atomic(path, json.dumps(doc, ensure_ascii=False, default=encode_record, **dump_args).encode('utf-8'))
+
+
+def write_json_stream(path: str, header: Dict, list_key: str, items: Iterable) -> int:
+    """
+    Atomically write {**header, list_key: [*items]} item by item, byte-identical
+    to json.dump(..., indent=2, ensure_ascii=False). Returns the item count.
+    """
+    def encode(value, depth: int) -> bytes:
+        text = json.dumps(value, indent=2, ensure_ascii=False, default=encode_record)
+        return text.replace('\n', '\n' + '  ' * depth).encode('utf-8')
+
+    count = 0
+    with atomic_file(path) as f:
+        f.write(b'{')
+        for name, value in header.items():
+            f.write(b'\n  ' + encode(name, 1) + b': ' + encode(value, 1) + b',')
+        f.write(b'\n  ' + encode(list_key, 1) + b': [')
+        for item in items:
+            f.write((b',\n    ' if count else b'\n    ') + encode(item, 2))
+            count += 1
+        f.write(b'\n  ]\n}' if count else b']\n}')
+    return count
+
+
+def read_json_stream(path: str, list_key: str = 'jobs') -> Optional[Tuple[Dict, Iterator[Dict]]]:
+    """
+    (header, lazy item iterator) of a file in write_json_stream's layout;
+    other layouts fall back to a full json.load. None if missing or unreadable.
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            layout = _read_header(f, list_key)
+            offset = f.tell()
+    except OSError:
+        return None
+    if layout is not None:
+        header, empty = layout
+        return header, iter(()) if empty else _stream_items(path, offset)
+
+    # Not our layout (e.g. minified): load it whole
+    try:
+        with open(path, encoding='utf-8') as f:
+            doc = json.load(f)
+    except (OSError, ValueError):
+        return None
+    items = doc.pop(list_key, [])
+    return doc, iter(items)
+
+
+def _read_header(f, list_key: str) -> Optional[Tuple[Dict, bool]]:
+    """Scalar members before the list, and whether the list is empty; None if the layout differs"""
+    if f.readline() != '{\n':
+        return None
+    opening = f'  {json.dumps(list_key)}: ['
+    header = {}
+    while True:
+        line = f.readline().rstrip('\n')
+        if line in (opening, opening + ']'):
+            return header, line.endswith(']')
+        if not (line.startswith('  "') and line.endswith(',')):
+            return None
+        try:
+            header.update(json.loads('{' + line[:-1] + '}'))
+        except ValueError:
+            return None
+
+
+def _stream_items(path: str, offset: int) -> Iterator[Dict]:
+    with open(path, encoding='utf-8') as f:
+        f.seek(offset)
+        lines = []
+        for line in f:
+            if line.startswith('    }') or (not lines and line.rstrip(',\n') == '    {}'):
+                lines.append(line.rstrip(',\n'))
+                yield json.loads(''.join(lines))
+                lines = []
+            elif line.startswith('  ]'):
+                return
+            else:
+                lines.append(line)
+
+
+def load_published(path: str) -> Optional[Dict]:
+    """The previously published jobs.json, or None if missing or unreadable"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_country_shards(jobs: Iterable[Dict], data_dir: str, country_of: Callable[[Dict], str],
+                         country_names: Dict[str, str], last_update: str,
+                         extra: Optional[Dict] = None) -> Dict:
+    """
+    Write data/countries/<code>.json shards and data/manifest.json; returns the
+    manifest. Each job is appended to its (open, atomic) shard file as it
+    arrives, hashing the bytes on the way, so only per-country totals are held.
+    """
+    shard_dir = os.path.join(data_dir, 'countries')
+    os.makedirs(shard_dir, exist_ok=True)
+
+    def emit(shard: Dict, data: bytes):
+        shard['file'].write(data)
+        shard['digest'].update(data)
+        shard['bytes'] += len(data)
+
+    shards: Dict[str, Dict] = {}
+    companies = set()
+    total = remote = 0
+    with ExitStack() as stack:
+        for job in jobs:
+            code = country_of(job) or 'other'
+            shard = shards.get(code)
+            if shard is None:
+                name = country_names.get(code, 'Other')
+                shard = shards[code] = {
+                    'name': name, 'count': 0, 'remote': 0, 'bytes': 0, 'digest': hashlib.sha256(),
+                    'file': stack.enter_context(atomic_file(os.path.join(shard_dir, f"{code}.json")))
+                }
+                # Byte for byte json.dumps({'country': ..., 'name': ..., 'jobs': [...]}, separators=(',', ':'))
+                header = json.dumps({'country': code, 'name': name}, ensure_ascii=False, separators=(',', ':'))
+                emit(shard, (header[:-1] + ',"jobs":[').encode('utf-8'))
+            emit(shard, (b',' if shard['count'] else b'') + json.dumps(
+                job, ensure_ascii=False, separators=(',', ':'), default=encode_record).encode('utf-8'))
+            shard['count'] += 1
+            total += 1
+            if job.get('locationType') == 'remote':
+                shard['remote'] += 1
+                remote += 1
+            companies.add(job.get('company', ''))
+        for shard in shards.values():
+            emit(shard, b']}')
+
+    countries = {
+        code: {
+            'name': shards[code]['name'],
+            'count': shards[code]['count'],
+            'remote': shards[code]['remote'],
+            'shard': f"countries/{code}.json",
+            'hash': shards[code]['digest'].hexdigest()[:16],
+            'bytes': shards[code]['bytes']
+        }
+        for code in sorted(shards)
+    }
+
+    # Countries that dropped out of the corpus must not leave a stale shard behind
+    for filename in os.listdir(shard_dir):
+        if filename.endswith('.json') and filename[:-5] not in shards:
+            os.remove(os.path.join(shard_dir, filename))
+
+    manifest = {
+        'lastUpdate': last_update,
+        'totalJobs': total,
+        'remoteJobs': remote,
+        'companies': len(companies),
+        'countries': countries
+    }
+    manifest.update(extra or {})
+    write_json(os.path.join(data_dir, 'manifest.json'), manifest, indent=2)
+
+    return manifest
+
+
+def build_compact(jobs: Iterable[Dict], last_update: str) -> Dict:
+    """
+    Columnar form of the corpus: one array per field, with dictionary fields
+    (and each locationRestrictions entry) stored as indexes into a value
+    table. A field missing from a job is stored as null. Built in one pass:
+    a field first seen at row n starts out with n nulls.
+    """
+    fields: List[str] = []
+    columns: Dict[str, List] = {}
+    booleans = set()
+    count = 0
+    dictionaries: Dict[str, List] = {}
+    positions: Dict[str, Dict] = {}
+
+    def code(field: str, value) -> int:
+        table = positions.setdefault(field, {})
+        if value not in table:
+            table[value] = len(table)
+            dictionaries.setdefault(field, []).append(value)
+        return table[value]
+
+    for job in jobs:
+        for field in job:
+            if field not in columns:
+                fields.append(field)
+                columns[field] = [None] * count
+        for field in fields:
+            column = columns[field]
+            if field not in job:
+                column.append(None)
+            elif field in DICTIONARY_FIELDS:
+                column.append(code(field, job[field]))
+            elif field == 'locationRestrictions':
+                column.append([code(field, value) for value in job[field]])
+            elif isinstance(job[field], bool):
+                booleans.add(field)
+                column.append(int(job[field]))
+            else:
+                column.append(job[field])
+        count += 1
+
+    return {
+        'v': COMPACT_VERSION,
+        'lastUpdate': last_update,
+        'count': count,
+        'fields': fields,
+        'dict': dictionaries,
+        'bool': [f for f in fields if f in booleans],
+        'cols': columns
+    }
+
+
+def expand_compact(doc: Dict) -> List[Dict]:
+    """Reference decoder: rebuild the jobs.json records from build_compact output"""
+    dictionaries = doc['dict']
+    booleans = set(doc['bool'])
+    jobs = []
+    for row in range(doc['count']):
+        job = {}
+        for field in doc['fields']:
+            value = doc['cols'][field][row]
+            if value is None:
+                continue
+            if field in DICTIONARY_FIELDS:
+                value = dictionaries[field][value]
+            elif field == 'locationRestrictions':
+                value = [dictionaries[field][code] for code in value]
+            elif field in booleans:
+                value = bool(value)
+            job[field] = value
+        jobs.append(job)
+    return jobs
+
+
+def write_compact(jobs: Iterable[Dict], data_dir: str, last_update: str) -> Dict:
+    """
+    Write data/jobs.<hash>.min.json plus .gz / .br variants and return
+    {'json': name, 'gzip': name, 'brotli': name?, 'sizes': {...}}. The files
+    named by the manifest still on disk (the previous publish) are kept, so a
+    client holding that manifest can still load them; older ones are dropped.
+    Call before the new manifest is written.
+    """
+    payload = json.dumps(build_compact(jobs, last_update), ensure_ascii=False,
+                         separators=(',', ':')).encode('utf-8')
+    name = f"jobs.{content_hash(payload)}.min.json"
+
+    variants = {'json': (name, payload)}
+    # mtime=0 keeps the gzip bytes stable for identical content
+    variants['gzip'] = (name + '.gz', gzip.compress(payload, compresslevel=9, mtime=0))
+    if brotli is not None:
+        variants['brotli'] = (name + '.br', brotli.compress(payload, quality=11))
+
+    for filename, data in variants.values():
+        write_atomic(os.path.join(data_dir, filename), data)
+    previous = (load_published(os.path.join(data_dir, 'manifest.json')) or {}).get('compact', {})
+    keep = {filename for filename, _ in variants.values()}
+    keep.update(value for value in previous.values() if isinstance(value, str))
+    for old in glob.glob(os.path.join(data_dir, 'jobs.*.min.json*')):
+        if os.path.basename(old) not in keep:
+            os.remove(old)
+
+    info = {kind: filename for kind, (filename, _) in variants.items()}
+    info['sizes'] = {kind: len(data) for kind, (_, data) in variants.items()}
+    return info
+
+
+def format_size(size: int) -> str:
+    return f"{size / 1024:.1f} KB" if size >= 1024 else f"{size} B"
+
+
+def corpus_order(job: Dict) -> Tuple[int, str]:
+    """Published order: newest posting first, then by job id"""
+    return (-posted_epoch(job.get('posted')), job_id(job))
+
+
+def order_hash(jobs: Iterable[Dict]) -> str:
+    """Hash of the job ids in order - what a client's caught-up copy must match"""
+    # content_hash of the newline-joined ids, without joining them
+    digest = hashlib.sha256()
+    for position, job in enumerate(jobs):
+        digest.update((('\n' if position else '') + job_id(job)).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def fingerprint(job) -> str:
+    return content_hash(json.dumps(job, ensure_ascii=False, sort_keys=True,
+                                   default=encode_record).encode('utf-8'))
+
+
+def diff_jobs(previous: Iterable[Dict], current: Iterable[Dict],
+              key: Callable[[Dict], str] = job_id) -> Dict:
+    """
+    Jobs added and updated (as given) and keys removed between two corpora.
+    Only a fingerprint per previous job is held, so `previous` can be a stream.
+    """
+    before = {key(job): fingerprint(job) for job in previous}
+    diff = {'added': [], 'updated': [], 'removed': []}
+    current_keys = set()
+    for job in current:
+        job_key = key(job)
+        current_keys.add(job_key)
+        if job_key not in before:
+            diff['added'].append(job)
+        elif fingerprint(job) != before[job_key]:
+            diff['updated'].append(job)
+    diff['removed'] = sorted(job_key for job_key in before if job_key not in current_keys)
+    return diff
+
+
+def is_empty(diff: Dict) -> bool:
+    return not (diff['added'] or diff['updated'] or diff['removed'])
+
+
+def apply_delta(jobs: List[Dict], delta: Dict, key: Callable[[Dict], str] = job_id) -> List[Dict]:
+    """Reference client: bring a cached corpus up to date with one delta file, in corpus_order"""
+    gone = set(delta['removed']) | {key(job) for job in delta['updated']}
+    merged = [job for job in jobs if key(job) not in gone]
+    merged.extend(delta['updated'])
+    merged.extend(delta['added'])
+    merged.sort(key=corpus_order)
+    return merged
+
+
+def write_delta(diff: Dict, data_dir: str, since: str, last_update: str, keep: int = 60) -> Dict:
+    """
+    Write data/deltas/<hash>.json and append it to data/deltas/index.json,
+    keeping the newest `keep` entries. A client whose copy has lastUpdate
+    == an entry's 'from' applies that delta and every later one in order.
+    Returns the index entry.
+    """
+    delta_dir = os.path.join(data_dir, 'deltas')
+    os.makedirs(delta_dir, exist_ok=True)
+
+    payload = json.dumps({'v': DELTA_VERSION, 'from': since, 'to': last_update, **diff},
+                         ensure_ascii=False, separators=(',', ':'), default=encode_record).encode('utf-8')
+    entry = {
+        'from': since,
+        'to': last_update,
+        'file': f"deltas/{content_hash(payload)}.json",
+        'added': len(diff['added']),
+        'updated': len(diff['updated']),
+        'removed': len(diff['removed']),
+        'bytes': len(payload)
+    }
+    write_atomic(os.path.join(data_dir, entry['file']), payload)
+
+    index_path = os.path.join(delta_dir, 'index.json')
+    index = load_published(index_path) or {}
+    # A gap (e.g. a run that crashed after publishing jobs.json) breaks the chain
+    entries = index.get('deltas', []) if index.get('latest') == since else []
+    entries = (entries + [entry])[-keep:]
+    write_json(index_path, {'v': DELTA_VERSION, 'latest': last_update, 'deltas': entries}, indent=2)
+
+    for filename in os.listdir(delta_dir):
+        if filename != 'index.json' and f"deltas/{filename}" not in {e['file'] for e in entries}:
+            os.remove(os.path.join(delta_dir, filename))
+    return entry
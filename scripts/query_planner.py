@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Planning Adzuna searches for a set of keywords
+
+Adzuna matches `what` as "all of these words" and `what_or` as "any of
+these words", and a request with both must satisfy both. That makes many
+keyword sets cheaper to search than one call per keyword:
+
+- a keyword whose words include all of another keyword's words can only
+  return a subset of its results ("Privileged Access Management" within
+  "Access Management"), so it needs no call of its own;
+- keywords that differ in exactly one word share a call: "IAM Engineer",
+  "Security Engineer" and "PAM Engineer" are what=engineer with
+  what_or="iam security pam", and single words combine into one what_or.
+
+Both rewrites are exact - the planned calls return the union of the
+keywords' results, no more and no less - so coverage is predicted per
+keyword rather than sampled. Each planned query has a stable label (the
+crawl state's key for watermarks and page yields) that query_params turns
+back into request parameters.
+"""
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Sequence, Tuple
+
+# Adzuna accepts long what_or lists, but short ones keep labels readable
+MAX_OR_TERMS = 12
+
+_TERM = re.compile(r"[\w+#.-]+")
+# SearchQuery.label: "a b (c OR d)" or "c OR d"
+_LABEL = re.compile(r"(?:(.+?) \((.+ OR .+)\)|(.+ OR .+))")
+
+
+class SearchQuery(NamedTuple):
+    country: str
+    what: Tuple[str, ...]     # every word must match
+    what_or: Tuple[str, ...]  # at least one word must match (empty: no constraint)
+    covers: Tuple[str, ...]   # input keywords whose results this query returns
+
+    @property
+    def label(self) -> str:
+        if not self.what_or:
+            return ' '.join(self.what)
+        alternatives = ' OR '.join(self.what_or)
+        return f"{' '.join(self.what)} ({alternatives})" if self.what else alternatives
+
+    def params(self) -> Dict[str, str]:
+        params = {}
+        if self.what:
+            params['what'] = ' '.join(self.what)
+        if self.what_or:
+            params['what_or'] = ' '.join(self.what_or)
+        return params
+
+
+def query_params(label: str) -> Dict[str, str]:
+    """Adzuna search parameters for a query label; anything else is a plain `what` keyword"""
+    match = _LABEL.fullmatch(label)
+    if match is None:
+        return {'what': label}
+    what, grouped, alternatives = match.groups()
+    params = {'what': what} if what else {}
+    params['what_or'] = ' '.join((grouped or alternatives).split(' OR '))
+    return params
+
+
+def terms(keyword: str) -> FrozenSet[str]:
+    return frozenset(term.lower() for term in _TERM.findall(keyword))
+
+
+def collapse_keywords(keywords: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    {root keyword: [keywords it subsumes, root included]}. A keyword is
+    subsumed by the keyword with the fewest words among those whose words
+    are all in it; ties (and repeats) go to the earlier keyword.
+    """
+    ordered: List[str] = []
+    for keyword in keywords:
+        if terms(keyword) and keyword not in ordered:
+            ordered.append(keyword)
+
+    roots: Dict[str, List[str]] = {}
+    for keyword in ordered:
+        words = terms(keyword)
+        general = [other for other in ordered if terms(other) <= words]
+        root = min(general, key=lambda other: (len(terms(other)), ordered.index(other)))
+        roots.setdefault(root, []).append(keyword)
+    return roots
+
+
+def plan_queries(keywords: Sequence[str], countries: Sequence[str],
+                 max_or_terms: int = MAX_OR_TERMS) -> List[SearchQuery]:
+    """Fewest queries returning every keyword's results in every country, in keyword order"""
+    roots = collapse_keywords(keywords)
+
+    # A root joins the shared-words group it has in common with the most other roots
+    candidates: Dict[FrozenSet[str], List[str]] = {}
+    for root in roots:
+        for word in terms(root):
+            candidates.setdefault(terms(root) - {word}, []).append(root)
+    groups: Dict[FrozenSet[str], List[str]] = {}
+    for root in roots:
+        shared = max((terms(root) - {word} for word in sorted(terms(root))),
+                     key=lambda rest: len(candidates[rest]))
+        groups.setdefault(shared if len(candidates[shared]) > 1 else terms(root), []).append(root)
+
+    templates = []
+    for shared, members in groups.items():
+        if len(members) == 1:
+            templates.append((tuple(_words(members[0])), (), tuple(roots[members[0]])))
+            continue
+        what = tuple(word for word in _words(members[0]) if word.lower() in shared)
+        for start in range(0, len(members), max_or_terms):
+            chunk = members[start:start + max_or_terms]
+            alternatives = tuple(_original(root, shared) for root in chunk)
+            covers = tuple(keyword for root in chunk for keyword in roots[root])
+            templates.append((what, alternatives, covers))
+
+    return [SearchQuery(country, what, what_or, covers)
+            for country in countries for what, what_or, covers in templates]
+
+
+def _words(keyword: str) -> List[str]:
+    """The keyword's words in order, as written (matching is case-insensitive)"""
+    words = []
+    for word in _TERM.findall(keyword):
+        if word.lower() not in (w.lower() for w in words):
+            words.append(word)
+    return words
+
+
+def _original(root: str, shared: FrozenSet[str]) -> str:
+    """The one word of `root` that is not in `shared`"""
+    return next(word for word in _words(root) if word.lower() not in shared)
+
+
+def format_coverage(plan: Sequence[SearchQuery], keywords: Sequence[str],
+                    countries: Sequence[str]) -> List[str]:
+    """Report lines: calls saved against one query per keyword, and which query answers each keyword"""
+    naive = len(set(keywords)) * len(countries)
+    lines = [f"  {len(set(keywords))} keywords × {len(countries)} countries: "
+             f"{len(plan)} queries instead of {naive}"]
+    seen = set()
+    for query in plan:
+        if query.label in seen:
+            continue
+        seen.add(query.label)
+        lines.append(f"  {query.label!r} covers {', '.join(query.covers)}")
+    return lines
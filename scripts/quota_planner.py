@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Yield-aware allocation of the Adzuna call quota
+
+Every result page fetched is recorded in the crawl state with the number of
+new jobs it produced (smoothed across runs). Before a run, the day's
+remaining call budget is handed out one page at a time to whichever
+(country, query) has the highest expected yield for its next page. Pages of
+a query are fetched in order, so page n is only worth as much as the
+least productive page before it. Queries with no history get an optimistic
+estimate, so new markets are always tried.
+"""
+
+import heapq
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+Key = Tuple[str, str]
+
+
+class PlannedQuery(NamedTuple):
+    country: str
+    query: str
+    pages: int
+    expected: float  # new jobs expected over those pages
+
+
+def expected_yields(history: Dict[int, float], max_pages: int, prior: float) -> List[float]:
+    """Expected new jobs for pages 1..max_pages, never increasing with depth"""
+    yields = []
+    ceiling = float('inf')
+    for page in range(1, max_pages + 1):
+        ceiling = min(ceiling, history.get(page, prior))
+        yields.append(ceiling)
+    return yields
+
+
+def plan_calls(queries: Iterable[Key], history: Dict[Key, Dict[int, float]], budget: int,
+               max_pages: int, prior: float, min_pages: int = 1) -> List[PlannedQuery]:
+    """
+    Split `budget` calls over `queries` to maximize expected new jobs. Each
+    query first gets `min_pages` pages while the budget lasts (keeps every
+    watermark moving and the history fresh); the rest goes greedily to the
+    best next page. Returned in the order of `queries`.
+    """
+    queries = list(queries)
+    curves = {key: expected_yields(history.get(key, {}), max_pages, prior) for key in queries}
+    pages = {key: 0 for key in queries}
+    remaining = max(0, budget)
+
+    for _ in range(min(min_pages, max_pages)):
+        for key in queries:
+            if remaining == 0:
+                break
+            pages[key] += 1
+            remaining -= 1
+
+    # Ties keep the caller's order (priority markets first)
+    heap = [(-curves[key][pages[key]], position, key)
+            for position, key in enumerate(queries) if pages[key] < max_pages]
+    heapq.heapify(heap)
+    while remaining > 0 and heap:
+        gain, position, key = heapq.heappop(heap)
+        if -gain <= 0:
+            break
+        pages[key] += 1
+        remaining -= 1
+        if pages[key] < max_pages:
+            heapq.heappush(heap, (-curves[key][pages[key]], position, key))
+
+    return [PlannedQuery(country, query, pages[(country, query)],
+                         sum(curves[(country, query)][:pages[(country, query)]]))
+            for country, query in queries]
+
+
+def format_plan(plan: List[PlannedQuery], realized: Optional[Dict[Key, Tuple[int, int]]] = None) -> List[str]:
+    """Report lines: planned pages and expected yield, plus (calls, new jobs) once the run is done"""
+    lines = []
+    for item in plan:
+        line = f"  {item.country.upper()} {item.query!r}: {item.pages} pages, ~{item.expected:.0f} expected"
+        if realized is not None:
+            calls, fresh = realized.get((item.country, item.query), (0, 0))
+            line += f" -> {calls} calls, {fresh} new"
+        lines.append(line)
+    return lines
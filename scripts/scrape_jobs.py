@@ -8,12 +8,137 @@ import requests
 from datetime import datetime, timedelta
 import time
 import os
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Callable, List, Dict, FrozenSet, Iterable, Iterator, Optional, Tuple
 import re
+import threading
+
+from aggregates import build_aggregates, facet_counts
+from classify_cache import ClassificationCache
+from crawl_state import CrawlState, job_id
+from detail_enricher import DetailCache, DetailFetcher, details_url
+from gazetteer import COUNTRIES, coordinates, resolve_location
+from http_cache import HttpCache
+from http_client import HttpClient
+from job_archive import JobArchive
+from keyword_matcher import PhraseMatcher, first_label, rule_groups
+from metrics import Metrics
+from near_duplicates import find_near_duplicates
+from publish import (content_hash, corpus_order, diff_jobs, format_size, is_empty, order_hash, read_json_stream,
+                     write_atomic, write_compact, write_country_shards, write_delta, write_json,
+                     write_json_stream)
+from query_planner import format_coverage, plan_queries, query_params
+from quota_planner import PlannedQuery, format_plan, plan_calls
+from search_index import build_search_index
+from spill import JsonlSpill, external_sort
+from tiles import build_tiles, write_tiles
+from rate_limit import HostRateLimiter
 
 # API Configuration
 ADZUNA_APP_ID = os.getenv('ADZUNA_APP_ID', '')
 ADZUNA_APP_KEY = os.getenv('ADZUNA_APP_KEY', '')
+ADZUNA_API_BASE = os.getenv('ADZUNA_API_BASE', 'https://api.adzuna.com/v1/api/jobs')
+
+# Pagination - walk pages until one holds only postings we already have
+ADZUNA_PAGE_SIZE = 50  # API maximum
+ADZUNA_MAX_PAGES = int(os.getenv('ADZUNA_MAX_PAGES', '10'))
+
+# Concurrency - calls are paced by a per-host token bucket instead of fixed sleeps
+ADZUNA_MAX_WORKERS = int(os.getenv('ADZUNA_MAX_WORKERS', '6'))
+ADZUNA_RATE_LIMIT = float(os.getenv('ADZUNA_RATE_LIMIT', '1.0'))  # requests per second
+ADZUNA_BURST = float(os.getenv('ADZUNA_BURST', '3'))
+
+RATE_LIMITER = HostRateLimiter(ADZUNA_RATE_LIMIT, ADZUNA_BURST)
+
+# Search keywords (any may match): broader for priority markets. The query
+# planner turns each set into the fewest Adzuna calls returning the same jobs.
+PRIORITY_KEYWORDS = ['IAM', 'identity', 'cybersecurity']
+MARKET_KEYWORDS = ['IAM', 'security']
+
+# Quota planning - the day's calls go to the (country, query) pages that
+# produced the most new jobs in earlier runs
+ADZUNA_DAILY_CALLS = int(os.getenv('ADZUNA_DAILY_CALLS', '250'))  # free tier
+YIELD_SMOOTHING = float(os.getenv('YIELD_SMOOTHING', '0.5'))  # weight of the latest run
+
+# Incremental crawl state and classification cache, kept between runs (cached by the workflow)
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+CRAWL_STATE_PATH = os.getenv('CRAWL_STATE_PATH', os.path.join(DATA_DIR, 'crawl_state.db'))
+CLASSIFY_CACHE_PATH = os.getenv('CLASSIFY_CACHE_PATH', os.path.join(DATA_DIR, 'classify_cache.db'))
+CLASSIFY_CACHE_SIZE = int(os.getenv('CLASSIFY_CACHE_SIZE', '100000'))
+
+# On-disk HTTP cache: use | record | replay | off. Replay reruns the pipeline
+# offline; point CRAWL_STATE_PATH at a fresh file to rebuild from every recorded page.
+HTTP_CACHE_PATH = os.getenv('HTTP_CACHE_PATH', os.path.join(DATA_DIR, 'http_cache.db'))
+HTTP_CACHE_MODE = os.getenv('HTTP_CACHE_MODE', 'use')
+ADZUNA_CACHE_TTL = float(os.getenv('ADZUNA_CACHE_TTL', '3600'))  # seconds a result page is reused as-is
+
+# Run metrics: JSON report + Prometheus textfile in METRICS_DIR; PROFILE_CLASSIFY=1
+# adds a merged cProfile of classification across worker threads
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(os.path.dirname(DATA_DIR), 'reports'))
+PROFILE_CLASSIFY = os.getenv('PROFILE_CLASSIFY', '') not in ('', '0')
+
+METRICS = Metrics()
+if PROFILE_CLASSIFY:
+    METRICS.enable_profiling('classify')
+
+# Shared keep-alive client: retries 429/5xx with backoff, per-source circuit breakers
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '4'))
+HTTP_BACKOFF = float(os.getenv('HTTP_BACKOFF', '0.5'))  # seconds, doubled per retry (jittered)
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', '5'))  # failed requests before a source is cut off
+BREAKER_RESET = float(os.getenv('BREAKER_RESET', '60'))
+
+HTTP_CLIENT = HttpClient(pool_size=ADZUNA_MAX_WORKERS, max_retries=HTTP_MAX_RETRIES,
+                         backoff=HTTP_BACKOFF, rate_limiter=RATE_LIMITER,
+                         breaker_threshold=BREAKER_THRESHOLD, breaker_reset=BREAKER_RESET,
+                         metrics=METRICS)
+
+# Detail enrichment (ENRICH=1): new postings are re-classified on their full
+# text, fetched from the Adzuna /details/<id> page with at most ENRICH_PER_HOST
+# requests in flight per host and cached by job id, so each posting is fetched
+# only once. Pages without a description are tried again after
+# ENRICH_RETRY_EMPTY_DAYS.
+ENRICH = os.getenv('ENRICH', '') not in ('', '0')
+ENRICH_CACHE_PATH = os.getenv('ENRICH_CACHE_PATH', os.path.join(DATA_DIR, 'detail_cache.db'))
+ENRICH_WORKERS = int(os.getenv('ENRICH_WORKERS', '8'))
+ENRICH_PER_HOST = int(os.getenv('ENRICH_PER_HOST', '2'))
+ENRICH_RETRY_EMPTY_DAYS = float(os.getenv('ENRICH_RETRY_EMPTY_DAYS', '7'))
+
+# Lifecycle: jobs no fetched page has listed for JOB_TTL_DAYS move to the
+# month-partitioned archive (compacted once a month is over). Incremental
+# crawls stop at the first page of held jobs, so every REFRESH_DAYS each
+# (country, query) walks up to REFRESH_PAGES pages regardless, out of at most
+# half the day's budget. Jobs listed deeper than that are only seen near the
+# top of the results, so for them the TTL effectively counts from there.
+JOB_TTL_DAYS = float(os.getenv('JOB_TTL_DAYS', '30'))
+REFRESH_DAYS = float(os.getenv('REFRESH_DAYS', '7'))
+REFRESH_PAGES = int(os.getenv('REFRESH_PAGES', str(ADZUNA_MAX_PAGES)))
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', os.path.join(DATA_DIR, 'archive'))
+ARCHIVE_COMPACT_MEMBERS = int(os.getenv('ARCHIVE_COMPACT_MEMBERS', '60'))  # appends before an early compaction
+
+# Delta publishing: unchanged corpora are not rewritten; DELTA_HISTORY runs of
+# deltas are kept for clients to catch up from. FORCE_PUBLISH=1 always rewrites.
+DELTA_HISTORY = int(os.getenv('DELTA_HISTORY', '60'))  # 30 days at two runs a day
+FORCE_PUBLISH = os.getenv('FORCE_PUBLISH', '') not in ('', '0')
+
+# Held jobs stream through a JSONL spill in SPILL_DIR (default: the system temp
+# dir) and are sorted by posting time in runs of SORT_CHUNK_SIZE
+SPILL_DIR = os.getenv('SPILL_DIR') or None
+SORT_CHUNK_SIZE = int(os.getenv('SORT_CHUNK_SIZE', '50000'))
+
+# Map cluster tiles (data/tiles/) are published for these Leaflet zoom levels,
+# each cluster listing the ids of up to TILE_TOP_IDS of its newest jobs
+TILE_ZOOMS = [int(zoom) for zoom in os.getenv('TILE_ZOOMS', '2,4,6,8').split(',') if zoom.strip()]
+TILE_TOP_IDS = int(os.getenv('TILE_TOP_IDS', '10'))
+
+# Estimated shingle similarity above which two postings count as one
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.85'))
+
+# Opened by main(); None means every posting is classified from scratch
+CLASSIFY_CACHE: Optional[ClassificationCache] = None
+# Opened by main(); None means every request goes straight to the network
+HTTP_CACHE: Optional[HttpCache] = None
 
 ADZUNA_COUNTRIES = {
     'us': 'United States', 'gb': 'United Kingdom', 'ca': 'Canada', 'au': 'Australia',
@@ -23,13 +148,102 @@ ADZUNA_COUNTRIES = {
     'it': 'Italy', 'es': 'Spain'
 }
 
-def detect_visa_sponsorship(title: str, description: str) -> Dict[str, any]:
-    """
-    Detect visa sponsorship and work authorization requirements from job description
-    """
-    combined = f"{title} {description}".lower()
-    
-    # Visa sponsorship indicators
+# Classification phrase lists - compiled once into MATCHER below.
+# Ordered rule lists keep the original precedence: the first label hit wins.
+
+# Positive indicators for visa sponsorship
+SPONSORSHIP_POSITIVE = [
+    'visa sponsorship',
+    'will sponsor',
+    'sponsorship available',
+    'h1b sponsor',
+    'can sponsor',
+    'sponsors visas',
+    'visa support',
+    'immigration support',
+    'relocation assistance'
+]
+
+# Negative indicators (no sponsorship)
+SPONSORSHIP_NEGATIVE = [
+    'no visa sponsorship',
+    'no sponsorship',
+    'cannot sponsor',
+    'will not sponsor',
+    'us citizens only',
+    'citizenship required',
+    'must be authorized',
+    'must be eligible',
+    'must have authorization',
+    'security clearance required'  # Usually means US citizen
+]
+
+# Work authorization requirements
+AUTH_REQUIREMENTS = [
+    'must be authorized to work',
+    'work authorization required',
+    'right to work',
+    'legally authorized',
+    'employment authorization',
+    'work permit required'
+]
+
+# Location restrictions, in reporting order
+LOCATION_RESTRICTIONS = [
+    ('US Citizens Only', ['us citizens only', 'u.s. citizens only', 'must be us citizen']),
+    ('Security Clearance Required', ['security clearance', 'ts/sci', 'top secret', 'secret clearance']),
+    ('Local Candidates Preferred', ['must be located in', 'must reside in', 'local candidates only']),
+    ('Domestic Remote Only', ['us remote only', 'uk remote only', 'must be in country'])
+]
+
+# Matched against the title only
+JOB_TYPE_RULES = [
+    ('iam', ['iam', 'identity', 'access management', 'idm', 'pam', 'privileged', 'okta', 'sailpoint', 'ping', 'saviynt', 'cyberark']),
+    ('architect', ['architect']),
+    ('analyst', ['analyst']),
+    ('consultant', ['consultant'])
+]
+
+LEVEL_RULES = [
+    ('junior', ['junior', 'entry', 'associate', 'graduate']),
+    ('senior', ['senior', 'sr.', 'sr ']),
+    ('principal', ['principal', 'staff', 'distinguished']),
+    ('lead', ['lead', 'manager', 'director', 'head'])
+]
+
+# Matched against title and description
+LOCATION_TYPE_RULES = [
+    ('remote', ['remote', 'work from home', 'wfh', 'anywhere']),
+    ('hybrid', ['hybrid', 'flexible'])
+]
+
+CLEARANCE_RULES = [
+    ('ts-sci', ['ts/sci', 'ts-sci', 'top secret/sci']),
+    ('ts', ['top secret', 'ts clearance']),
+    ('secret', ['secret clearance', 'security clearance'])
+]
+
+MATCHER = PhraseMatcher(
+    text_groups={
+        'sponsorship:positive': SPONSORSHIP_POSITIVE,
+        'sponsorship:negative': SPONSORSHIP_NEGATIVE,
+        'work_auth:required': AUTH_REQUIREMENTS,
+        **rule_groups('restriction', LOCATION_RESTRICTIONS),
+        **rule_groups('locationType', LOCATION_TYPE_RULES),
+        **rule_groups('clearance', CLEARANCE_RULES)
+    },
+    title_groups={
+        **rule_groups('type', JOB_TYPE_RULES),
+        **rule_groups('level', LEVEL_RULES)
+    }
+)
+
+# Bump the leading number when the labelling logic below changes;
+# phrase list edits are picked up automatically through the signature
+CLASSIFIER_VERSION = f"1-{MATCHER.signature}"
+
+def _visa_info(text_hits: FrozenSet[str]) -> Dict[str, any]:
+    """Visa sponsorship fields from the groups hit anywhere in the posting"""
     visa_info = {
         'sponsorship_available': False,
         'sponsorship_status': 'unknown',  # 'available', 'not_available', 'unknown'
@@ -37,301 +251,619 @@ def detect_visa_sponsorship(title: str, description: str) -> Dict[str, any]:
         'location_restrictions': []
     }
     
-    # Positive indicators for visa sponsorship
-    sponsorship_positive = [
-        'visa sponsorship',
-        'will sponsor',
-        'sponsorship available',
-        'h1b sponsor',
-        'can sponsor',
-        'sponsors visas',
-        'visa support',
-        'immigration support',
-        'relocation assistance'
-    ]
-    
-    # Negative indicators (no sponsorship)
-    sponsorship_negative = [
-        'no visa sponsorship',
-        'no sponsorship',
-        'cannot sponsor',
-        'will not sponsor',
-        'us citizens only',
-        'citizenship required',
-        'must be authorized',
-        'must be eligible',
-        'must have authorization',
-        'security clearance required'  # Usually means US citizen
-    ]
+    # Negative sponsorship overrides positive
+    if 'sponsorship:negative' in text_hits:
+        visa_info['sponsorship_status'] = 'not_available'
+    elif 'sponsorship:positive' in text_hits:
+        visa_info['sponsorship_available'] = True
+        visa_info['sponsorship_status'] = 'available'
     
-    # Work authorization requirements
-    auth_requirements = [
-        'must be authorized to work',
-        'work authorization required',
-        'right to work',
-        'legally authorized',
-        'employment authorization',
-        'work permit required'
+    visa_info['work_authorization_required'] = 'work_auth:required' in text_hits
+    visa_info['location_restrictions'] = [
+        label for label, _ in LOCATION_RESTRICTIONS if f"restriction:{label}" in text_hits
     ]
     
-    # Location restrictions
-    location_keywords = {
-        'us_only': ['us citizens only', 'u.s. citizens only', 'must be us citizen'],
-        'clearance': ['security clearance', 'ts/sci', 'top secret', 'secret clearance'],
-        'local_only': ['must be located in', 'must reside in', 'local candidates only'],
-        'no_remote_intl': ['us remote only', 'uk remote only', 'must be in country']
-    }
-    
-    # Check for positive sponsorship
-    for phrase in sponsorship_positive:
-        if phrase in combined:
-            visa_info['sponsorship_available'] = True
-            visa_info['sponsorship_status'] = 'available'
-            break
-    
-    # Check for negative sponsorship (overrides positive)
-    for phrase in sponsorship_negative:
-        if phrase in combined:
-            visa_info['sponsorship_available'] = False
-            visa_info['sponsorship_status'] = 'not_available'
-            break
-    
-    # Check for work authorization requirements
-    for phrase in auth_requirements:
-        if phrase in combined:
-            visa_info['work_authorization_required'] = True
-    
-    # Detect location restrictions
-    restrictions = []
-    if any(phrase in combined for phrase in location_keywords['us_only']):
-        restrictions.append('US Citizens Only')
-    if any(phrase in combined for phrase in location_keywords['clearance']):
-        restrictions.append('Security Clearance Required')
-    if any(phrase in combined for phrase in location_keywords['local_only']):
-        restrictions.append('Local Candidates Preferred')
-    if any(phrase in combined for phrase in location_keywords['no_remote_intl']):
-        restrictions.append('Domestic Remote Only')
-    
-    visa_info['location_restrictions'] = restrictions
-    
     return visa_info
 
+def detect_visa_sponsorship(title: str, description: str) -> Dict[str, any]:
+    """
+    Detect visa sponsorship and work authorization requirements from job description
+    """
+    return _visa_info(MATCHER.scan(title, description).text)
+
 def classify_job(title: str, description: str = '') -> Dict[str, str]:
-    """Enhanced job classification with visa info"""
-    title_lower = title.lower()
-    desc_lower = description.lower()
-    combined = f"{title_lower} {desc_lower}"
-    
-    # Basic classification
-    job_type = 'security'
-    if any(word in title_lower for word in ['iam', 'identity', 'access management', 'idm', 'pam', 'privileged', 'okta', 'sailpoint', 'ping', 'saviynt', 'cyberark']):
-        job_type = 'iam'
-    elif 'architect' in title_lower:
-        job_type = 'architect'
-    elif 'analyst' in title_lower:
-        job_type = 'analyst'
-    elif 'consultant' in title_lower:
-        job_type = 'consultant'
-    
-    level = 'mid'
-    if any(word in title_lower for word in ['junior', 'entry', 'associate', 'graduate']):
-        level = 'junior'
-    elif any(word in title_lower for word in ['senior', 'sr.', 'sr ']):
-        level = 'senior'
-    elif any(word in title_lower for word in ['principal', 'staff', 'distinguished']):
-        level = 'principal'
-    elif any(word in title_lower for word in ['lead', 'manager', 'director', 'head']):
-        level = 'lead'
-    
-    location_type = 'onsite'
-    if any(word in combined for word in ['remote', 'work from home', 'wfh', 'anywhere']):
-        location_type = 'remote'
-    elif any(word in combined for word in ['hybrid', 'flexible']):
-        location_type = 'hybrid'
-    
-    clearance = 'none'
-    if any(word in combined for word in ['ts/sci', 'ts-sci', 'top secret/sci']):
-        clearance = 'ts-sci'
-    elif 'top secret' in combined or 'ts clearance' in combined:
-        clearance = 'ts'
-    elif 'secret clearance' in combined or 'security clearance' in combined:
-        clearance = 'secret'
-    
-    # Detect visa sponsorship and restrictions
-    visa_info = detect_visa_sponsorship(title, description)
+    """Enhanced job classification with visa info - one scan per posting"""
+    hits = MATCHER.scan(title, description)
+    visa_info = _visa_info(hits.text)
     
     return {
-        'type': job_type,
-        'level': level,
-        'locationType': location_type,
-        'clearance': clearance,
+        'type': first_label(hits.title, 'type', JOB_TYPE_RULES, 'security'),
+        'level': first_label(hits.title, 'level', LEVEL_RULES, 'mid'),
+        'locationType': first_label(hits.text, 'locationType', LOCATION_TYPE_RULES, 'onsite'),
+        'clearance': first_label(hits.text, 'clearance', CLEARANCE_RULES, 'none'),
         'visaSponsorship': visa_info['sponsorship_status'],
         'workAuthRequired': visa_info['work_authorization_required'],
         'locationRestrictions': visa_info['location_restrictions']
     }
 
-def search_adzuna_country(country_code: str, keyword: str, max_results: int = 20) -> List[Dict]:
-    """Search with enhanced visa detection"""
+def classify_cached(title: str, description: str = '') -> Dict[str, str]:
+    """classify_job, skipped for postings already in the classification cache"""
+    with METRICS.stage('classify', jobs_in=1) as stage, METRICS.profile('classify'):
+        if CLASSIFY_CACHE is None:
+            result = classify_job(title, description)
+        else:
+            result = CLASSIFY_CACHE.get_or_compute(title, description, classify_job)
+        stage.jobs_out = 1
+    return result
+
+def classify_many(postings: Iterable[Tuple[str, str]]) -> List[Dict[str, str]]:
+    """Classify a batch of (title, description) pairs"""
+    return [classify_cached(title, description) for title, description in postings]
+
+def fetch_adzuna_page(country_code: str, keyword: str, page: int,
+                      results_per_page: int = ADZUNA_PAGE_SIZE) -> Tuple[List[Dict], bool]:
+    """
+    Fetch one raw result page (newest first); `keyword` may be a planned query
+    label. Also returns whether the page came from the HTTP cache without a
+    request (a revalidation is a request, so it counts against the quota).
+    """
+    url = f"{ADZUNA_API_BASE}/{country_code}/search/{page}"
+    params = {
+        'app_id': ADZUNA_APP_ID,
+        'app_key': ADZUNA_APP_KEY,
+        'results_per_page': results_per_page,
+        **query_params(keyword),
+        'content-type': 'application/json',
+        'sort_by': 'date'
+    }
+    
+    sent = []
+    
+    def fetch(*args, **kwargs):
+        sent.append(True)
+        return HTTP_CLIENT.get(*args, source='adzuna', **kwargs)
+    
+    started = time.perf_counter()
+    if HTTP_CACHE is None:
+        response = fetch(url, params=params, timeout=15)
+    else:
+        response = HTTP_CACHE.get(url, params=params, ttl=ADZUNA_CACHE_TTL, timeout=15, fetch=fetch)
+    # Includes rate-limit waits and retries, unlike http_request_seconds
+    METRICS.observe('adzuna_page_seconds', time.perf_counter() - started, {'country': country_code})
+    
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code} on page {page}")
+    
+    with METRICS.stage('parse_json', jobs_in=1) as stage:
+        results = response.json().get('results', [])
+        stage.jobs_out = len(results)
+    return results, not sent
+
+def iter_adzuna_results(country_code: str, keyword: str, known_ids: Iterable[str] = (),
+                        max_pages: int = ADZUNA_MAX_PAGES,
+                        results_per_page: int = ADZUNA_PAGE_SIZE,
+                        since: Optional[str] = None,
+                        on_page: Optional[Callable[[int, int, int, bool], None]] = None,
+                        on_known: Optional[Callable[[List[str]], None]] = None,
+                        claim: Optional[Callable[[str], bool]] = None,
+                        refresh: bool = False) -> Iterator[Dict]:
+    """
+    Lazily walk result pages, yielding raw results we have not seen yet.
+    Results are sorted by date, so a page holding only known ids (or only
+    postings older than the `since` watermark) means everything after it
+    is stale and the crawl stops there - unless `refresh` is set, which
+    walks on to `max_pages` so held jobs further down are seen again. `on_page(page, results, fresh, cached)` is
+    called for every page fetched (`cached`: served by the HTTP cache, no API call), `on_known(ids)` with the known ids listed on it.
+    `claim(id)` is asked about each new result and returns False when another
+    query of the run already took it; those count as not fresh.
+    """
+    known = set(known_ids)
+    seen = set(known)
+    
+    for page in range(1, max_pages + 1):
+        results, cached = fetch_adzuna_page(country_code, keyword, page, results_per_page)
+        fresh = [r for r in results
+                 if str(r.get('id', '')) not in seen
+                 and not (since and r.get('created', '') < since)
+                 and (claim is None or claim(str(r.get('id', ''))))]
+        if on_page is not None:
+            on_page(page, len(results), len(fresh), cached)
+        if on_known is not None:
+            on_known([str(r.get('id', '')) for r in results if str(r.get('id', '')) in known])
+        
+        if not fresh and not refresh:
+            return
+        
+        for result in fresh:
+            seen.add(str(result.get('id', '')))
+            yield result
+        
+        if len(results) < results_per_page:
+            return
+
+def build_job(result: Dict, country_code: str) -> Dict:
+    """Turn a raw Adzuna result into a classified job record"""
+    description = result.get('description', '')
+    title = result.get('title', '')
+    
+    classification = classify_cached(title, description)
+    
+    location_obj = result.get('location', {})
+    city = location_obj.get('display_name', '') or location_obj.get('area', [''])[0]
+    country_name = ADZUNA_COUNTRIES.get(country_code, 'Unknown')
+    
+    if city and city != country_name:
+        location = f"{city}, {country_name}"
+    else:
+        location = country_name
+    
+    # Resolved here once, so clients never parse the location string
+    place = resolve_location(location, country_code)
+    
+    return {
+        'id': str(result.get('id', '')),
+        'company': result.get('company', {}).get('display_name', 'Unknown Company'),
+        'title': title,
+        'location': location,
+        'countryCode': place['countryCode'],
+        'country': place['country'],
+        'city': place['city'],
+        'locationType': classification['locationType'],
+        'type': classification['type'],
+        'level': classification['level'],
+        'clearance': classification['clearance'],
+        'visaSponsorship': classification['visaSponsorship'],
+        'workAuthRequired': classification['workAuthRequired'],
+        'locationRestrictions': classification['locationRestrictions'],
+        'posted': result.get('created', datetime.now().strftime('%Y-%m-%d')),
+        'url': result.get('redirect_url', '#'),
+        'description': description[:500]
+    }
+
+def crawl_adzuna_country(country_code: str, keyword: str, known_ids: Iterable[str] = (),
+                         max_pages: int = ADZUNA_MAX_PAGES,
+                         since: Optional[str] = None,
+                         on_page: Optional[Callable[[int, int, int, bool], None]] = None,
+                         on_known: Optional[Callable[[List[str]], None]] = None,
+                         claim: Optional[Callable[[str], bool]] = None,
+                         refresh: bool = False) -> Iterator[Dict]:
+    """Stream classified jobs page by page, stopping at already-held postings unless refreshing"""
+    for result in iter_adzuna_results(country_code, keyword, known_ids, max_pages,
+                                      since=since, on_page=on_page, on_known=on_known, claim=claim,
+                                      refresh=refresh):
+        try:
+            yield build_job(result, country_code)
+        except (KeyError, TypeError, AttributeError):
+            continue  # malformed result
+
+def search_adzuna_country(country_code: str, keyword: str, max_results: Optional[int] = None,
+                          known_ids: Iterable[str] = (),
+                          max_pages: int = ADZUNA_MAX_PAGES,
+                          state: Optional[CrawlState] = None,
+                          on_page: Optional[Callable[[int, int, int, bool], None]] = None,
+                          claim: Optional[Callable[[str], bool]] = None,
+                          refresh: bool = False) -> List[Dict]:
+    """
+    Search with enhanced visa detection. With a crawl state, only postings
+    newer than the (country, keyword) watermark are fetched and recorded,
+    along with the yield of every page that cost an API call (cached pages
+    neither use quota nor say anything new about yield); held jobs listed
+    again are marked seen.
+    Results another query already claimed are skipped before classification.
+    A `refresh` crawl walks all `max_pages` pages and is then recorded as the
+    query's latest refresh.
+    """
     jobs = []
     
-    if not ADZUNA_APP_ID or not ADZUNA_APP_KEY:
+    replaying = HTTP_CACHE is not None and HTTP_CACHE.mode == 'replay'
+    if (not ADZUNA_APP_ID or not ADZUNA_APP_KEY) and not replaying:
         return []
     
+    since = None
+    if state is not None:
+        known_ids = set(known_ids) | state.known_ids(country_code)
+        since = state.watermark(country_code, keyword)
+    
+    last_page = {'page': 0, 'full': False}
+    
+    def page_done(page: int, results: int, fresh: int, cached: bool):
+        last_page.update(page=page, full=results >= ADZUNA_PAGE_SIZE and fresh > 0)
+        if state is not None and not cached:
+            state.record_page(country_code, keyword, page, results, fresh, YIELD_SMOOTHING)
+        if on_page is not None:
+            on_page(page, results, fresh, cached)
+    
+    complete = False
     try:
-        url = f"https://api.adzuna.com/v1/api/jobs/{country_code}/search/1"
-        params = {
-            'app_id': ADZUNA_APP_ID,
-            'app_key': ADZUNA_APP_KEY,
-            'results_per_page': max_results,
-            'what': keyword,
-            'content-type': 'application/json',
-            'sort_by': 'date'
-        }
+        # Keep whatever pages arrived before a failure
+        crawl = crawl_adzuna_country(country_code, keyword, known_ids, max_pages,
+                                     since=since, on_page=page_done,
+                                     on_known=state.touch if state is not None else None,
+                                     claim=claim, refresh=refresh)
+        for job in islice(crawl, max_results):
+            jobs.append(job)
+        if refresh and state is not None:
+            state.mark_refreshed(country_code, keyword)
+        # Out of pages with more new postings waiting: the watermark must not skip them
+        complete = not (last_page['page'] == max_pages and last_page['full'])
         
-        response = requests.get(url, params=params, timeout=15)
+        print(f"  ✓ {country_code.upper()}: {len(jobs)} new jobs")
         
-        if response.status_code == 200:
-            data = response.json()
-            
-            for result in data.get('results', []):
-                try:
-                    description = result.get('description', '')
-                    title = result.get('title', '')
-                    
-                    classification = classify_job(title, description)
-                    
-                    location_obj = result.get('location', {})
-                    city = location_obj.get('display_name', '') or location_obj.get('area', [''])[0]
-                    country_name = ADZUNA_COUNTRIES.get(country_code, 'Unknown')
-                    
-                    if city and city != country_name:
-                        location = f"{city}, {country_name}"
-                    else:
-                        location = country_name
-                    
-                    job = {
-                        'company': result.get('company', {}).get('display_name', 'Unknown Company'),
-                        'title': title,
-                        'location': location,
-                        'locationType': classification['locationType'],
-                        'type': classification['type'],
-                        'level': classification['level'],
-                        'clearance': classification['clearance'],
-                        'visaSponsorship': classification['visaSponsorship'],
-                        'workAuthRequired': classification['workAuthRequired'],
-                        'locationRestrictions': classification['locationRestrictions'],
-                        'posted': result.get('created', datetime.now().strftime('%Y-%m-%d')),
-                        'url': result.get('redirect_url', '#'),
-                        'description': description[:500]
-                    }
-                    
-                    jobs.append(job)
-                    
-                except Exception as e:
-                    continue
-            
-            print(f"  ✓ {country_code.upper()}: {len(jobs)} jobs")
-        
-    except Exception as e:
-        print(f"  ✗ {country_code.upper()}: {str(e)[:50]}")
+    except (requests.RequestException, RuntimeError, ValueError) as e:
+        print(f"  ✗ {country_code.upper()}: {str(e)[:50]} ({len(jobs)} jobs kept)")
+    
+    if state is not None:
+        state.record(country_code, keyword, jobs, complete=complete)
+    METRICS.inc('jobs_fetched_total', len(jobs), {'country': country_code})
     
     return jobs
 
-def search_all_countries() -> List[Dict]:
-    """Search with reduced frequency to stay within API limits"""
+def search_all_countries(max_workers: int = ADZUNA_MAX_WORKERS,
+                         state: Optional[CrawlState] = None) -> List[Dict]:
+    """
+    Search all markets concurrently, paced by the per-host rate limiter.
+    With a crawl state, pages are allotted from the day's remaining call
+    budget by past yield of new jobs.
+    """
     all_jobs = []
     
-    print("\n🌍 Searching 18 countries via Adzuna...")
+    print(f"\n🌍 Searching {len(ADZUNA_COUNTRIES)} countries via Adzuna...")
     print("=" * 60)
     
     # Optimized search - fewer calls, more results
     priority_countries = ['us', 'gb', 'ca', 'de', 'in', 'au', 'sg']
-    
-    print("\n📍 Priority Markets:")
-    for country_code in priority_countries:
-        # Fewer keywords, more results per call
-        jobs = search_adzuna_country(country_code, 'IAM OR identity OR cybersecurity', max_results=30)
-        all_jobs.extend(jobs)
-        time.sleep(1)
-    
-    print("\n📍 Other Markets:")
     other_countries = [c for c in ADZUNA_COUNTRIES.keys() if c not in priority_countries]
-    for country_code in other_countries:
-        jobs = search_adzuna_country(country_code, 'IAM OR security', max_results=15)
-        all_jobs.extend(jobs)
-        time.sleep(1)
     
-    print(f"\nAPI Calls made: ~{len(priority_countries) + len(other_countries)}")
+    # Broader keywords for priority markets, each set folded into as few calls as return the same results
+    priority_searches = plan_queries(PRIORITY_KEYWORDS, priority_countries)
+    other_searches = plan_queries(MARKET_KEYWORDS, other_countries)
+    queries = [(search.country, search.label) for search in priority_searches + other_searches]
+    
+    print(f"\n📍 {len(priority_countries)} priority + {len(other_countries)} other markets "
+          f"({max_workers} workers, {ADZUNA_RATE_LIMIT:g} req/s)")
+    print("\n🧭 Query plan:")
+    for line in (format_coverage(priority_searches, PRIORITY_KEYWORDS, priority_countries)
+                 + format_coverage(other_searches, MARKET_KEYWORDS, other_countries)):
+        print(line)
+    
+    refreshing = set()
+    if state is None:
+        plan = [PlannedQuery(c, q, ADZUNA_MAX_PAGES, 0.0) for c, q in queries]
+    else:
+        budget = max(0, ADZUNA_DAILY_CALLS - state.calls_today())
+        # Refresh crawls that are due come out of at most half the budget, longest overdue first
+        cutoff = (datetime.now() - timedelta(days=REFRESH_DAYS)).isoformat() + 'Z'
+        due = state.refresh_due(queries, cutoff)
+        refreshing = set(due[:budget // 2 // REFRESH_PAGES] if REFRESH_PAGES > 0 else [])
+        reserved = len(refreshing) * REFRESH_PAGES
+        # Untried pages are assumed full of new jobs, so they get explored
+        plan = plan_calls(queries, state.page_yields(ADZUNA_PAGE_SIZE), budget - reserved, ADZUNA_MAX_PAGES,
+                          prior=ADZUNA_PAGE_SIZE)
+        plan = [item._replace(pages=max(item.pages, REFRESH_PAGES))
+                if (item.country, item.query) in refreshing else item for item in plan]
+        planned = sum(item.pages for item in plan)
+        print(f"\n📈 Quota plan: {planned} of {budget} calls left today "
+              f"(~{sum(item.expected for item in plan):.0f} new jobs expected)")
+        if due:
+            print(f"🔄 Refresh crawls: {len(refreshing)} of {len(due)} due queries walk up to "
+                  f"{REFRESH_PAGES} pages (every {REFRESH_DAYS:g} days)")
+    
+    # Every (country, query) is only touched by its own worker
+    realized = {(c, q): [0, 0] for c, q, _, _ in plan}
+    
+    # Queries of one country can overlap; the first to list a posting keeps it
+    claimed = set()
+    claimed_lock = threading.Lock()
+    
+    def claim(country: str, result_id: str) -> bool:
+        with claimed_lock:
+            if (country, result_id) in claimed:
+                METRICS.inc('adzuna_overlapping_results_total', labels={'country': country})
+                return False
+            claimed.add((country, result_id))
+            return True
+    
+    def run(item: PlannedQuery) -> List[Dict]:
+        tally = realized[(item.country, item.query)]
+        
+        def count(page: int, results: int, fresh: int, cached: bool):
+            tally[0] += 0 if cached else 1
+            tally[1] += fresh
+        
+        return search_adzuna_country(item.country, item.query, max_pages=item.pages,
+                                     state=state, on_page=count, claim=partial(claim, item.country),
+                                     refresh=(item.country, item.query) in refreshing)
+    
+    # map() yields in submission order, so the merge is deterministic
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        for jobs in pool.map(run, [item for item in plan if item.pages > 0]):
+            all_jobs.extend(jobs)
+    
+    calls = sum(tally[0] for tally in realized.values())
+    print(f"\nSearches run: {sum(1 for item in plan if item.pages)} ({calls} calls, "
+          f"{sum(tally[1] for tally in realized.values())} new postings)")
+    if state is not None:
+        print("\n📈 Plan vs realized yield:")
+        for line in format_plan(plan, {key: tuple(tally) for key, tally in realized.items()}):
+            print(line)
     
     return all_jobs
 
+def enrich_jobs(jobs: List[Dict], fetcher: DetailFetcher) -> List[Dict]:
+    """Re-classify jobs on their full posting text; returns the jobs whose labels changed"""
+    texts = fetcher.full_texts((job['id'], details_url(job['id'], job.get('url', ''))) for job in jobs)
+    changed = []
+    for job in jobs:
+        text = texts.get(job['id'])
+        if not text:
+            continue
+        labels = classify_cached(job['title'], text)
+        if any(job.get(field) != value for field, value in labels.items()):
+            job.update(labels)
+            changed.append(job)
+    return changed
+
+def locate_job(job: Dict) -> Dict:
+    """Fill normalized country/city fields on jobs stored before they existed"""
+    if 'countryCode' not in job:
+        place = resolve_location(job.get('location', ''))
+        job.update(countryCode=place['countryCode'], country=place['country'], city=place['city'])
+    return job
+
+def country_code_of(job: Dict) -> str:
+    """Lowercase ISO (= Adzuna) country code of a job"""
+    return locate_job(dict(job))['countryCode'].lower()
+
+def job_coordinates(job: Dict) -> Optional[Tuple[float, float]]:
+    place = locate_job(dict(job))
+    return coordinates(place['countryCode'], place['city'])
+
+def dedupe_key(job: Dict) -> Tuple[str, str]:
+    return (job['company'].lower().strip(), job['title'].lower().strip())
+
 def deduplicate_jobs(jobs: List[Dict]) -> List[Dict]:
     """Remove duplicates"""
     seen = set()
     unique_jobs = []
     
     for job in jobs:
-        key = (job['company'].lower().strip(), job['title'].lower().strip())
+        key = dedupe_key(job)
         if key not in seen:
             seen.add(key)
             unique_jobs.append(job)
     
     return unique_jobs
 
+def publish_corpus(jobs: JsonlSpill, data_dir: str, last_update: str, aggregates: Dict):
+    """
+    Write jobs.json, the compact corpus, aggregates, map tiles, country shards +
+    manifest and the search index, each in one streaming pass over the sorted spill
+    """
+    output_file = os.path.join(data_dir, 'jobs.json')
+    with METRICS.stage('write_jobs_json', jobs_in=len(jobs)) as stage:
+        stage.jobs_out = write_json_stream(output_file, {'lastUpdate': last_update}, 'jobs', jobs)
+    
+    print(f"\n✓ Jobs saved: {output_file}")
+    
+    with METRICS.stage('write_compact', jobs_in=len(jobs)) as stage:
+        compact = write_compact(jobs, data_dir, last_update)
+        stage.jobs_out = len(jobs)
+    
+    # Posted keys follow jobs.json order, like the search index ordinals
+    aggregates_file = os.path.join(data_dir, 'aggregates.json')
+    with METRICS.stage('write_aggregates', jobs_in=len(jobs)) as stage:
+        payload = json.dumps(dict(aggregates, lastUpdate=last_update), ensure_ascii=False,
+                             separators=(',', ':')).encode('utf-8')
+        write_atomic(aggregates_file, payload)
+        stage.jobs_out = aggregates['count']
+    print(f"✓ Aggregates saved: {aggregates_file} ({len(aggregates['cube'])} cells, {format_size(len(payload))})")
+    
+    with METRICS.stage('write_tiles', jobs_in=len(jobs)) as stage:
+        tiles, unplaced = build_tiles(jobs, job_coordinates, country_code_of, TILE_ZOOMS, TILE_TOP_IDS)
+        tile_index = write_tiles(tiles, data_dir, TILE_ZOOMS, unplaced, last_update)
+        stage.jobs_out = tile_index['placed']
+    print(f"✓ {len(tiles)} map tiles saved (zooms {', '.join(map(str, TILE_ZOOMS))}; "
+          f"{tile_index['placed']} jobs placed, {unplaced} remote or unplaced)")
+    
+    with METRICS.stage('write_shards', jobs_in=len(jobs)) as stage:
+        manifest = write_country_shards(jobs, data_dir, country_code_of,
+                                        {code.lower(): name for code, name in COUNTRIES.items()},
+                                        last_update,
+                                        extra={'compact': {k: v for k, v in compact.items() if k != 'sizes'},
+                                               'aggregates': {'file': 'aggregates.json',
+                                                              'hash': content_hash(payload)},
+                                               'tiles': {'index': 'tiles/index.json', 'zooms': tile_index['zooms']},
+                                               'orderHash': order_hash(jobs)})
+        stage.jobs_out = manifest['totalJobs']
+    print(f"✓ Manifest + {len(manifest['countries'])} country shards saved")
+    
+    print("\n📦 Publish sizes:")
+    print(f"  jobs.json (legacy): {format_size(os.path.getsize(output_file))}")
+    for kind, size in compact['sizes'].items():
+        print(f"  compact {kind}: {format_size(size)} ({compact[kind]})")
+    if 'brotli' not in compact:
+        print("  compact brotli: skipped (pip install brotli)")
+    
+    # Ordinals in the index refer to positions in jobs.json, so build it from the same spill
+    index_file = os.path.join(data_dir, 'search_index.json')
+    with METRICS.stage('write_search_index', jobs_in=len(jobs)) as stage:
+        write_json(index_file, build_search_index(jobs), separators=(',', ':'))
+        stage.jobs_out = len(jobs)
+    print(f"✓ Search index saved: {index_file}")
+
 def main():
     """Main function"""
+    global CLASSIFY_CACHE, HTTP_CACHE
+    
     print("=" * 60)
     print("JOBMAP - Global Job Scraper with Visa Detection")
     print("=" * 60)
     
-    if not ADZUNA_APP_ID or not ADZUNA_APP_KEY:
-        print("\n⚠️  No API keys - using sample data")
-        all_jobs = []
-    else:
-        print(f"\n✓ API configured (ID: {ADZUNA_APP_ID[:8]}...)")
-        all_jobs = search_all_countries()
-    
-    print(f"\n📊 Total jobs found: {len(all_jobs)}")
-    
-    unique_jobs = deduplicate_jobs(all_jobs)
-    print(f"After deduplication: {len(unique_jobs)}")
-    
-    # Analyze visa sponsorship
-    visa_yes = len([j for j in unique_jobs if j.get('visaSponsorship') == 'available'])
-    visa_no = len([j for j in unique_jobs if j.get('visaSponsorship') == 'not_available'])
-    visa_unknown = len([j for j in unique_jobs if j.get('visaSponsorship') == 'unknown'])
-    
-    print(f"\n🛂 Visa Sponsorship Analysis:")
-    print(f"  Sponsors visa: {visa_yes}")
-    print(f"  No sponsorship: {visa_no}")
-    print(f"  Unknown: {visa_unknown}")
-    
-    unique_jobs.sort(key=lambda x: x.get('posted', ''), reverse=True)
-    
-    output = {
-        'lastUpdate': datetime.now().isoformat() + 'Z',
-        'jobs': unique_jobs
-    }
-    
     script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root = os.path.dirname(script_dir)
     output_file = os.path.join(project_root, 'data', 'jobs.json')
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
-    
-    print(f"\n✓ Jobs saved: {output_file}")
-    
-    # Country summary
-    country_counts = {}
-    for job in unique_jobs:
-        parts = job.get('location', 'Unknown').split(', ')
-        country = parts[-1] if len(parts) > 1 else parts[0]
-        country_counts[country] = country_counts.get(country, 0) + 1
-    
-    print("\n📍 Top 15 Countries:")
-    for country, count in sorted(country_counts.items(), key=lambda x: x[1], reverse=True)[:15]:
-        print(f"  {country}: {count}")
+    state = CrawlState(CRAWL_STATE_PATH)
+    # Every request sent to the API uses quota, retries and failed ones included
+    HTTP_CLIENT.on_attempt = lambda source, status: state.record_call() if source == 'adzuna' else None
+    CLASSIFY_CACHE = ClassificationCache(CLASSIFY_CACHE_PATH, CLASSIFIER_VERSION, CLASSIFY_CACHE_SIZE)
+    HTTP_CACHE = HttpCache(HTTP_CACHE_PATH, HTTP_CACHE_MODE)
+    if state.count() == 0 and os.path.exists(output_file):
+        with METRICS.stage('seed') as stage, open(output_file, encoding='utf-8') as f:
+            seeded = state.seed(json.load(f).get('jobs', []), country_code_of)
+            stage.jobs_out = seeded
+        print(f"\n🗄️  Crawl state seeded from previous corpus: {seeded} jobs")
+    
+    crawled = True
+    with METRICS.stage('crawl') as stage:
+        if HTTP_CACHE.mode == 'replay':
+            print(f"\n📼 Replaying recorded responses from {HTTP_CACHE_PATH}")
+            new_jobs = search_all_countries(state=state)
+        elif not ADZUNA_APP_ID or not ADZUNA_APP_KEY:
+            print("\n⚠️  No API keys - republishing stored jobs")
+            new_jobs = []
+            crawled = False
+        else:
+            print(f"\n✓ API configured (ID: {ADZUNA_APP_ID[:8]}...)")
+            new_jobs = search_all_countries(state=state)
+        stage.jobs_out = len(new_jobs)
+    
+    if ENRICH and new_jobs:
+        with METRICS.stage('enrich', jobs_in=len(new_jobs)) as stage, DetailCache(ENRICH_CACHE_PATH, ENRICH_RETRY_EMPTY_DAYS) as details:
+            # Replays stay offline: only texts fetched on earlier runs are used
+            fetcher = DetailFetcher(HTTP_CLIENT, details, workers=ENRICH_WORKERS, per_host=ENRICH_PER_HOST,
+                                    offline=HTTP_CACHE.mode == 'replay')
+            enriched = enrich_jobs(new_jobs, fetcher)
+            state.update(enriched)
+            stage.jobs_out = len(enriched)
+        print(f"\n🔎 Enrichment: {fetcher.hits} cached, {fetcher.fetched} fetched, {fetcher.failed} failed; "
+              f"{len(enriched)} jobs re-classified on full text")
+    
+    if HTTP_CACHE.mode != 'off':
+        print(f"\n🌐 HTTP cache ({HTTP_CACHE.mode}): {HTTP_CACHE.hits} served, "
+              f"{HTTP_CACHE.revalidated} revalidated (304), {HTTP_CACHE.misses} fetched")
+    HTTP_CACHE.close()
+    HTTP_CACHE = None
+    
+    stats = HTTP_CLIENT.stats()
+    tripped = [name for name, breaker in stats['breakers'].items() if breaker['trips']]
+    print(f"🔁 HTTP client: {stats['requests']} requests, {stats['retries']} retries"
+          + (f", circuit opened for {', '.join(tripped)}" if tripped else ""))
+    HTTP_CLIENT.on_attempt = None
+    HTTP_CLIENT.close()
+    
+    # Without a crawl nothing could have been seen again, so nothing may expire
+    expired = []
+    if crawled:
+        with METRICS.stage('expire') as stage:
+            cutoff = (datetime.now() - timedelta(days=JOB_TTL_DAYS)).isoformat() + 'Z'
+            expired = state.expired(cutoff)
+            archive = JobArchive(ARCHIVE_DIR, compact_members=ARCHIVE_COMPACT_MEMBERS)
+            # Archived before they are forgotten, so a crash in between only repeats records
+            archive.append(dict(job, expired=datetime.now().isoformat() + 'Z') for job in expired)
+            state.forget(job['id'] for job in expired)
+            compacted = archive.compact_due()
+            stage.jobs_in = len(expired)
+            stage.jobs_out = len(expired)
+        print(f"\n🗃️  Expired after {JOB_TTL_DAYS:g} days unseen: {len(expired)} jobs archived"
+              + (f", compacted {', '.join(compacted)}" if compacted else ""))
+    
+    # Merge the new postings into everything held from earlier runs. Jobs stream
+    # through disk spills: the sorted corpus is spilled once and every output
+    # below is one streaming pass over it, so the corpus is never held whole.
+    with JsonlSpill(SPILL_DIR) as spill, JsonlSpill(SPILL_DIR) as corpus:
+        with METRICS.stage('dedupe') as stage:
+            seen = set()
+            for job in state.iter_jobs():
+                stage.jobs_in += 1
+                key = dedupe_key(job)
+                if key not in seen:
+                    seen.add(key)
+                    spill.append(locate_job(job))
+            held = stage.jobs_in
+            stage.jobs_out = len(spill)
+            del seen
+        
+        with METRICS.stage('near_duplicates', jobs_in=len(spill)) as stage:
+            duplicates = find_near_duplicates(spill, NEAR_DUPLICATE_THRESHOLD)
+            involved = set(duplicates) | {canonical for canonical, _ in duplicates.values()}
+            picked = {index: job for index, job in enumerate(spill) if index in involved} if involved else {}
+            near_duplicates = [(picked[index], picked[canonical], score)
+                               for index, (canonical, score) in sorted(duplicates.items())]
+            state.record_duplicates(near_duplicates)
+            stage.jobs_out = len(spill) - len(duplicates)
+        state.close()
+        
+        with METRICS.stage('sort', jobs_in=len(spill) - len(duplicates)) as stage:
+            kept = (job for index, job in enumerate(spill) if index not in duplicates)
+            corpus.extend(external_sort(kept, key=corpus_order,
+                                        chunk_size=SORT_CHUNK_SIZE, directory=SPILL_DIR))
+            stage.jobs_out = len(corpus)
+        spill.close()
+        
+        print(f"\n🧠 Classification cache: {CLASSIFY_CACHE.hits} hits, {CLASSIFY_CACHE.misses} misses")
+        CLASSIFY_CACHE.close()
+        CLASSIFY_CACHE = None
+        
+        print(f"\n📊 New jobs fetched: {len(new_jobs)}")
+        print(f"Total jobs held: {held}")
+        
+        print(f"After deduplication: {len(corpus)} ({len(near_duplicates)} near-duplicates merged)")
+        
+        with METRICS.stage('aggregate', jobs_in=len(corpus)) as stage:
+            aggregates = build_aggregates(corpus, country_code_of,
+                                          {code.lower(): name for code, name in COUNTRIES.items()})
+            stage.jobs_out = aggregates['count']
+        
+        # Analyze visa sponsorship
+        visa_counts = facet_counts(aggregates, 'visaSponsorship')
+        
+        print(f"\n🛂 Visa Sponsorship Analysis:")
+        print(f"  Sponsors visa: {visa_counts.get('available', 0)}")
+        print(f"  No sponsorship: {visa_counts.get('not_available', 0)}")
+        print(f"  Unknown: {visa_counts.get('unknown', 0)}")
+        
+        data_dir = os.path.dirname(output_file)
+        published = read_json_stream(output_file)
+        previous = published[0] if published else None
+        with METRICS.stage('diff', jobs_in=len(corpus)) as stage:
+            diff = diff_jobs(published[1], corpus, key=job_id) if published else None
+            stage.jobs_out = len(corpus)
+        
+        if diff is not None:
+            print(f"\n🔀 Changes since {previous.get('lastUpdate')}: {len(diff['added'])} added, "
+                  f"{len(diff['updated'])} updated, {len(diff['removed'])} removed")
+        
+        if diff is not None and is_empty(diff) and not FORCE_PUBLISH \
+                and os.path.exists(os.path.join(data_dir, 'manifest.json')):
+            print("✓ No material changes - published files left as they are")
+        else:
+            last_update = datetime.now().isoformat() + 'Z'
+            publish_corpus(corpus, data_dir, last_update, aggregates)
+            # Forced or not, a new lastUpdate needs its entry (possibly empty) to keep the chain
+            if diff is not None and previous.get('lastUpdate'):
+                entry = write_delta(diff, data_dir, previous['lastUpdate'], last_update, keep=DELTA_HISTORY)
+                print(f"✓ Delta saved: {entry['file']} ({format_size(entry['bytes'])})")
+        
+        # Country summary
+        country_counts = facet_counts(aggregates, 'country')
+        
+        print("\n📍 Top 15 Countries:")
+        for code, count in sorted(country_counts.items(), key=lambda x: x[1], reverse=True)[:15]:
+            print(f"  {aggregates['countryNames'][code]}: {count}")
+    
+    written = METRICS.write(METRICS_DIR, extra={
+        'newJobs': len(new_jobs),
+        'jobsHeld': held,
+        'published': len(corpus),
+        'nearDuplicates': len(near_duplicates),
+        'expired': len(expired),
+        'changes': {kind: len(items) for kind, items in diff.items()} if diff is not None else None
+    })
+    print("\n⏱️  Stage timings:")
+    for name, stats in METRICS.stages.items():
+        print(f"  {name}: {stats.seconds:.2f}s ({stats.jobs_in} in, {stats.jobs_out} out)")
+    print(f"✓ Run report: {', '.join(os.path.relpath(path, project_root) for path in written)}")
     
     print("\n" + "=" * 60)
     print("✓ Complete!")
@@ -4,15 +4,56 @@ Enhanced IAM & Cybersecurity Job Scraper
 Pulls real jobs from multiple sources
 """
 
-import json
 import requests
 from datetime import datetime, timedelta
-import time
+from functools import partial
 import os
-from typing import List, Dict
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+
+from http_cache import HttpCache
+from http_client import HttpClient
+from keyword_matcher import PhraseMatcher, first_label, rule_groups
+from pipeline import SourceRegistry, run_pipeline, run_sources, time_left
+from publish import write_json
+from query_planner import format_coverage, plan_queries
+from rate_limit import HostRateLimiter
 
 # Configuration
 RAPID_API_KEY = os.getenv('RAPID_API_KEY', '')  # Set this in GitHub Secrets
+ADZUNA_API_BASE = os.getenv('ADZUNA_API_BASE', 'https://api.adzuna.com/v1/api/jobs')
+
+# Shared keep-alive client: one request per second per host, retries with
+# backoff on 429/5xx, and a circuit breaker per source
+HTTP_CLIENT = HttpClient(pool_size=4, rate_limiter=HostRateLimiter(1.0),
+                         max_retries=int(os.getenv('HTTP_MAX_RETRIES', '4')),
+                         backoff=float(os.getenv('HTTP_BACKOFF', '0.5')),
+                         breaker_threshold=int(os.getenv('BREAKER_THRESHOLD', '5')),
+                         breaker_reset=float(os.getenv('BREAKER_RESET', '60')))
+
+# On-disk HTTP cache: use | record | replay | off
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+HTTP_CACHE_PATH = os.getenv('HTTP_CACHE_PATH', os.path.join(DATA_DIR, 'http_cache.db'))
+HTTP_CACHE_MODE = os.getenv('HTTP_CACHE_MODE', 'use')
+# Seconds a stored response is reused without asking the server
+ADZUNA_CACHE_TTL = float(os.getenv('ADZUNA_CACHE_TTL', '3600'))
+# Results per Adzuna page; one page per keyword a query covers
+ADZUNA_PAGE_SIZE = 20
+GITHUB_CACHE_TTL = float(os.getenv('GITHUB_CACHE_TTL', '1800'))
+
+# Opened by main(); None means every request goes straight to the network
+HTTP_CACHE: Optional[HttpCache] = None
+
+# Sources run concurrently, each cut off after its budget (seconds), and are
+# passed on in registry order; stages hand postings on through queues of at
+# most PIPELINE_QUEUE_SIZE
+SOURCES = SourceRegistry(default_budget=float(os.getenv('SOURCE_BUDGET', '120')))
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '100'))
+
+# Published job fields, in output order; the classifier fills any a source leaves out
+JOB_FIELDS = ('company', 'title', 'location', 'locationType', 'type', 'level',
+              'clearance', 'posted', 'url', 'description')
+CLASSIFIED_FIELDS = ('locationType', 'type', 'level', 'clearance')
+DESCRIPTION_LIMIT = 200
 
 # Job search keywords
 IAM_KEYWORDS = [
@@ -42,149 +83,174 @@ SECURITY_KEYWORDS = [
     'Network Security'
 ]
 
+# Classification rules, compiled once into MATCHER below.
+# The first label hit wins, as in an if/elif ladder.
+
+# Matched against the title only
+JOB_TYPE_RULES = [
+    ('iam', ['iam', 'identity', 'access management', 'idm', 'pam', 'privileged', 'okta', 'sailpoint', 'ping']),
+    ('architect', ['architect']),
+    ('analyst', ['analyst']),
+    ('consultant', ['consultant'])
+]
+
+LEVEL_RULES = [
+    ('junior', ['junior', 'entry', 'associate', 'i ', ' i)', 'level i']),
+    ('senior', ['senior', 'sr.', 'sr ']),
+    ('principal', ['principal', 'staff', 'distinguished']),
+    ('lead', ['lead', 'manager', 'director', 'head of'])
+]
+
+# Matched against title and description
+CLEARANCE_RULES = [
+    ('ts-sci', ['ts/sci', 'top secret/sci', 'ts-sci']),
+    ('ts', ['top secret', 'ts clearance']),
+    ('secret', ['secret clearance', 'security clearance'])
+]
+
+LOCATION_TYPE_RULES = [
+    ('remote', ['remote', '100% remote', 'work from home', 'anywhere']),
+    ('hybrid', ['hybrid', 'flexible'])
+]
+
+MATCHER = PhraseMatcher(
+    text_groups={
+        **rule_groups('clearance', CLEARANCE_RULES),
+        **rule_groups('locationType', LOCATION_TYPE_RULES)
+    },
+    title_groups={
+        **rule_groups('type', JOB_TYPE_RULES),
+        **rule_groups('level', LEVEL_RULES)
+    }
+)
+
 def classify_job(title: str, description: str = '') -> Dict[str, str]:
     """Classify job by type, level, and attributes"""
-    title_lower = title.lower()
-    desc_lower = description.lower()
-    combined = f"{title_lower} {desc_lower}"
-    
-    # Determine job type
-    job_type = 'security'
-    if any(word in title_lower for word in ['iam', 'identity', 'access management', 'idm', 'pam', 'privileged', 'okta', 'sailpoint', 'ping']):
-        job_type = 'iam'
-    elif any(word in title_lower for word in ['architect']):
-        job_type = 'architect'
-    elif any(word in title_lower for word in ['analyst']):
-        job_type = 'analyst'
-    elif any(word in title_lower for word in ['consultant']):
-        job_type = 'consultant'
-    
-    # Determine level
-    level = 'mid'
-    if any(word in title_lower for word in ['junior', 'entry', 'associate', 'i ', ' i)', 'level i']):
-        level = 'junior'
-    elif any(word in title_lower for word in ['senior', 'sr.', 'sr ']):
-        level = 'senior'
-    elif any(word in title_lower for word in ['principal', 'staff', 'distinguished']):
-        level = 'principal'
-    elif any(word in title_lower for word in ['lead', 'manager', 'director', 'head of']):
-        level = 'lead'
-    
-    # Determine clearance
-    clearance = 'none'
-    if any(word in combined for word in ['ts/sci', 'top secret/sci', 'ts-sci']):
-        clearance = 'ts-sci'
-    elif any(word in combined for word in ['top secret', 'ts clearance']):
-        clearance = 'ts'
-    elif any(word in combined for word in ['secret clearance', 'security clearance']):
-        clearance = 'secret'
-    
-    # Determine location type
-    location_type = 'onsite'
-    if any(word in combined for word in ['remote', '100% remote', 'work from home', 'anywhere']):
-        location_type = 'remote'
-    elif any(word in combined for word in ['hybrid', 'flexible']):
-        location_type = 'hybrid'
+    hits = MATCHER.scan(title, description)
     
     return {
-        'type': job_type,
-        'level': level,
-        'clearance': clearance,
-        'locationType': location_type
+        'type': first_label(hits.title, 'type', JOB_TYPE_RULES, 'security'),
+        'level': first_label(hits.title, 'level', LEVEL_RULES, 'mid'),
+        'clearance': first_label(hits.text, 'clearance', CLEARANCE_RULES, 'none'),
+        'locationType': first_label(hits.text, 'locationType', LOCATION_TYPE_RULES, 'onsite')
     }
 
-def search_adzuna_jobs() -> List[Dict]:
+def classify_many(postings: Iterable[Tuple[str, str]]) -> List[Dict[str, str]]:
+    """Classify a batch of (title, description) pairs"""
+    return [classify_job(title, description) for title, description in postings]
+
+def http_get(url: str, params: Dict, ttl: float, source: str, timeout: float = 10):
+    """
+    GET through the shared client, and through the HTTP cache when one is open.
+    The timeout is capped at what is left of the source's budget.
+    """
+    timeout = max(0.1, min(timeout, time_left(timeout)))
+    fetch = partial(HTTP_CLIENT.get, source=source)
+    if HTTP_CACHE is None:
+        return fetch(url, params=params, timeout=timeout)
+    return HTTP_CACHE.get(url, params=params, ttl=ttl, timeout=timeout, fetch=fetch)
+
+@SOURCES.register('adzuna')
+def search_adzuna_jobs() -> Iterator[Dict]:
     """
     Search jobs via Adzuna API (free tier available)
     Register at: https://developer.adzuna.com/
     """
-    jobs = []
-    
     # You can get free API keys from Adzuna
     app_id = os.getenv('ADZUNA_APP_ID', '')
     app_key = os.getenv('ADZUNA_APP_KEY', '')
     
-    if not app_id or not app_key:
+    replaying = HTTP_CACHE is not None and HTTP_CACHE.mode == 'replay'
+    if (not app_id or not app_key) and not replaying:
         print("Adzuna API keys not configured, skipping...")
-        return []
+        return
     
-    try:
-        for keyword in ['IAM Engineer', 'Security Engineer', 'Identity Engineer']:
-            url = f"https://api.adzuna.com/v1/api/jobs/us/search/1"
+    # The whole keyword set, folded into the fewest calls that return the same jobs
+    keywords = IAM_KEYWORDS + SECURITY_KEYWORDS
+    searches = plan_queries(keywords, ['us'])
+    print('\n'.join(['Adzuna query plan:'] + format_coverage(searches, keywords, ['us'])))
+    
+    # A query stands in for len(search.covers) single-keyword searches of one
+    # page each, so it walks up to that many pages - fewer once a page comes
+    # back short. A failed page only loses the rest of its own query.
+    seen = set()
+    for search in searches:
+        for page in range(1, len(search.covers) + 1):
+            url = f"{ADZUNA_API_BASE}/{search.country}/search/{page}"
             params = {
                 'app_id': app_id,
                 'app_key': app_key,
-                'results_per_page': 20,
-                'what': keyword,
+                'results_per_page': ADZUNA_PAGE_SIZE,
+                **search.params(),
                 'content-type': 'application/json'
             }
             
-            response = requests.get(url, params=params, timeout=10)
-            if response.status_code == 200:
-                data = response.json()
-                for result in data.get('results', []):
-                    classification = classify_job(result['title'], result.get('description', ''))
-                    
-                    jobs.append({
-                        'company': result.get('company', {}).get('display_name', 'Unknown'),
-                        'title': result['title'],
-                        'location': result.get('location', {}).get('display_name', 'Remote'),
-                        'locationType': classification['locationType'],
-                        'type': classification['type'],
-                        'level': classification['level'],
-                        'clearance': classification['clearance'],
-                        'posted': result.get('created', datetime.now().strftime('%Y-%m-%d')),
-                        'url': result['redirect_url'],
-                        'description': result.get('description', '')[:200]
-                    })
+            try:
+                response = http_get(url, params, ADZUNA_CACHE_TTL, 'adzuna')
+                if response.status_code != 200:
+                    print(f"Adzuna '{search.label}' page {page}: HTTP {response.status_code}")
+                    break
+                results = response.json().get('results', [])
+            except (requests.RequestException, RuntimeError, ValueError) as e:
+                print(f"Error fetching from Adzuna ('{search.label}', page {page}): {e}")
+                break
             
-            time.sleep(1)  # Rate limiting
+            for result in results:
+                # Overlapping queries list the same posting; drop it before it is classified again
+                result_id = str(result.get('id', ''))
+                if result_id and result_id in seen:
+                    continue
+                seen.add(result_id)
+                yield {
+                    'company': result.get('company', {}).get('display_name', 'Unknown'),
+                    'title': result.get('title'),
+                    'location': result.get('location', {}).get('display_name', 'Remote'),
+                    'posted': result.get('created'),
+                    'url': result.get('redirect_url'),
+                    'description': result.get('description', '')
+                }
             
-    except Exception as e:
-        print(f"Error fetching from Adzuna: {e}")
-    
-    return jobs
+            if len(results) < ADZUNA_PAGE_SIZE:
+                break
 
-def search_github_jobs() -> List[Dict]:
+@SOURCES.register('github')
+def search_github_jobs() -> Iterator[Dict]:
     """
     Search jobs posted on GitHub Jobs-related repositories
     """
-    jobs = []
+    # Search for IAM/Security jobs in various job posting repos
+    url = "https://api.github.com/search/issues"
+    params = {
+        'q': 'IAM engineer OR security engineer in:title in:body is:open',
+        'sort': 'created',
+        'per_page': 30
+    }
     
     try:
-        # Search for IAM/Security jobs in various job posting repos
-        url = "https://api.github.com/search/issues"
-        params = {
-            'q': 'IAM engineer OR security engineer in:title in:body is:open',
-            'sort': 'created',
-            'per_page': 30
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
-            for item in data.get('items', []):
-                if 'hiring' in item.get('title', '').lower() or 'job' in item.get('title', '').lower():
-                    classification = classify_job(item['title'], item.get('body', ''))
-                    
-                    jobs.append({
-                        'company': 'Via GitHub',
-                        'title': item['title'],
-                        'location': 'Remote',
-                        'locationType': 'remote',
-                        'type': classification['type'],
-                        'level': classification['level'],
-                        'clearance': 'none',
-                        'posted': item['created_at'][:10],
-                        'url': item['html_url'],
-                        'description': item.get('body', '')[:200]
-                    })
-                    
-    except Exception as e:
+        response = http_get(url, params, GITHUB_CACHE_TTL, 'github')
+        if response.status_code != 200:
+            print(f"GitHub search: HTTP {response.status_code}")
+            return
+        items = response.json().get('items', [])
+    except (requests.RequestException, RuntimeError, ValueError) as e:
         print(f"Error fetching from GitHub: {e}")
+        return
     
-    return jobs
+    for item in items:
+        if 'hiring' in item.get('title', '').lower() or 'job' in item.get('title', '').lower():
+            yield {
+                'company': 'Via GitHub',
+                'title': item['title'],
+                'location': 'Remote',
+                'locationType': 'remote',
+                'clearance': 'none',
+                'posted': item.get('created_at', '')[:10],
+                'url': item.get('html_url'),
+                # The search API returns a null body for issues without one
+                'description': item.get('body') or ''
+            }
 
+@SOURCES.register('curated')
 def generate_sample_jobs() -> List[Dict]:
     """
     Generate curated sample jobs from known companies
@@ -300,21 +366,53 @@ def generate_sample_jobs() -> List[Dict]:
     
     return jobs
 
-def deduplicate_jobs(jobs: List[Dict]) -> List[Dict]:
-    """Remove duplicate jobs"""
+def normalize_jobs(postings: Iterable[Dict]) -> Iterator[Dict]:
+    """Pipeline stage: drop postings without a title or link, fill defaults, trim whitespace"""
+    for posting in postings:
+        if not posting.get('title') or not posting.get('url'):
+            continue
+        job = {key: value.strip() if isinstance(value, str) else value for key, value in posting.items()}
+        job['company'] = job.get('company') or 'Unknown'
+        job['location'] = job.get('location') or 'Remote'
+        job['posted'] = job.get('posted') or datetime.now().strftime('%Y-%m-%d')
+        job['description'] = job.get('description') or ''
+        yield job
+
+def classify_jobs(postings: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Pipeline stage: classify on the full description, then cut it down for
+    publishing. Labels a source already set (e.g. curated jobs) are kept.
+    """
+    for job in postings:
+        missing = [field for field in CLASSIFIED_FIELDS if field not in job]
+        if missing:
+            classification = classify_job(job['title'], job['description'])
+            for field in missing:
+                job[field] = classification[field]
+        job['description'] = job['description'][:DESCRIPTION_LIMIT]
+        yield {field: job[field] for field in JOB_FIELDS}
+
+def dedupe_jobs(jobs: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Pipeline stage: pass on the first job per (company, title) as it arrives,
+    holding only the keys. Sources delivered in registry order make that the
+    same job every run.
+    """
     seen = set()
-    unique_jobs = []
-    
     for job in jobs:
         key = (job['company'].lower(), job['title'].lower())
         if key not in seen:
             seen.add(key)
-            unique_jobs.append(job)
-    
-    return unique_jobs
+            yield job
+
+def deduplicate_jobs(jobs: List[Dict]) -> List[Dict]:
+    """Remove duplicate jobs"""
+    return list(dedupe_jobs(jobs))
 
 def main():
     """Main scraping function"""
+    global HTTP_CACHE
+    
     print("="
 
  * 60)
@@ -322,23 +420,30 @@ def main():
     print("=" * 60)
     print()
     
-    all_jobs = []
+    HTTP_CACHE = HttpCache(HTTP_CACHE_PATH, HTTP_CACHE_MODE)
     
-    # Try real APIs
-    print("Fetching from Adzuna...")
-    all_jobs.extend(search_adzuna_jobs())
+    # Real APIs plus curated jobs from major employers (so the site always has content),
+    # streamed through normalize -> classify -> dedupe into the sink below
+    sources = SOURCES.sources()
+    print(f"Fetching from {', '.join(source.name for source in sources)}...")
+    postings = run_sources(sources, PIPELINE_QUEUE_SIZE, in_order=True)
+    unique_jobs = list(run_pipeline(postings, [normalize_jobs, classify_jobs, dedupe_jobs],
+                                    PIPELINE_QUEUE_SIZE))
     
-    print("Fetching from GitHub...")
-    all_jobs.extend(search_github_jobs())
+    for source in sources:
+        print(f"  {source.name}: {source.count} postings ({source.status}, {source.elapsed:.1f}s)")
     
-    # Always include curated sample jobs to ensure content
-    print("Adding curated jobs from major employers...")
-    all_jobs.extend(generate_sample_jobs())
+    if HTTP_CACHE.mode != 'off':
+        print(f"HTTP cache ({HTTP_CACHE.mode}): {HTTP_CACHE.hits} served, "
+              f"{HTTP_CACHE.revalidated} revalidated, {HTTP_CACHE.misses} fetched")
+    HTTP_CACHE.close()
+    HTTP_CACHE = None
     
-    # Deduplicate
-    unique_jobs = deduplicate_jobs(all_jobs)
+    stats = HTTP_CLIENT.stats()
+    print(f"HTTP client: {stats['requests']} requests, {stats['retries']} retries")
+    HTTP_CLIENT.close()
     
-    print(f"\nTotal jobs found: {len(all_jobs)}")
+    print(f"\nTotal jobs found: {sum(source.count for source in sources)}")
     print(f"After deduplication: {len(unique_jobs)}")
     
     # Sort by posted date
@@ -356,8 +461,7 @@ def main():
     project_root = os.path.dirname(script_dir)
     output_file = os.path.join(project_root, 'data', 'jobs.json')
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    write_json(output_file, output, indent=2)
     
     print(f"\nJobs written to: {output_file}")
     print("=" * 60)
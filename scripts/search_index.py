@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Prebuilt search index for the job table
+
+js/app.js used to substring-match every job on every keystroke. At publish
+time we now build:
+
+- a token vocabulary (alphanumeric runs of title, company and description)
+  with a delta-encoded posting list of job ordinals per token, and
+- one bitmap per facet value (type, level, locationType, clearance).
+
+A search term is split into the same tokens. Where the term contains a
+token decides which vocabulary tokens can hold it: one between two
+separators is a whole word (exact lookup), one running to the end of the
+term starts a word (a prefix range, found by bisecting the sorted
+vocabulary), and only one at the start of the term may sit mid-word. That
+leading token is left to the others to narrow down, and scanned for as a
+substring only when it is the whole query. Intersecting the posting lists
+gives a small candidate set; only the candidates are then checked against
+the exact substring rule, which keeps results identical to the old full
+scan. Ordinals index data/jobs.json.
+"""
+
+import base64
+from bisect import bisect_left
+from itertools import groupby
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+INDEX_VERSION = 1
+SEARCH_FIELDS = ('title', 'company', 'description')
+FACETS = ('type', 'level', 'locationType', 'clearance')
+
+
+def tokenize(text: str) -> List[str]:
+    """Maximal runs of letters/digits, lowercased - same rule as the client's /[\\p{L}\\p{N}]+/gu"""
+    return [''.join(chars) for alnum, chars in groupby((text or '').lower(), key=str.isalnum) if alnum]
+
+
+def facet_value(job: Dict, facet: str) -> str:
+    # The table treats a missing clearance as "none"
+    if facet == 'clearance':
+        return job.get('clearance') or 'none'
+    return job.get(facet) or ''
+
+
+def encode_bitmap(ordinals: Iterable[int], size: int) -> str:
+    bits = bytearray((size + 7) // 8)
+    for ordinal in ordinals:
+        bits[ordinal >> 3] |= 1 << (ordinal & 7)
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
+
+def decode_bitmap(encoded: str) -> int:
+    """Bitmap as a Python int, bit i set for ordinal i"""
+    return int.from_bytes(base64.b64decode(encoded), 'little')
+
+
+def encode_postings(ordinals: Sequence[int]) -> List[int]:
+    previous = 0
+    deltas = []
+    for ordinal in ordinals:
+        deltas.append(ordinal - previous)
+        previous = ordinal
+    return deltas
+
+
+def decode_postings(deltas: Iterable[int]) -> List[int]:
+    ordinals = []
+    current = 0
+    for delta in deltas:
+        current += delta
+        ordinals.append(current)
+    return ordinals
+
+
+def build_search_index(jobs: Iterable[Dict]) -> Dict:
+    """Index over `jobs` in jobs.json order, built in one pass (so it can be a stream)"""
+    postings: Dict[str, List[int]] = {}
+    facet_members: Dict[str, Dict[str, List[int]]] = {facet: {} for facet in FACETS}
+
+    count = 0
+    for ordinal, job in enumerate(jobs):
+        count += 1
+        tokens = set()
+        for field in SEARCH_FIELDS:
+            tokens.update(tokenize(job.get(field, '')))
+        for token in tokens:
+            postings.setdefault(token, []).append(ordinal)
+        for facet in FACETS:
+            facet_members[facet].setdefault(facet_value(job, facet), []).append(ordinal)
+
+    vocabulary = sorted(postings)
+    return {
+        'version': INDEX_VERSION,
+        'count': count,
+        'fields': list(SEARCH_FIELDS),
+        'tokens': vocabulary,
+        'postings': [encode_postings(postings[token]) for token in vocabulary],
+        'facets': {
+            facet: {value: encode_bitmap(members, count) for value, members in sorted(values.items())}
+            for facet, values in facet_members.items()
+        }
+    }
+
+
+def query_plan(term: str) -> List[Tuple[str, str]]:
+    """
+    (token, lookup) for each query token that can narrow the search: 'exact'
+    between separators, 'prefix' at the end of the term, and 'substring' for
+    a lone token that may start mid-word. A leading token followed by others
+    is left out - the others pin the match down and the exact rule checks it.
+    """
+    runs = [(alnum, ''.join(chars)) for alnum, chars in groupby(term.lower(), key=str.isalnum)]
+    words = [position for position, (alnum, _) in enumerate(runs) if alnum]
+    plan = []
+    for position in words:
+        token = runs[position][1]
+        if position == 0:
+            if len(words) == 1:
+                plan.append((token, 'substring'))
+        elif position == len(runs) - 1:
+            plan.append((token, 'prefix'))
+        else:
+            plan.append((token, 'exact'))
+    return plan
+
+
+def vocabulary_matches(tokens: Sequence[str], token: str, lookup: str) -> Iterable[int]:
+    """Positions in the sorted vocabulary `tokens` that satisfy a query_plan lookup"""
+    if lookup == 'substring':
+        return [i for i, candidate in enumerate(tokens) if token in candidate]
+    start = bisect_left(tokens, token)
+    if lookup == 'exact':
+        return range(start, start + 1) if start < len(tokens) and tokens[start] == token else range(0)
+    end = start
+    while end < len(tokens) and tokens[end].startswith(token):
+        end += 1
+    return range(start, end)
+
+
+def _matches_search(job: Dict, term: str) -> bool:
+    return any(term in (job.get(field) or '').lower() for field in SEARCH_FIELDS)
+
+
+def query_index(index: Dict, jobs: Sequence[Dict], search: str = '', job_type: str = '',
+                level: str = '', location: str = '', clearance: str = '') -> List[int]:
+    """
+    Reference implementation of the table filter over the index. Returns the
+    ordinals of matching jobs in corpus order, exactly as js/app.js filterJobs
+    would select them. Empty arguments mean "no filter", as in the UI.
+    """
+    term = search.lower()
+    everything = (1 << index['count']) - 1
+    selected = everything
+
+    for facet, wanted in (('type', job_type), ('level', level),
+                          ('locationType', location), ('clearance', clearance)):
+        if wanted:
+            encoded = index['facets'][facet].get(wanted)
+            selected &= decode_bitmap(encoded) if encoded else 0
+
+    candidates: Optional[set] = None
+    for query_token, lookup in query_plan(term):
+        matching = set()
+        for position in vocabulary_matches(index['tokens'], query_token, lookup):
+            matching.update(decode_postings(index['postings'][position]))
+        candidates = matching if candidates is None else candidates & matching
+        if not candidates:
+            return []
+
+    if candidates is None:
+        ordinals = (i for i in range(index['count']) if selected >> i & 1)
+    else:
+        ordinals = (i for i in sorted(candidates) if selected >> i & 1)
+
+    # Punctuation, spacing and token adjacency are settled by the exact rule
+    return [i for i in ordinals if not term or _matches_search(jobs[i], term)]
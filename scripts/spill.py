@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Disk-backed intermediates for the publish step
+
+JsonlSpill is a temporary JSONL file that jobs are appended to as they
+stream in and that can be read back any number of times, so a stage never
+needs the whole corpus as Python objects. external_sort orders a stream of
+any size in bounded memory: sorted runs of `chunk_size` items are spilled
+and lazily k-way merged. posted_epoch turns the mixed `posted` formats
+(ISO timestamps, plain dates) into one numeric sort key.
+"""
+
+import heapq
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from operator import itemgetter
+from typing import Callable, Iterable, Iterator, Optional
+
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def posted_epoch(posted: Optional[str]) -> int:
+    """Seconds since the epoch (UTC) of a posted value; 0 if missing or unparsable"""
+    if not posted:
+        return 0
+    text = posted.strip()
+    if text.endswith('Z'):
+        text = text[:-1] + '+00:00'
+    try:
+        when = datetime.fromisoformat(text)
+    except ValueError:
+        try:
+            when = datetime.strptime(text[:10], '%Y-%m-%d')
+        except ValueError:
+            return 0
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return int(when.timestamp())
+
+
+class JsonlSpill:
+    """Append-then-read temporary JSONL file, deleted on close"""
+
+    def __init__(self, directory: Optional[str] = None, default: Optional[Callable] = None):
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix='jobmap-spill-', suffix='.jsonl')
+        self._file = os.fdopen(fd, 'wb')
+        self._default = default
+        self.count = 0
+
+    def append(self, item):
+        self._file.write(json.dumps(item, ensure_ascii=False, default=self._default).encode('utf-8') + b'\n')
+        self.count += 1
+
+    def extend(self, items: Iterable):
+        for item in items:
+            self.append(item)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator:
+        self._file.flush()
+        with open(self.path, 'rb') as f:
+            for line in f:
+                yield json.loads(line)
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def external_sort(items: Iterable, key: Callable[[object], int], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  directory: Optional[str] = None, default: Optional[Callable] = None) -> Iterator:
+    """
+    Stable ascending sort of `items` by the JSON-serializable `key`, holding at
+    most `chunk_size` items at a time. Fits in one chunk -> plain in-memory sort.
+    """
+    runs = []
+    chunk = []
+    try:
+        for seq, item in enumerate(items):
+            chunk.append((key(item), seq, item))
+            if len(chunk) >= chunk_size:
+                chunk.sort(key=itemgetter(0, 1))
+                run = JsonlSpill(directory, default)
+                run.extend(chunk)
+                runs.append(run)
+                chunk = []
+
+        chunk.sort(key=itemgetter(0, 1))
+        if not runs:
+            for _, _, item in chunk:
+                yield item
+            return
+
+        if chunk:
+            run = JsonlSpill(directory, default)
+            run.extend(chunk)
+            runs.append(run)
+            chunk = []
+        for _, _, item in heapq.merge(*runs, key=itemgetter(0, 1)):
+            yield item
+    finally:
+        for run in runs:
+            run.close()
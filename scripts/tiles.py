@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Quadkey tiles of job clusters for the zoomable map
+
+Each placed job (a gazetteer point for its city, else its country) falls in
+one Web Mercator tile per zoom level - the same z/x/y grid Leaflet draws -
+named by its quadkey, whose prefixes are the enclosing tiles at lower zooms.
+For every configured zoom a non-empty tile is written to
+data/tiles/<quadkey>.json holding clusters: the jobs of each sub-tile
+CLUSTER_DEPTH levels further down, with their mean position, count,
+countries and the ids of the most recent jobs. data/tiles/index.json lists
+the non-empty tiles and their counts, so the client only fetches tiles that
+exist and are in view. Tile sizes depend on how many places are covered,
+not on how many jobs there are.
+"""
+
+import heapq
+import json
+import math
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from publish import content_hash, write_atomic, write_json
+
+TILES_VERSION = 1
+# Clusters are sub-tiles this many zoom levels below their tile (an 8x8 grid)
+CLUSTER_DEPTH = 3
+MAX_LATITUDE = 85.05112878
+
+
+def tile_xy(lat: float, lon: float, zoom: int) -> Tuple[int, int]:
+    """Web Mercator tile column and row containing a point"""
+    lat = min(max(lat, -MAX_LATITUDE), MAX_LATITUDE)
+    size = 1 << zoom
+    x = int((lon + 180.0) / 360.0 * size)
+    sin_lat = math.sin(math.radians(lat))
+    y = int((0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * size)
+    return min(max(x, 0), size - 1), min(max(y, 0), size - 1)
+
+
+def quadkey(x: int, y: int, zoom: int) -> str:
+    digits = []
+    for level in range(zoom, 0, -1):
+        mask = 1 << (level - 1)
+        digits.append(str((1 if x & mask else 0) + (2 if y & mask else 0)))
+    return ''.join(digits)
+
+
+def build_tiles(jobs: Iterable[Dict], locate: Callable[[Dict], Optional[Tuple[float, float]]],
+                country_of: Callable[[Dict], str], zooms: Sequence[int], top: int = 10) -> Tuple[Dict[str, Dict], int]:
+    """
+    Cluster tiles for every zoom in `zooms`, keyed by quadkey, plus the number
+    of jobs that could not be placed. Jobs are expected newest first; each
+    cluster keeps the ids of its `top` earliest jobs in that order.
+    """
+    finest = max(zooms) + CLUSTER_DEPTH
+    cells: Dict[str, Dict] = {}
+    unplaced = 0
+
+    # Every job lands in one cell at the finest level; coarser clusters are quadkey prefixes
+    for ordinal, job in enumerate(jobs):
+        point = locate(job)
+        if point is None:
+            unplaced += 1
+            continue
+        key = quadkey(*tile_xy(point[0], point[1], finest), finest)
+        cell = cells.setdefault(key, {'lat': 0.0, 'lon': 0.0, 'count': 0, 'countries': set(), 'ids': []})
+        cell['lat'] += point[0]
+        cell['lon'] += point[1]
+        cell['count'] += 1
+        cell['countries'].add(country_of(job) or 'other')
+        if len(cell['ids']) < top:
+            cell['ids'].append((ordinal, job.get('id', '')))
+
+    tiles: Dict[str, Dict] = {}
+    for zoom in sorted(zooms):
+        clusters: Dict[str, Dict] = {}
+        for key in sorted(cells):
+            cell = cells[key]
+            cluster = clusters.setdefault(key[:zoom + CLUSTER_DEPTH],
+                                          {'lat': 0.0, 'lon': 0.0, 'count': 0, 'countries': set(), 'ids': []})
+            cluster['lat'] += cell['lat']
+            cluster['lon'] += cell['lon']
+            cluster['count'] += cell['count']
+            cluster['countries'] |= cell['countries']
+            cluster['ids'] = heapq.nsmallest(top, cluster['ids'] + cell['ids'])
+
+        for key, cluster in clusters.items():
+            tile = tiles.setdefault(key[:zoom], {'v': TILES_VERSION, 'quadkey': key[:zoom], 'zoom': zoom,
+                                                 'count': 0, 'clusters': []})
+            tile['count'] += cluster['count']
+            tile['clusters'].append({
+                'lat': round(cluster['lat'] / cluster['count'], 4),
+                'lon': round(cluster['lon'] / cluster['count'], 4),
+                'count': cluster['count'],
+                'countries': sorted(cluster['countries']),
+                'ids': [job_id for _, job_id in cluster['ids']]
+            })
+
+    return tiles, unplaced
+
+
+def write_tiles(tiles: Dict[str, Dict], data_dir: str, zooms: Sequence[int], unplaced: int,
+                last_update: str) -> Dict:
+    """Write data/tiles/<quadkey>.json and data/tiles/index.json, drop stale tiles; returns the index"""
+    tile_dir = os.path.join(data_dir, 'tiles')
+    os.makedirs(tile_dir, exist_ok=True)
+
+    entries = {}
+    for key in sorted(tiles):
+        payload = json.dumps(tiles[key], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        write_atomic(os.path.join(tile_dir, f"{key}.json"), payload)
+        entries[key] = {'count': tiles[key]['count'], 'hash': content_hash(payload)}
+
+    for filename in os.listdir(tile_dir):
+        if filename.endswith('.json') and filename != 'index.json' and filename[:-5] not in tiles:
+            os.remove(os.path.join(tile_dir, filename))
+
+    index = {
+        'v': TILES_VERSION,
+        'lastUpdate': last_update,
+        'zooms': sorted(zooms),
+        'clusterDepth': CLUSTER_DEPTH,
+        'placed': sum(tile['count'] for tile in tiles.values() if tile['zoom'] == min(zooms)),
+        'unplaced': unplaced,
+        'tiles': entries
+    }
+    write_json(os.path.join(tile_dir, 'index.json'), index, separators=(',', ':'))
+    return index
+
+
+def tiles_in_view(south: float, west: float, north: float, east: float, zoom: int) -> List[str]:
+    """Quadkeys of the tiles covering a bounding box (the client's lookup, for reference)"""
+    x0, y0 = tile_xy(north, west, zoom)
+    x1, y1 = tile_xy(south, east, zoom)
+    return [quadkey(x, y, zoom) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
@@ -0,0 +1,77 @@
+"""
+A cached corpus plus the published deltas must reproduce the published corpus
+
+publish.apply_delta is the reference for js/corpus.js applyDelta: records are
+keyed by crawl_state.job_id (the same key diff_jobs uses) and the result is
+re-sorted into corpus_order, so its order_hash matches the manifest's.
+
+    python -m pytest tests
+"""
+
+import copy
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from publish import apply_delta, corpus_order, diff_jobs, is_empty, order_hash, write_delta  # noqa: E402
+
+
+def job(number, posted, title='IAM Engineer', **fields):
+    return {'id': str(number), 'title': title, 'company': 'Okta', 'posted': posted,
+            'url': f'https://www.adzuna.com/details/{number}', **fields}
+
+
+CURRENT = sorted([
+    job(101, '2026-10-16T09:00:00Z'),
+    job(102, '2026-10-16T09:00:00Z', title='PAM Engineer'),
+    job(103, '2026-10-15'),
+    job(104, '2026-10-14T23:30:00-02:00'),
+    job(105, None),
+    {'title': 'Identity Architect', 'company': 'Acme', 'url': 'https://example.com/jobs/7'},
+], key=corpus_order)
+
+
+def previous_corpus():
+    previous = copy.deepcopy(CURRENT[1:])
+    previous[0]['title'] = 'Senior PAM Engineer'
+    previous.append(job(99, '2026-10-01'))
+    return sorted(previous, key=corpus_order)
+
+
+def test_corpus_order_newest_first_then_id():
+    assert [j.get('id') for j in CURRENT] == ['101', '102', '104', '103', '105', None]
+
+
+def test_apply_delta_reproduces_corpus():
+    previous = previous_corpus()
+    diff = diff_jobs(previous, CURRENT)
+    assert [j['id'] for j in diff['added']] == ['101']
+    assert [j['id'] for j in diff['updated']] == ['102']
+    assert diff['removed'] == ['99']
+
+    caught_up = apply_delta(previous, {'v': 1, **diff})
+    assert caught_up == CURRENT
+    assert order_hash(caught_up) == order_hash(CURRENT)
+    assert order_hash(caught_up) != order_hash(previous)
+
+
+def test_delta_round_trips_through_files(tmp_path):
+    previous = previous_corpus()
+    entry = write_delta(diff_jobs(previous, CURRENT), str(tmp_path), 'gen1', 'gen2')
+    with open(os.path.join(tmp_path, entry['file'])) as f:
+        delta = json.load(f)
+    assert (delta['from'], delta['to']) == ('gen1', 'gen2')
+    assert apply_delta(previous, delta) == CURRENT
+
+    # The chain continues from 'gen2' only
+    write_delta(diff_jobs(CURRENT, CURRENT), str(tmp_path), 'gen2', 'gen3')
+    with open(os.path.join(tmp_path, 'deltas', 'index.json')) as f:
+        index = json.load(f)
+    assert index['latest'] == 'gen3'
+    assert [(e['from'], e['to']) for e in index['deltas']] == [('gen1', 'gen2'), ('gen2', 'gen3')]
+
+
+def test_unchanged_corpus_has_empty_diff():
+    assert is_empty(diff_jobs(CURRENT, copy.deepcopy(CURRENT)))
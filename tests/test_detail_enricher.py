@@ -0,0 +1,100 @@
+"""
+Detail enrichment against the local Adzuna stub (benchmarks/stub_adzuna.py)
+
+Like the real API, the stub's redirect_url is a /land/ad/ link that lands on
+a page without the description, so the fetcher has to go to /details/<id>.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from corpus import generate  # noqa: E402
+from detail_enricher import DetailCache, DetailFetcher, details_url, extract_description  # noqa: E402
+from http_client import HttpClient  # noqa: E402
+from stub_adzuna import start  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def stub():
+    server, base_url, stats = start(generate(60))
+    yield base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def client():
+    with HttpClient(max_retries=0) as client:
+        yield client
+
+
+@pytest.fixture
+def results(stub, client):
+    return client.get(f"{stub}/gb/search/1", params={'results_per_page': 5}).json()['results']
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://www.adzuna.co.uk/jobs/land/ad/4242?se=x&v=1', 'https://www.adzuna.co.uk/jobs/details/4242'),
+    ('https://www.adzuna.com/details/4242', 'https://www.adzuna.com/details/4242'),
+    ('https://www.adzuna.de/jobs/details/9?utm=1', 'https://www.adzuna.de/jobs/details/4242'),
+    ('https://www.adzuna.fr/', 'https://www.adzuna.fr/details/4242'),
+])
+def test_details_url(url, expected):
+    assert details_url('4242', url) == expected
+
+
+@pytest.mark.parametrize('job_id, url', [('', 'https://www.adzuna.com/details/1'),
+                                         ('h0123abcd', 'https://www.adzuna.com/details/1'),
+                                         ('4242', '#'), ('4242', '')])
+def test_details_url_needs_adzuna_id_and_host(job_id, url):
+    assert details_url(job_id, url) is None
+
+
+def test_redirect_url_has_no_description(client, results):
+    landing = results[0]['redirect_url']
+    assert '/land/ad/' in landing
+    assert extract_description(client.get(landing).text) == ''
+
+
+def test_fetches_details_page(tmp_path, stub, client, results):
+    postings = [(r['id'], details_url(r['id'], r['redirect_url'])) for r in results]
+    assert all(url.startswith(f"{stub}/jobs/details/") for _, url in postings)
+
+    with DetailCache(str(tmp_path / 'details.db')) as cache:
+        fetcher = DetailFetcher(client, cache, workers=2)
+        texts = fetcher.full_texts(postings)
+        assert texts == {r['id']: r['description'] for r in results}
+        assert (fetcher.fetched, fetcher.hits, fetcher.failed) == (len(results), 0, 0)
+
+        # Served from the cache from then on
+        again = DetailFetcher(client, cache)
+        assert again.full_texts(postings) == texts
+        assert (again.fetched, again.hits) == (0, len(results))
+
+
+def test_empty_page_is_retried_after_ttl(tmp_path, client, results):
+    path = str(tmp_path / 'details.db')
+    job_id, landing = results[0]['id'], results[0]['redirect_url']
+    with DetailCache(path) as cache:
+        assert DetailFetcher(client, cache).fetch(job_id, landing) == ''
+        assert cache.get_many([job_id]) == {job_id: ''}
+
+    with DetailCache(path, retry_empty_days=0) as cache:
+        assert cache.get_many([job_id]) == {}
+        fetcher = DetailFetcher(client, cache)
+        assert fetcher.full_texts([(job_id, details_url(job_id, landing))]) == {job_id: results[0]['description']}
+        assert fetcher.fetched == 1
+
+
+def test_missing_page_is_cached_for_good(tmp_path, stub, client):
+    with DetailCache(str(tmp_path / 'details.db'), retry_empty_days=0) as cache:
+        fetcher = DetailFetcher(client, cache)
+        assert fetcher.full_texts([('999999999', f"{stub}/details/999999999")]) == {}
+        assert cache.get_many(['999999999']) == {'999999999': ''}
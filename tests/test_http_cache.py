@@ -0,0 +1,116 @@
+"""
+HttpCache against the local Adzuna stub (benchmarks/stub_adzuna.py), whose
+pages carry an ETag and answer If-None-Match with 304
+
+    python -m pytest tests
+"""
+
+import os
+import sqlite3
+import sys
+from functools import partial
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from corpus import generate  # noqa: E402
+from http_cache import CacheMiss, HttpCache  # noqa: E402
+from http_client import HttpClient  # noqa: E402
+from stub_adzuna import start  # noqa: E402
+
+RESULTS = generate(200)
+PARAMS = {'app_id': 'id-1', 'app_key': 'key-1', 'results_per_page': 5, 'what': 'iam'}
+
+
+@pytest.fixture
+def stub():
+    server, base_url, stats = start(RESULTS)
+    yield server, f"{base_url}/gb/search/1", stats
+    server.shutdown()
+
+
+@pytest.fixture
+def client():
+    with HttpClient(max_retries=0) as client:
+        yield client
+
+
+def cache_at(tmp_path, mode: str) -> HttpCache:
+    return HttpCache(str(tmp_path / 'http_cache.db'), mode)
+
+
+def test_fresh_entry_is_served_without_a_request(tmp_path, stub, client):
+    _, url, stats = stub
+    with cache_at(tmp_path, 'use') as cache:
+        first = cache.get(url, params=PARAMS, ttl=60, fetch=client.get)
+        second = cache.get(url, params=PARAMS, ttl=60, fetch=client.get)
+        assert first.status_code == second.status_code == 200
+        assert second.from_cache and second.json() == first.json()
+        assert (cache.misses, cache.hits, stats.requests) == (1, 1, 1)
+
+
+def test_stale_entry_is_revalidated_with_etag(tmp_path, stub, client):
+    _, url, stats = stub
+    with cache_at(tmp_path, 'use') as cache:
+        first = cache.get(url, params=PARAMS, ttl=0, fetch=client.get)
+        again = cache.get(url, params=PARAMS, ttl=0, fetch=client.get)
+        assert stats.requests == 2 and stats.not_modified == 1
+        assert cache.revalidated == 1 and cache.misses == 1
+        assert again.from_cache and again.status_code == 200 and again.content == first.content
+        assert again.headers['ETag'] == first.headers['ETag']
+
+
+def test_changed_page_replaces_the_entry(tmp_path, stub, client):
+    _, url, stats = stub
+    with cache_at(tmp_path, 'use') as cache:
+        fresh = cache.get(url, params=PARAMS, ttl=0, fetch=client.get)
+    # As if the page changed since: the stored validator no longer matches
+    with sqlite3.connect(str(tmp_path / 'http_cache.db')) as conn:
+        conn.execute("UPDATE responses SET etag = '\"outdated\"', body = x'7b7d'")
+    with cache_at(tmp_path, 'use') as cache:
+        response = cache.get(url, params=PARAMS, ttl=0, fetch=client.get)
+        assert not getattr(response, 'from_cache', False) and response.json() == fresh.json()
+        assert (cache.misses, cache.revalidated, stats.not_modified) == (1, 0, 0)
+        assert cache.get(url, params=PARAMS, ttl=60, fetch=client.get).json() == fresh.json()
+
+
+def test_record_then_replay_offline(tmp_path, stub, client):
+    server, url, stats = stub
+    with cache_at(tmp_path, 'use') as cache:
+        cache.get(url, params=PARAMS, ttl=60, fetch=client.get)
+    with cache_at(tmp_path, 'record') as cache:
+        # Record always goes to the network, even with a fresh entry stored
+        recorded = cache.get(url, params=PARAMS, ttl=60, fetch=client.get)
+        missing = cache.get(url.rsplit('/', 1)[0], params=PARAMS, fetch=client.get)
+        assert stats.requests == 3 and missing.status_code == 404
+    server.shutdown()
+
+    def offline(*args, **kwargs):
+        raise AssertionError('replay must not touch the network')
+
+    with cache_at(tmp_path, 'replay') as cache:
+        # Credentials are not part of the key, so any keys replay the recording
+        replayed = cache.get(url, params=dict(PARAMS, app_id='other', app_key='other'), fetch=offline)
+        assert replayed.from_cache and replayed.json() == recorded.json()
+        with pytest.raises(CacheMiss):
+            cache.get(url, params=dict(PARAMS, what='pam'), fetch=offline)
+        # Error responses are never stored
+        with pytest.raises(CacheMiss):
+            cache.get(url.rsplit('/', 1)[0], params=PARAMS, fetch=offline)
+
+
+def test_off_passes_through(tmp_path, stub, client):
+    _, url, stats = stub
+    with cache_at(tmp_path, 'off') as cache:
+        for _ in range(2):
+            assert cache.get(url, params=PARAMS, ttl=60, fetch=partial(client.get, source='adzuna')).status_code == 200
+        assert stats.requests == 2 and (cache.hits, cache.misses) == (0, 0)
+    assert not (tmp_path / 'http_cache.db').exists()
+
+
+def test_unknown_mode(tmp_path):
+    with pytest.raises(ValueError):
+        cache_at(tmp_path, 'sometimes')
@@ -0,0 +1,173 @@
+"""
+HttpClient against the local Adzuna stub (benchmarks/stub_adzuna.py): retries,
+Retry-After, backoff, the circuit breaker and the per-attempt hook
+
+    python -m pytest tests
+"""
+
+import os
+import random
+import socket
+import sys
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'scripts'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from corpus import generate  # noqa: E402
+from crawl_state import CrawlState  # noqa: E402
+from http_client import MAX_RETRY_AFTER, CircuitBreaker, CircuitOpen, HttpClient, retry_after_seconds  # noqa: E402
+from stub_adzuna import start  # noqa: E402
+
+RESULTS = generate(200)
+
+
+@pytest.fixture
+def stub(request):
+    """A stub answering the given share of requests with 429 (Retry-After: 0 unless given)"""
+    rate_429, retry_after = getattr(request, 'param', (0.0, 0.0))
+    server, base_url, stats = start(RESULTS, rate_429=rate_429, retry_after=retry_after)
+    yield base_url, stats
+    server.shutdown()
+
+
+def closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}/gb/search/1"
+
+
+@pytest.mark.parametrize('stub', [(1.0, 0.0)], indirect=True)
+def test_on_attempt_sees_every_retry(stub, tmp_path):
+    base_url, stats = stub
+    attempts = []
+    with HttpClient(max_retries=2, backoff=0.001) as client, CrawlState(str(tmp_path / 'state.db')) as state:
+        def on_attempt(source, status):
+            attempts.append((source, status))
+            state.record_call()
+        client.on_attempt = on_attempt
+        assert client.get(f"{base_url}/gb/search/1", source='adzuna').status_code == 429
+        assert attempts == [('adzuna', '429')] * 3
+        assert state.calls_today() == stats.requests == 3
+
+
+def test_on_attempt_sees_network_errors():
+    attempts = []
+    with HttpClient(max_retries=1, backoff=0.001, on_attempt=lambda *a: attempts.append(a)) as client:
+        with pytest.raises(requests.ConnectionError):
+            client.get(closed_port_url(), source='adzuna', timeout=2)
+    assert attempts == [('adzuna', 'error')] * 2
+
+
+@pytest.mark.parametrize('stub', [(0.5, 0.0)], indirect=True)
+def test_retries_until_success(stub):
+    base_url, stats = stub
+    with HttpClient(max_retries=20, backoff=0.001) as client:
+        for page in (1, 2, 3, 4):
+            response = client.get(f"{base_url}/gb/search/{page}", params={'results_per_page': 3})
+            assert response.status_code == 200
+            assert len(response.json()['results']) == 3
+        assert stats.throttled > 0
+        assert client.retries == stats.throttled
+        assert client.requests == stats.requests == 4 + stats.throttled
+
+
+@pytest.mark.parametrize('stub', [(1.0, 0.3)], indirect=True)
+def test_waits_for_retry_after(stub):
+    base_url, stats = stub
+    with HttpClient(max_retries=2, backoff=0.001) as client:
+        started = time.monotonic()
+        response = client.get(f"{base_url}/gb/search/1")
+        elapsed = time.monotonic() - started
+    assert response.status_code == 429 and response.headers['Retry-After'] == '0.3'
+    assert stats.requests == 3
+    # Two waits of at least Retry-After, though the backoff alone is ~1 ms
+    assert 0.6 <= elapsed < 3
+
+
+class Headers:
+    def __init__(self, **headers):
+        self.headers = {name.replace('_', '-'): value for name, value in headers.items()}
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('3', 3.0), ('0.5', 0.5), ('-2', 0.0), (None, None), ('soon', None),
+    (formatdate(time.time() - 60, usegmt=True), 0.0),
+])
+def test_retry_after_seconds(value, expected):
+    assert retry_after_seconds(Headers(Retry_After=value) if value else Headers()) == expected
+
+
+def test_retry_after_http_date():
+    assert 25 < retry_after_seconds(Headers(Retry_After=formatdate(time.time() + 30, usegmt=True))) <= 30
+
+
+def test_backoff_is_jittered_exponential_and_capped():
+    random.seed(7)
+    client = HttpClient(backoff=0.5, max_backoff=4.0)
+    for attempt in range(8):
+        delays = [client.backoff_delay(attempt) for _ in range(200)]
+        ceiling = min(4.0, 0.5 * 2 ** attempt)
+        assert all(0 <= delay <= ceiling for delay in delays)
+        assert max(delays) > ceiling * 0.8
+    # Retry-After is a floor, itself capped
+    assert client.backoff_delay(0, Headers(Retry_After='10')) == 10
+    assert client.backoff_delay(0, Headers(Retry_After='100000')) == MAX_RETRY_AFTER
+    client.close()
+
+
+def test_breaker_transitions():
+    breaker = CircuitBreaker(threshold=2, reset_after=0.1)
+    assert breaker.state == 'closed' and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow() and breaker.trips == 1
+
+    time.sleep(0.12)
+    assert breaker.state == 'half-open'
+    assert breaker.allow() and not breaker.allow()  # a single trial request
+    breaker.record_failure()
+    assert breaker.state == 'open' and breaker.trips == 2
+
+    time.sleep(0.12)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.failures == 0
+    assert breaker.allow() and breaker.allow()
+
+
+@pytest.mark.parametrize('stub', [(1.0, 0.0)], indirect=True)
+def test_breaker_cuts_off_a_failing_source(stub):
+    failing_url, failing_stats = stub
+    server, healthy_url, healthy_stats = start(RESULTS)
+    try:
+        with HttpClient(max_retries=0, breaker_threshold=2, breaker_reset=0.2) as client:
+            for _ in range(2):
+                assert client.get(f"{failing_url}/gb/search/1", source='adzuna').status_code == 429
+            assert client.breaker('adzuna').state == 'open'
+            # Open: fails fast without a request, whichever host the source uses
+            with pytest.raises(CircuitOpen):
+                client.get(f"{healthy_url}/gb/search/1", source='adzuna')
+            assert failing_stats.requests == 2 and healthy_stats.requests == 0
+            # Other sources are unaffected
+            assert client.get(f"{healthy_url}/gb/search/1", source='other').status_code == 200
+
+            # Half-open: one failed trial opens it again
+            time.sleep(0.25)
+            assert client.get(f"{failing_url}/gb/search/1", source='adzuna').status_code == 429
+            with pytest.raises(CircuitOpen):
+                client.get(f"{healthy_url}/gb/search/1", source='adzuna')
+
+            # Half-open: a successful trial closes it
+            time.sleep(0.25)
+            assert client.get(f"{healthy_url}/gb/search/1", source='adzuna').status_code == 200
+            assert client.breaker('adzuna').state == 'closed'
+            assert client.stats()['breakers']['adzuna'] == {'state': 'closed', 'trips': 2}
+    finally:
+        server.shutdown()
@@ -0,0 +1,58 @@
+"""
+find_near_duplicates drops a job only for a kept job it actually matches
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from near_duplicates import collapse_near_duplicates, find_near_duplicates, shingles, signature, similarity  # noqa: E402
+
+# Letters only: the shingler drops digits
+WORDS = [f"w{chr(97 + i % 26)}{chr(97 + i // 26)}" for i in range(200)]
+
+
+def posting(start: int, country: str = 'US', length: int = 60) -> dict:
+    """The same ad with its description window shifted by `start` words"""
+    return {'company': 'Acme', 'title': 'Identity Engineer', 'countryCode': country,
+            'description': ' '.join(WORDS[start:start + length])}
+
+
+def score(a: dict, b: dict) -> float:
+    return similarity(signature(shingles(a)), signature(shingles(b)))
+
+
+# A ~ B and B ~ C, but A and C are too far apart
+CHAIN = [posting(0), posting(4), posting(8)]
+
+
+def test_fixture_is_a_chain():
+    a, b, c = CHAIN
+    assert score(a, b) >= 0.85 and score(b, c) >= 0.85
+    assert score(a, c) < 0.85
+
+
+def test_chain_does_not_merge_transitively():
+    assert find_near_duplicates(CHAIN) == {1: (0, score(CHAIN[0], CHAIN[1]))}
+
+
+def test_duplicate_records_its_own_score_against_the_canonical():
+    jobs = CHAIN + [posting(1)]
+    duplicates = find_near_duplicates(jobs)
+    assert duplicates[3] == (0, score(jobs[0], jobs[3]))
+    assert all(score(jobs[index], jobs[canonical]) == recorded >= 0.85
+               for index, (canonical, recorded) in duplicates.items())
+    assert all(canonical not in duplicates for canonical, _ in duplicates.values())
+
+
+def test_other_country_is_not_compared():
+    assert find_near_duplicates([posting(0), posting(0, country='GB')]) == {}
+
+
+def test_collapse_keeps_unmatched_chain_end():
+    kept, dropped = collapse_near_duplicates(CHAIN)
+    assert kept == [CHAIN[0], CHAIN[2]]
+    assert [(duplicate, canonical) for duplicate, canonical, _ in dropped] == [(CHAIN[1], CHAIN[0])]
@@ -0,0 +1,58 @@
+"""
+run_sources must hand on postings in registry order however the source
+threads interleave, and stop reading from a source once its budget is spent
+
+    python -m pytest tests
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from pipeline import Source, run_sources, time_left  # noqa: E402
+
+
+def jittery(name: str, count: int, seed: int, delay: float = 0.002):
+    rng = random.Random(seed)
+
+    def fetch():
+        for number in range(count):
+            time.sleep(rng.uniform(0, delay))
+            yield {'source': name, 'number': number}
+    return fetch
+
+
+def test_in_order_is_registry_order():
+    for seed in range(3):
+        sources = [Source(name, jittery(name, 20, seed * 10 + rank), budget=10.0)
+                   for rank, name in enumerate(['slow', 'fast', 'empty', 'last'])]
+        sources[2].fetch = lambda: iter(())
+        got = [(p['source'], p['number']) for p in run_sources(sources, queue_size=4, in_order=True)]
+        assert got == [(name, n) for name in ['slow', 'fast', 'last'] for n in range(20)]
+        assert [s.status for s in sources] == ['ok'] * 4
+
+
+def test_timed_out_source_keeps_what_it_sent_and_releases_later_ones():
+    def stalls():
+        yield {'source': 'stalls', 'number': 0}
+        time.sleep(2)
+        yield {'source': 'stalls', 'number': 1}
+
+    sources = [Source('stalls', stalls, budget=0.3), Source('quick', jittery('quick', 5, 0), budget=10.0)]
+    started = time.monotonic()
+    got = [(p['source'], p['number']) for p in run_sources(sources, in_order=True)]
+    assert time.monotonic() - started < 1.5
+    assert got == [('stalls', 0)] + [('quick', n) for n in range(5)]
+    assert [s.status for s in sources] == ['timeout', 'ok']
+
+
+def test_time_left_is_the_source_budget():
+    def fetch():
+        yield {'left': time_left(99.0)}
+
+    [posting] = run_sources([Source('one', fetch, budget=5.0)])
+    assert 4.0 < posting['left'] <= 5.0
+    assert time_left(99.0) == 99.0
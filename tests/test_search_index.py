@@ -0,0 +1,139 @@
+"""
+query_index must select exactly what the job table's full scan did
+
+`filter_jobs` below is js/app.js filterJobs as it was before the search
+index: a lowercase substring match on title, company or description, and
+exact matches on the facet dropdowns (a missing clearance counts as "none").
+
+    python -m pytest tests
+"""
+
+import itertools
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+
+from search_index import build_search_index, query_index, query_plan, vocabulary_matches  # noqa: E402
+
+JOBS = [
+    {'title': 'Senior IAM Engineer', 'company': 'Okta', 'description': 'Own SSO/SAML and SCIM provisioning.',
+     'type': 'IAM', 'level': 'senior', 'locationType': 'remote', 'clearance': 'none'},
+    {'title': 'Sr. Identity & Access Management Analyst', 'company': 'AT&T',
+     'description': 'Identity governance (IGA) with SailPoint; role-based access.',
+     'type': 'IAM', 'level': 'mid', 'locationType': 'hybrid', 'clearance': None},
+    {'title': 'C++ Security Engineer', 'company': 'Lockheed Martin',
+     'description': 'Secure C++/Rust services. Active TS/SCI clearance required.',
+     'type': 'Security', 'level': 'senior', 'locationType': 'onsite', 'clearance': 'ts/sci'},
+    {'title': 'PAM Engineer (CyberArk)', 'company': 'Deutsche Bank', 'description': '',
+     'type': 'PAM', 'level': 'mid', 'locationType': 'hybrid', 'clearance': 'none'},
+    {'title': 'Ingénieur Sécurité Cloud', 'company': 'Société Générale',
+     'description': 'Gestion des identités et des accès, Azure AD.',
+     'type': 'Security', 'level': 'junior', 'locationType': 'onsite'},
+    {'title': 'Privileged Access Management Lead', 'company': 'BeyondTrust',
+     'description': 'Lead PAM roll-outs; privileged-access reviews.',
+     'type': 'PAM', 'level': 'lead', 'locationType': 'remote', 'clearance': 'secret'},
+    {'title': 'Junior SOC Analyst', 'company': 'Acme Corp.', 'description': None,
+     'type': 'Security', 'level': 'junior', 'locationType': 'remote', 'clearance': 'secret'},
+]
+
+SEARCHES = [
+    # empty and blank
+    '', ' ', '   ',
+    # whole words, any case
+    'iam', 'IAM', 'engineer', 'okta',
+    # partial words, including inside a word and across a token boundary
+    'eng', 'ngine', 'secur', 'sécu', 'vileged', 'ss',
+    # multi-word: adjacency and spacing count, as in a substring match
+    'access management', 'management access', 'iam engineer', 'access  management', 'senior iam',
+    'identity & access', 'active ts',
+    # leading token cut mid-word, trailing one cut short or closed off
+    'ccess management', 'ior iam eng', 'nior iam engineer', ' iam', ' manag', 'sso/', 'ngineer (', 'ss mana',
+    # punctuation
+    'c++', 'c++/rust', 'sso/saml', 'sr.', 'at&t', 'ts/sci', 'roll-outs', 'privileged-access',
+    '(cyberark)', 'corp.', '&', '.', '/', '++', ';',
+    # no match
+    'kubernetes', 'iam analyst', 'zz',
+]
+
+FACET_CHOICES = {
+    'job_type': ['', 'IAM', 'PAM', 'Security', 'Other'],
+    'level': ['', 'junior', 'mid', 'senior', 'lead'],
+    'location': ['', 'remote', 'hybrid', 'onsite'],
+    'clearance': ['', 'none', 'secret', 'ts/sci'],
+}
+
+
+def filter_jobs(jobs, search='', job_type='', level='', location='', clearance=''):
+    """Ordinals the pre-index filterJobs selected"""
+    term = search.lower()
+    selected = []
+    for ordinal, job in enumerate(jobs):
+        matches_search = (not term
+                          or term in job['title'].lower()
+                          or term in job['company'].lower()
+                          or bool(job.get('description') and term in job['description'].lower()))
+        matches_clearance = (not clearance
+                             or (clearance == 'none' and (not job.get('clearance') or job['clearance'] == 'none'))
+                             or (clearance != 'none' and job.get('clearance') == clearance))
+        if (matches_search and matches_clearance
+                and (not job_type or job.get('type') == job_type)
+                and (not level or job.get('level') == level)
+                and (not location or job.get('locationType') == location)):
+            selected.append(ordinal)
+    return selected
+
+
+@pytest.fixture(scope='module')
+def index():
+    return build_search_index(JOBS)
+
+
+@pytest.mark.parametrize('search', SEARCHES)
+def test_search_matches_full_scan(index, search):
+    assert query_index(index, JOBS, search) == filter_jobs(JOBS, search)
+
+
+@pytest.mark.parametrize('filters', [dict(zip(FACET_CHOICES, values))
+                                     for values in itertools.product(*FACET_CHOICES.values())])
+def test_facets_match_full_scan(index, filters):
+    assert query_index(index, JOBS, **filters) == filter_jobs(JOBS, **filters)
+
+
+@pytest.mark.parametrize('search', ['', 'engineer', 'access management', 'c++', 'secur', 'zz'])
+@pytest.mark.parametrize('clearance', ['', 'none', 'secret'])
+@pytest.mark.parametrize('location', ['', 'remote', 'hybrid'])
+def test_search_and_facets_match_full_scan(index, search, clearance, location):
+    expected = filter_jobs(JOBS, search, location=location, clearance=clearance)
+    assert query_index(index, JOBS, search, location=location, clearance=clearance) == expected
+
+
+def test_fixture_exercises_every_case(index):
+    # Guard against a fixture change that makes the comparisons vacuous
+    assert filter_jobs(JOBS, 'access management') and filter_jobs(JOBS, 'c++') and filter_jobs(JOBS, 'ngine')
+    assert not filter_jobs(JOBS, 'management access')
+    assert filter_jobs(JOBS, clearance='none') == [0, 1, 3, 4]
+
+
+@pytest.mark.parametrize('search, plan', [
+    ('', []), ('++', []),
+    ('eng', [('eng', 'substring')]),
+    ('c++', [('c', 'substring')]),
+    (' Eng', [('eng', 'prefix')]),
+    ('senior iam eng', [('iam', 'exact'), ('eng', 'prefix')]),
+    ('sso/saml/', [('saml', 'exact')]),
+])
+def test_query_plan(search, plan):
+    assert query_plan(search) == plan
+
+
+def test_vocabulary_lookups(index):
+    tokens = index['tokens']
+    assert [tokens[i] for i in vocabulary_matches(tokens, 'engineer', 'exact')] == ['engineer']
+    assert list(vocabulary_matches(tokens, 'engine', 'exact')) == []
+    assert [tokens[i] for i in vocabulary_matches(tokens, 'privileged', 'prefix')] == ['privileged']
+    assert [tokens[i] for i in vocabulary_matches(tokens, 's', 'prefix')] == [t for t in tokens if t.startswith('s')]
+    assert [tokens[i] for i in vocabulary_matches(tokens, 'ngine', 'substring')] == ['engineer']
+    assert list(vocabulary_matches(tokens, 'zz', 'prefix')) == []